@@ -4,23 +4,32 @@ import os
 import json
 import re
 import math
+import statistics
+import numpy as np
 from pathlib import Path
 import textwrap
 import time
 import structlog
 from datetime import datetime
-from flask import Flask, request, jsonify
+from flask import Flask, request, jsonify, Response
 from flask_cors import CORS
 
-from flare_ai_consensus.router import AsyncOpenRouterProvider
+from flare_ai_consensus.router import (
+    AsyncOpenRouterProvider,
+    ModelResponse,
+    prewarm_connections,
+    render_metrics,
+)
 from flare_ai_consensus.settings import Settings, Message
-from flare_ai_consensus.utils import load_json
+from flare_ai_consensus.utils import background_loop, load_json
 
 # Import our custom confidence consensus components
-from flare_ai_consensus.consensus.confidence.confidence_embeddings import (
-    calculate_text_similarity, 
-    extract_price_and_explanation
+from flare_ai_consensus.consensus.confidence.confidence_matrix import async_confidence_matrix
+from flare_ai_consensus.consensus.confidence.logprob_confidence import (
+    TOP_LOGPROBS,
+    logprob_confidence,
 )
+from flare_ai_consensus.consensus.confidence.shapley import shapley_weights
 
 # Import sample data
 from sample import sample_data
@@ -37,14 +46,8 @@ CORS(app)
 
 ACCURACY_METRIC_DESIRED = True
 
-# Global variables for NFT data
-NFT_DATA = None
-ACTUAL_VALUE = None
-DATE_TO_PREDICT = None
-
 # Parse data to compare accuracy
 def accuracy_preparation(json_data):
-    global ACTUAL_VALUE, DATE_TO_PREDICT, NFT_DATA
     if json_data["sales_history"]:
         most_recent_transaction = json_data["sales_history"].pop(0)  # Removes and stores the first (latest) entry
         formatted_date = datetime.strptime(most_recent_transaction["date"], "%Y-%m-%d %H:%M:%S").strftime("%B, %Y")
@@ -100,14 +103,11 @@ def format_and_print_responses(responses, title="Model Responses"):
     
     for model_id, response in responses.items():
         print(f"Model: {model_id}")
+        response_text = response.text
         
-        # Ensure response is a string
-        response_text = convert_to_string(response)
-        
-        # Extract price and explanation from response
-        price, explanation = properly_extract_json_price(response_text)
-        if price is not None:
-            print(f"Extracted price: ${price:.2f}")
+        # Price parsed when the response arrived
+        if response.price is not None:
+            print(f"Extracted price: ${response.price:.2f}")
         
         # Format and wrap the response text
         try:
@@ -121,317 +121,222 @@ def format_and_print_responses(responses, title="Model Responses"):
         print(f"{'-' * terminal_width}")
 
 
-def convert_to_string(obj):
-    """Safely convert any object to a string"""
-    if isinstance(obj, str):
-        return obj
-    
-    if isinstance(obj, dict):
-        if 'content' in obj:
-            return str(obj.get('content', ''))
-        elif 'text' in obj:
-            return str(obj.get('text', ''))
-        elif 'message' in obj and isinstance(obj['message'], dict) and 'content' in obj['message']:
-            return str(obj['message']['content'])
-    
-    # Fallback to string representation
-    try:
-        return str(obj)
-    except:
-        return "[Error: Could not convert object to string]"
+def log_router_event(event_type, data):
+    """Log model requests and responses made by the router"""
+    if event_type == "model_request":
+        logger.info("API request", endpoint=data["endpoint"], max_tokens=data["max_tokens"])
+        print_colored(f"Request to {data['endpoint']}: max_tokens={data['max_tokens']}", "blue")
+    else:
+        logger.info("API response received", endpoint=data["endpoint"], status=data["status"])
 
 
-def properly_extract_json_price(text):
-    """
-    Properly extract the price from a JSON response by first trying to parse as JSON.
+def display_model_response(response, title):
+    """Print one model's response with its extracted price as soon as it lands"""
+    print_colored(f"\n----- {title} from {response.model_id} -----", "green")
     
-    Args:
-        text: The model's response as text
-        
-    Returns:
-        tuple: (price as float or None, explanation as string or None)
-    """
-    # Clean up any potential code block markers
-    cleaned_text = text.strip()
-    if cleaned_text.startswith("```json"):
-        cleaned_text = re.sub(r'^```json\s*', '', cleaned_text)
-        cleaned_text = re.sub(r'\s*```$', '', cleaned_text)
-    elif cleaned_text.startswith("```"):
-        cleaned_text = re.sub(r'^```\s*', '', cleaned_text)
-        cleaned_text = re.sub(r'\s*```$', '', cleaned_text)
-    
-    # Try to parse as JSON
-    try:
-        # First try to parse the whole text
-        data = json.loads(cleaned_text)
-        if isinstance(data, dict):
-            # Extract price
-            if "price" in data:
-                try:
-                    price = float(data["price"])
-                    explanation = data.get("explanation", "")
-                    return price, explanation
-                except (ValueError, TypeError):
-                    pass
-    except json.JSONDecodeError:
-        # If that fails, try to find and parse just the JSON part
-        json_pattern = r'({[^{}]*"price"[^{}]*})'
-        match = re.search(json_pattern, cleaned_text)
-        if match:
-            try:
-                json_part = match.group(1)
-                data = json.loads(json_part)
-                if "price" in data:
-                    return float(data["price"]), data.get("explanation", "")
-            except (json.JSONDecodeError, ValueError):
-                pass
-    
-    # If JSON parsing fails, fall back to regex
-    print_colored("JSON parsing failed, falling back to regex extraction", "yellow")
-    
-    # Look for {"price": 1234} pattern
-    price_match = re.search(r'"price"\s*:\s*([0-9,]+\.?[0-9]*)', text)
-    if price_match:
-        try:
-            price = float(price_match.group(1).replace(',', ''))
-            # Try to extract explanation
-            explanation_match = re.search(r'"explanation"\s*:\s*"([^"]+)"', text)
-            explanation = explanation_match.group(1) if explanation_match else None
-            return price, explanation
-        except (ValueError, TypeError):
-            pass
-    
-    # Look for dollar amounts as last resort
-    dollar_match = re.search(r'\$([0-9,]+\.?[0-9]*)', text)
-    if dollar_match:
-        try:
-            price = float(dollar_match.group(1).replace(',', ''))
-            return price, None
-        except (ValueError, TypeError):
-            pass
+    if response.price is not None:
+        print_colored(f"Extracted price: ${response.price:.2f}", "cyan")
     
-    return None, None
+    # Show truncated response
+    max_preview_chars = 500
+    text = response.text
+    preview = text if len(text) <= max_preview_chars else text[:max_preview_chars] + "..."
+    print(preview)
+    print_colored("-" * 40, "green")
 
 
-async def patch_provider_for_logging(provider):
-    """Patch the provider's _post method to log request/response details"""
-    original_post = provider._post
-    
-    async def logged_post(endpoint, json_payload):
-        logger.info("API request", endpoint=endpoint, max_tokens=json_payload.get('max_tokens'))
-        print_colored(f"Request to {endpoint}: max_tokens={json_payload.get('max_tokens')}", "blue")
-        response = await original_post(endpoint, json_payload)
-        logger.info("API response received", endpoint=endpoint, status="success")
-        return response
-    
-    provider._post = logged_post
-    return provider
+def build_challenge_conversation(initial_conversation, challenge_prompt, original_response):
+    """Append the challenge, quoting the model's own initial answer, to the conversation"""
+    # Create contextual challenge prompt that includes original response
+    contextualized_prompt = f"""
+        Your previous price estimation analysis was was {original_response}.
 
+        {challenge_prompt}
 
-async def send_initial_round(provider, consensus_config, initial_conversation):
-    """Get initial responses from all models and display responses as they come in"""
-    logger.info("Getting initial responses from models")
-    initial_responses = {}
+        Remember to maintain the same JSON format with 'price' and 'explanation' fields.
+        """
     
-    for model in consensus_config.models:
-        model_id = model.model_id
-        print_colored(f"Requesting initial response from {model_id}...", "blue")
-        
-        # Create payload
-        payload = {
-            "model": model_id,
-            "messages": initial_conversation,
-            "max_tokens": model.max_tokens,
-            "temperature": model.temperature,
-        }
-        
-        # Send request and immediately show response (no concurrent processing)
-        try:
-            print_colored(f"Waiting for {model_id} to respond...", "blue")
-            response = await provider.send_chat_completion(payload)
-            text = response.get("choices", [])[0].get("message", {}).get("content", "")
-            initial_responses[model_id] = text
-            
-            # Immediately display this model's response
-            print_colored(f"\n----- Initial Response from {model_id} -----", "green")
-            
-            # Extract price and explanation
-            price, explanation = properly_extract_json_price(text)
-            if price is not None:
-                print_colored(f"Extracted price: ${price:.2f}", "cyan")
-            
-            # Show truncated response
-            max_preview_chars = 500
-            preview = text if len(text) <= max_preview_chars else text[:max_preview_chars] + "..."
-            print(preview)
-            print_colored("-" * 40, "green")
-            
-        except Exception as e:
-            logger.error(f"Error getting response from {model_id}: {e}")
-            error_msg = f"Error: {str(e)}"
-            initial_responses[model_id] = error_msg
-            print_colored(f"Error getting response from {model_id}: {e}", "red")
-        
-    return initial_responses
+    # Build conversation with challenge
+    conversation = initial_conversation.copy()
+    conversation.append({"role": "user", "content": contextualized_prompt})
+    return conversation
+
 
+async def request_model_response(provider, model, conversation, cache_prefix, logprob_scores=None):
+    """
+    Send one chat completion request and return the parsed response.
+
+    If `logprob_scores` is given, token logprobs are requested and the model's
+    price confidence is stored there when the model returns them.
+    """
+    payload = {
+        "model": model.model_id,
+        "messages": conversation,
+        "max_tokens": model.max_tokens,
+        "temperature": model.temperature,
+        "cache_prefix": cache_prefix,
+    }
+    if logprob_scores is not None:
+        payload["logprobs"] = True
+        payload["top_logprobs"] = TOP_LOGPROBS
+    response = await provider.send_chat(payload)
+    if logprob_scores is not None:
+        confidence = logprob_confidence(response)
+        if confidence is not None:
+            logprob_scores[model.model_id] = confidence
+    return response
+
+
+async def run_model_pipeline(provider, model, initial_conversation, challenge_prompt, on_response, logprob_scores=None):
+    """
+    Run one model's initial -> challenge pipeline.
 
-async def send_challenge_round(provider, consensus_config, initial_conversation, challenge_prompt, initial_responses):
-    """Send challenge prompts to all models and display responses as they come in"""
-    logger.info("Sending challenge prompts to models")
-    challenge_responses = {}
+    The challenge is sent as soon as this model's initial answer arrives, without
+    waiting for the other models. `on_response(stage, response)` is called
+    after each stage; a model whose initial request fails is not challenged, and
+    neither is one whose confidence was read from its logprobs.
+    """
+    model_id = model.model_id
+    # Only the challenge appended after the shared conversation differs
+    cache_prefix = len(initial_conversation)
     
-    for model in consensus_config.models:
-        model_id = model.model_id
+    try:
+        print_colored(f"Requesting initial response from {model_id}...", "blue")
+        initial = await request_model_response(
+            provider, model, initial_conversation, cache_prefix, logprob_scores
+        )
+    except Exception as e:
+        logger.error(f"Error getting response from {model_id}: {e}")
+        print_colored(f"Error getting response from {model_id}: {e}", "red")
+        on_response("initial", ModelResponse(model_id, f"Error: {str(e)}"))
+        return
+    on_response("initial", initial)
+    
+    if logprob_scores and model_id in logprob_scores:
+        print_colored(f"Confidence of {model_id} from logprobs: {logprob_scores[model_id]:.4f}", "cyan")
+        return
+    
+    conversation = build_challenge_conversation(initial_conversation, challenge_prompt, initial)
+    try:
         print_colored(f"Sending challenge to {model_id}...", "blue")
-        
-        # Get the model's original response and extract price
-        original_response = initial_responses.get(model_id, "")
-        
-        # Create contextual challenge prompt that includes original response
-        contextualized_prompt = f"""
-        Your previous price estimation analysis was was {original_response}.
+        challenge = await request_model_response(provider, model, conversation, cache_prefix)
+    except Exception as e:
+        logger.error(f"Error getting challenge response from {model_id}: {e}")
+        print_colored(f"Error getting response from {model_id}: {e}", "red")
+        return
+    on_response("challenge", challenge)
 
-        {challenge_prompt}
 
-        Remember to maintain the same JSON format with 'price' and 'explanation' fields.
-        """
-        
-        print(contextualized_prompt)
-        
-        # Build conversation with challenge
-        conversation = initial_conversation.copy()
-        conversation.append({"role": "user", "content": contextualized_prompt})
-        
-        # Create payload
-        payload = {
-            "model": model_id,
-            "messages": conversation,
-            "max_tokens": model.max_tokens,
-            "temperature": model.temperature,
-        }
-        
-        # Send request and immediately show response (no concurrent processing)
-        try:
-            print_colored(f"Waiting for {model_id} to respond...", "blue")
-            response = await provider.send_chat_completion(payload)
-            text = response.get("choices", [])[0].get("message", {}).get("content", "")
-            challenge_responses[model_id] = text
-            
-            # Immediately display this model's response
-            print_colored(f"\n----- Response from {model_id} -----", "green")
-            
-            # Extract price and explanation
-            price, explanation = properly_extract_json_price(text)
-            if price is not None:
-                print_colored(f"Extracted price: ${price:.2f}", "cyan")
-            
-            # Show truncated response
-            max_preview_chars = 500
-            preview = text if len(text) <= max_preview_chars else text[:max_preview_chars] + "..."
-            print(preview)
-            print_colored("-" * 40, "green")
-            
-        except Exception as e:
-            logger.error(f"Error getting challenge response from {model_id}: {e}")
-            error_msg = f"Error: {str(e)}"
-            challenge_responses[model_id] = error_msg
-            print_colored(f"Error getting response from {model_id}: {e}", "red")
-    
-    return challenge_responses
+async def run_model_pipelines(provider, consensus_config, initial_conversation, challenge_prompt, on_event=None, logprob_scores=None):
+    """
+    Run every model's initial -> challenge pipeline concurrently.
+
+    Responses are displayed (and passed to `on_event(event_type, data)` as
+    "initial_response" / "challenge_response" events) in completion order.
+    Returns the initial and challenge responses keyed by model ID, in config order;
+    models scored into `logprob_scores` have no challenge response.
+    """
+    logger.info("Running initial and challenge rounds concurrently")
+    responses = {"initial": {}, "challenge": {}}
+    titles = {"initial": "Initial Response", "challenge": "Response"}
+    
+    def on_response(stage, response):
+        responses[stage][response.model_id] = response
+        display_model_response(response, titles[stage])
+        if on_event is not None:
+            on_event(f"{stage}_response", response.to_dict())
+    
+    await asyncio.gather(*(
+        run_model_pipeline(provider, model, initial_conversation, challenge_prompt, on_response, logprob_scores)
+        for model in consensus_config.models
+    ))
+    
+    # Restore config order so downstream prompts do not depend on arrival order
+    order = [model.model_id for model in consensus_config.models]
+    return tuple(
+        {model_id: responses[stage][model_id] for model_id in order if model_id in responses[stage]}
+        for stage in ("initial", "challenge")
+    )
 
 
-async def analyze_model_responses(initial_responses, challenge_responses):
-    """Analyze how models respond to challenges"""
-    analysis = {}
+async def analyze_model_responses(initial_responses, challenge_responses, logprob_scores=None):
+    """
+    Analyze how models respond to challenges.
+
+    Models in `logprob_scores` were not challenged; their initial response
+    stands in for the challenge and their confidence is the logprob score.
+    """
+    logprob_scores = logprob_scores or {}
+    model_ids, prices, explanations = [], [], []
     
     for model_id in initial_responses:
         # Get initial and challenge responses
-        initial = initial_responses.get(model_id, "")
-        challenge = challenge_responses.get(model_id, "")
+        initial = initial_responses.get(model_id)
+        if model_id in logprob_scores:
+            challenge = initial
+        else:
+            challenge = challenge_responses.get(model_id)
         
         # Skip if either response is missing
         if not initial or not challenge:
             print_colored(f"Skipping analysis for {model_id} due to missing responses", "red")
             continue
             
-        # Extract prices and explanations using proper JSON parsing
-        initial_price, initial_explanation = properly_extract_json_price(initial)
-        challenge_price, challenge_explanation = properly_extract_json_price(challenge)
-        
-        # Fall back to regex extraction if parsing fails
-        if initial_price is None:
-            tmp_price, tmp_explanation = extract_price_and_explanation(initial)
-            initial_price = tmp_price
-            initial_explanation = tmp_explanation or ""
-            
-        if challenge_price is None:
-            tmp_price, tmp_explanation = extract_price_and_explanation(challenge)
-            challenge_price = tmp_price
-            challenge_explanation = tmp_explanation or ""
-        
-        # Ensure we have explanation strings
-        initial_explanation = initial_explanation or ""
-        challenge_explanation = challenge_explanation or ""
-        
-        # Calculate price change with improved formula
-        if initial_price == 0 and challenge_price == 0:
-            price_change = 0
-        elif initial_price == 0:
-            price_change = 0.8  # Cap at 80% for maximum change
-        else:
-            # Calculate relative price change
-            price_change = min(abs(challenge_price - initial_price) / initial_price, 1)
-            
-            
-     
-            
-        # Calculate price stability (inverse of price change)
-        price_stability = 1 - price_change
-        
-        # Calculate text similarity
-        text_similarity = calculate_text_similarity(initial_explanation, challenge_explanation)
-        
-        # Calculate confidence score using weighted formula
-        # 30% weight on text similarity, 70% on price stability
-        confidence_score = (0.3 * text_similarity) + (0.7 * price_stability)
-        
-        # Ensure score is in [0,1] range
-        confidence_score = max(0.0, min(1.0, confidence_score))
-        
-        # Store analysis
-        analysis[model_id] = {
-            "initial_price": initial_price,
-            "challenge_price": challenge_price,
-            "price_change": price_change,
-            "price_stability": price_stability,
-            "text_similarity": text_similarity,
-            "confidence_score": confidence_score
-        }
-        
+        # Prices and explanations were parsed when the responses arrived
+        model_ids.append(model_id)
+        prices.append([initial.price or 0.0, challenge.price or 0.0])
+        explanations.append([initial.explanation, challenge.explanation])
+    
+    # Embed every explanation in one batch and score all models in one pass:
+    # 30% weight on text similarity, 70% on price stability
+    matrix = await async_confidence_matrix(
+        model_ids,
+        ["initial", "challenge"],
+        np.array(prices, dtype=float).reshape(len(model_ids), 2),
+        explanations,
+    )
+    matrix = matrix.with_final_confidence(logprob_scores)
+    
+    for model_id, result in matrix.analysis().items():
+        initial_price = result["initial_price"]
+        challenge_price = result["challenge_price"]
+        text_similarity = result["text_similarity"]
+        price_stability = result["price_stability"]
+        confidence_score = result["confidence_score"]
         
         # Log results
         print_colored(f"\nModel: {model_id}", "yellow")
         print_colored(f"Initial price: ${initial_price:.2f}", "cyan")
         print_colored(f"Challenge price: ${challenge_price:.2f}", "cyan")
         print_colored(f"Raw change: {abs(challenge_price - initial_price) / max(initial_price, 1):.2%}", "cyan")
-        print_colored(f"Price change: {price_change:.2%}", "magenta")
+        print_colored(f"Price change: {result['price_change']:.2%}", "magenta")
         print_colored(f"Price stability: {price_stability:.4f}", "magenta")
         print_colored(f"Text similarity: {text_similarity:.4f}", "magenta")
-        print_colored(f"Formula: 0.3 * {text_similarity:.4f} + 0.7 * {price_stability:.4f} = {confidence_score:.4f}", "blue")
+        if model_id in logprob_scores:
+            print_colored(f"Confidence from price token logprobs: {confidence_score:.4f}", "blue")
+        else:
+            print_colored(f"Formula: 0.3 * {text_similarity:.4f} + 0.7 * {price_stability:.4f} = {confidence_score:.4f}", "blue")
         print_colored(f"Confidence score: {confidence_score:.4f}", "green")
         
-    return analysis
+    return matrix
 
 
-async def weighted_aggregation(provider, aggregator_config, model_responses, analysis):
+async def weighted_aggregation(provider, aggregator_config, model_responses, analysis, actual_value):
     """
     Provide aggregator model with confidence scores and let it determine the final price.
     We don't calculate a weighted average ourselves, but instead pass the weights to the model.
     """
-    global ACTUAL_VALUE
     # Calculate weights based on confidence scores
     confidence_scores = {model_id: data["confidence_score"] for model_id, data in analysis.items()}
     
+    # Optionally weight models by their Shapley contribution to the consensus
+    if aggregator_config.weighting == "shapley":
+        confidence_scores = shapley_weights(
+            list(analysis),
+            [data["challenge_price"] for data in analysis.values()],
+            [data["confidence_score"] for data in analysis.values()],
+        )
+    
     # Calculate total confidence for normalization
     total_confidence = sum(confidence_scores.values())
     
@@ -575,18 +480,18 @@ Do not include any text outside the JSON structure or any markdown code blocks.
         result_json["models"] = {}
         
         predicted_price = result_json["price"]
-        error_accuracy = abs((ACTUAL_VALUE - predicted_price)) / ACTUAL_VALUE
+        error_accuracy = abs((actual_value - predicted_price)) / actual_value
         if 1 - error_accuracy < 0:
             accuracy = 0
         else:
             accuracy = 1 - error_accuracy
         
         print_colored(f"Predicted Price: ${predicted_price:.2f}", "green")
-        print_colored(f"Actual Price: ${ACTUAL_VALUE:.2f}", "green")
+        print_colored(f"Actual Price: ${actual_value:.2f}", "green")
         print_colored(f"Accuracy: {accuracy:.2%}", "green")
         
         result_json["accuracy"] = accuracy
-        result_json["actual_value"] = ACTUAL_VALUE
+        result_json["actual_value"] = actual_value
         
         for model_id, data in analysis.items():
             result_json["models"][model_id] = {
@@ -608,7 +513,7 @@ Do not include any text outside the JSON structure or any markdown code blocks.
             result_json["final_confidence_score"] = final_confidence
             result_json["weights_standard_deviation"] = weights_std_dev
             
-        result_json["actual_value"] = ACTUAL_VALUE
+        result_json["actual_value"] = actual_value
         
             
         # Convert back to JSON string
@@ -639,14 +544,21 @@ Do not include any text outside the JSON structure or any markdown code blocks.
     return aggregated_text
 
 
-async def run_confidence_consensus(contract_address, token_id, date_to_predict=None, actual_value=None):
-    """Run the confidence consensus process for a given NFT data"""
+async def run_confidence_consensus(contract_address, token_id, date_to_predict=None, actual_value=None, on_event=None):
+    """
+    Run the confidence consensus process for a given NFT data.
+
+    `on_event(event_type, data)` receives per-model responses as they arrive and
+    the final consensus, so streaming front ends can forward them.
+    """
     import random
     
-    # Get NFT data from sideinfo API and set global variables
-    global NFT_DATA, ACTUAL_VALUE, DATE_TO_PREDICT
-    NFT_DATA = get_nft_data(contract_address, token_id)
-    ACTUAL_VALUE, DATE_TO_PREDICT, NFT_DATA = accuracy_preparation(NFT_DATA)
+    # Get NFT data from sideinfo API; kept local so concurrent appraisals on
+    # the same event loop cannot see each other's data
+    nft_data = await asyncio.to_thread(get_nft_data, contract_address, token_id)
+    latest_value, _, nft_data = accuracy_preparation(nft_data)
+    if actual_value is None:
+        actual_value = latest_value
     
     # Load API key from environment variable
     api_key = os.environ.get("OPEN_ROUTER_API_KEY", "")
@@ -659,7 +571,7 @@ async def run_confidence_consensus(contract_address, token_id, date_to_predict=N
     settings = Settings()
     
     # Create paths for configuration and data
-    config_path = Path("config")
+    config_path = Path(__file__).parent / "config"
     config_path.mkdir(exist_ok=True)
     
     # Load or create the consensus configuration
@@ -675,12 +587,18 @@ async def run_confidence_consensus(contract_address, token_id, date_to_predict=N
         base_url=settings.open_router_base_url
     )
     
-    # Patch the provider for better logging
-    provider = await patch_provider_for_logging(provider)
+    # Register per-model timeout, retry and hedging policies
+    provider.configure_models([
+        *settings.consensus_config.models,
+        settings.consensus_config.aggregator_config.model,
+    ])
+    
+    # Log every model request and response made by the router
+    provider.add_observer(log_router_event)
     
     # Use the most recent date from sales history if date_to_predict is not provided
-    if not date_to_predict and NFT_DATA.get("sales_history"):
-        most_recent_date = NFT_DATA["sales_history"][0]["date"]
+    if not date_to_predict and nft_data.get("sales_history"):
+        most_recent_date = nft_data["sales_history"][0]["date"]
         date_to_predict = datetime.strptime(most_recent_date, "%Y-%m-%d %H:%M:%S").strftime("%B, %Y")
     
     # Define the NFT appraisal conversation
@@ -737,7 +655,7 @@ async def run_confidence_consensus(contract_address, token_id, date_to_predict=N
         },
         {
             "role": "user",
-            "content": f"Your entire response/output is going to consist of a single JSON object, and you will NOT wrap it within JSON md markers. Here is the sample data: {NFT_DATA}."
+            "content": f"Your entire response/output is going to consist of a single JSON object, and you will NOT wrap it within JSON md markers. Here is the sample data: {nft_data}."
         }
     ]
     
@@ -751,48 +669,52 @@ async def run_confidence_consensus(contract_address, token_id, date_to_predict=N
     aggregator_model = settings.consensus_config.aggregator_config.model
     print_colored(f"Aggregator: {aggregator_model.model_id} (max_tokens: {aggregator_model.max_tokens})", "yellow")
     
+    confidence = None
     try:
-        # Step 1: Get initial model responses
-        print_colored("\nGetting initial model responses...", "magenta")
-        logger.info("Starting initial model response collection")
-        initial_responses = await send_initial_round(
-            provider=provider,
-            consensus_config=settings.consensus_config,
-            initial_conversation=nft_appraisal_conversation
-        )
-        
-        # Display individual responses
-        format_and_print_responses(initial_responses, "<INITIAL MODEL RESPONSES>")
-        logger.info("Initial responses collected", model_count=len(initial_responses))
-        
-        # Step 2: Select a challenge prompt
+        # Step 1: Select a challenge prompt
         challenge_prompt = random.choice(CHALLENGE_PROMPTS)
         print_colored(f"\nSelected challenge prompt: '{challenge_prompt}'", "blue")
         
-        # Step 3: Send challenge to all models, including their original responses
-        print_colored("\nSending challenge prompt to all models...", "magenta")
-        challenge_responses = await send_challenge_round(
+        # Step 2: Run each model's initial -> challenge pipeline concurrently;
+        # a model is challenged as soon as its own initial answer is in
+        print_colored("\nGetting initial and challenge responses from all models...", "magenta")
+        logger.info("Starting model response collection")
+        # In "logprobs" mode, models returning logprobs are scored from their
+        # initial price tokens and skip the challenge round
+        logprob_scores = {} if settings.consensus_config.confidence_mode == "logprobs" else None
+        initial_responses, challenge_responses = await run_model_pipelines(
             provider=provider,
             consensus_config=settings.consensus_config,
             initial_conversation=nft_appraisal_conversation,
             challenge_prompt=challenge_prompt,
-            initial_responses=initial_responses
+            on_event=on_event,
+            logprob_scores=logprob_scores
         )
         
-        # Display challenge responses
+        # Step 3: Display the collected responses
+        format_and_print_responses(initial_responses, "<INITIAL MODEL RESPONSES>")
+        logger.info("Initial responses collected", model_count=len(initial_responses))
         format_and_print_responses(challenge_responses, "<CHALLENGE RESPONSES>")
         
         # Step 4: Analyze how models respond to the challenge
         print_colored("\nAnalyzing model responses to challenge...", "magenta")
-        analysis = await analyze_model_responses(initial_responses, challenge_responses)
+        confidence_matrix = await analyze_model_responses(
+            initial_responses, challenge_responses, logprob_scores
+        )
+        analysis = confidence_matrix.analysis()
+        confidence = confidence_matrix.to_dict()
         
         # Step 5: Perform weighted aggregation
         print_colored("\nPerforming weighted aggregation...", "magenta")
         final_consensus = await weighted_aggregation(
             provider=provider,
             aggregator_config=settings.consensus_config.aggregator_config,
-            model_responses=challenge_responses,
-            analysis=analysis
+            model_responses={
+                model_id: challenge_responses.get(model_id, initial_responses[model_id])
+                for model_id in analysis
+            },
+            analysis=analysis,
+            actual_value=actual_value
         )
         
         # Display the final consensus result
@@ -804,6 +726,10 @@ async def run_confidence_consensus(contract_address, token_id, date_to_predict=N
         
         print_colored("\n" + "=" * 80, "green")
         
+        # Report how much of the prompt input was served from provider caches
+        for model_id, stats in provider.prompt_cache_stats().items():
+            print_colored(f"Prompt cache {model_id}: {stats['cached_tokens']}/{stats['prompt_tokens']} tokens cached", "cyan")
+        
         # Save the results to a file
         results_dir = Path("results")
         results_dir.mkdir(exist_ok=True)
@@ -815,20 +741,34 @@ async def run_confidence_consensus(contract_address, token_id, date_to_predict=N
         
         print_colored(f"\nSaved consensus result to {results_file}", "green")
         
+        if on_event is not None:
+            on_event("final_consensus", {"result": final_consensus})
         
     except Exception as e:
         print_colored(f"Error during consensus process: {e}", "red")
+        if on_event is not None:
+            on_event("error", {"stage": "consensus", "message": str(e)})
         import traceback
         traceback.print_exc()
+        return {"error": f"Consensus failed: {e}"}
     finally:
         # Close the provider's HTTP client
         await provider.close()
 
     # Return the final consensus result as JSON
     try:
-        return json.loads(final_consensus)
-    except:
+        result = json.loads(final_consensus)
+    except json.JSONDecodeError:
         return {"error": "Failed to parse final consensus result"}
+    if isinstance(result, dict) and confidence is not None:
+        result["confidence"] = confidence
+    return result
+
+# Router latency, token and cost metrics in the Prometheus text format
+@app.route('/metrics', methods=['GET'])
+def metrics():
+    return Response(render_metrics(), mimetype="text/plain; version=0.0.4")
+
 
 # Add Flask route to handle API requests
 @app.route('/confidence_appraise', methods=['GET'])
@@ -840,8 +780,8 @@ def nft_appraisal():
         return jsonify({"error": "Missing contract_address or token_id parameters"}), 400
     
     try:
-        # Run the consensus process asynchronously
-        result = asyncio.run(run_confidence_consensus(
+        # Run the consensus process on the shared background event loop
+        result = background_loop.run(run_confidence_consensus(
             contract_address=contract_address,
             token_id=token_id,
         ))
@@ -853,9 +793,8 @@ def nft_appraisal():
 def main():
     # Set the port from environment variable or use default
     port = int(os.environ.get('PORT', 8082))
+    background_loop.run(prewarm_connections())
     app.run(debug=True, host='0.0.0.0', port=port)
 
 if __name__ == "__main__":
-    # Import needed modules for statistics
-    import statistics
     main()
\ No newline at end of file
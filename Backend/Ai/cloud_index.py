@@ -7,15 +7,25 @@ import random
 import statistics
 from pathlib import Path
 import textwrap
-import aiohttp
-from flask import Flask, request, jsonify
+from flask import Flask, request, jsonify, Response
 from flask_cors import CORS
 
-from flare_ai_consensus.router import AsyncOpenRouterProvider
+from flare_ai_consensus.router import (
+    AsyncOpenRouterProvider,
+    get_aiohttp_session,
+    prewarm_connections,
+    render_metrics,
+)
 from flare_ai_consensus.consensus import send_round
+from flare_ai_consensus.consensus.convergence import has_converged
 from flare_ai_consensus.consensus.aggregator import async_centralized_llm_aggregator
 from flare_ai_consensus.settings import Settings, Message
-from flare_ai_consensus.utils import load_json, parse_chat_response
+from flare_ai_consensus.utils import (
+    background_loop,
+    extract_price,
+    load_json,
+    parse_chat_response,
+)
 from datetime import datetime
 
 from dotenv import load_dotenv
@@ -73,51 +83,6 @@ def format_and_print_responses(responses, title="Model Responses"):
         print_colored(f"{'-' * terminal_width}", "blue")
 
 
-def extract_price_from_text(text):
-    """Extract the price from a response text or JSON string"""
-    if not isinstance(text, str):
-        if isinstance(text, dict) and "price" in text:
-            return float(text["price"])
-        elif isinstance(text, dict) and "predicted_price" in text:
-            return float(text["predicted_price"])
-        text = str(text)
-        
-    # First try to parse as JSON
-    try:
-        # Remove JSON code block markers if present
-        if text.strip().startswith("```json"):
-            text = re.sub(r'```json\s*|\s*```', '', text)
-        
-        # Try parsing the text as JSON
-        data = json.loads(text)
-        if isinstance(data, dict):
-            if "price" in data:
-                return float(data["price"])
-            elif "predicted_price" in data:
-                return float(data["predicted_price"])
-            elif "predicted_price_USD" in data:
-                return float(data["predicted_price_USD"])
-    except (json.JSONDecodeError, ValueError, TypeError):
-        pass
-    
-    # If JSON parsing fails, try regular expression pattern matching
-    try:
-        # Look for "price": 1234.56 or "predicted_price": 1234.56
-        price_match = re.search(r'"(?:price|predicted_price|predicted_price_USD)"\s*:\s*([0-9,]+\.?[0-9]*)', text)
-        if price_match:
-            return float(price_match.group(1).replace(',', ''))
-        
-        # Also try looking for dollar amounts
-        dollar_match = re.search(r'\$([0-9,]+\.?[0-9]*)', text)
-        if dollar_match:
-            return float(dollar_match.group(1).replace(',', ''))
-    except (ValueError, AttributeError):
-        pass
-    
-    # Return None if no price was found
-    return None
-
-
 def calculate_confidence(std_dev, prices):
     """Calculate a confidence score based on standard deviation relative to mean"""
     if not prices or len(prices) < 2:
@@ -136,17 +101,10 @@ def calculate_confidence(std_dev, prices):
     return max(0.1, min(0.9, confidence))
 
 
-async def patch_provider_for_logging(provider):
-    """Patch the provider's _post method to log request/response details"""
-    original_post = provider._post
-    
-    async def logged_post(endpoint, json_payload):
-        print_colored(f"Request to {endpoint}: max_tokens={json_payload.get('max_tokens')}", "blue")
-        response = await original_post(endpoint, json_payload)
-        return response
-    
-    provider._post = logged_post
-    return provider
+def log_router_event(event_type, data):
+    """Print each model request made by the router"""
+    if event_type == "model_request":
+        print_colored(f"Request to {data['endpoint']}: max_tokens={data['max_tokens']}", "blue")
 
 
 async def run_consensus_with_data(
@@ -169,6 +127,7 @@ async def run_consensus_with_data(
     # Dictionary to store all responses and aggregations
     response_data = {}
     response_data["initial_conversation"] = initial_conversation
+    aggregation = None
 
     # Step 1: Initial round
     print_colored("Running initial round of consensus...", "blue")
@@ -177,9 +136,10 @@ async def run_consensus_with_data(
     )
     
     try:
-        aggregated_response = await async_centralized_llm_aggregator(
+        aggregation = await async_centralized_llm_aggregator(
             provider, consensus_config.aggregator_config, responses
         )
+        aggregated_response = aggregation.text
         print_colored("Initial aggregation complete", "blue")
     except IndexError:
         # Handle the case where the aggregator fails to return a proper response
@@ -188,19 +148,11 @@ async def run_consensus_with_data(
         prices = []
         explanations = []
         for model_id, response in responses.items():
-            price = extract_price_from_text(response)
-            if price is not None:
-                prices.append(price)
-            
-            # Try to extract explanation
-            try:
-                if isinstance(response, str) and response.strip().startswith("```json"):
-                    cleaned = re.sub(r'```json\s*|\s*```', '', response)
-                    data = json.loads(cleaned)
-                    if "explanation" in data:
-                        explanations.append(data["explanation"])
-            except:
-                pass
+            # Prices and explanations were parsed when the responses arrived
+            if response.price is not None:
+                prices.append(response.price)
+            if response.explanation:
+                explanations.append(response.explanation)
         
         # Calculate average price if any prices were found
         avg_price = statistics.mean(prices) if prices else 0
@@ -218,17 +170,23 @@ async def run_consensus_with_data(
     response_data["iteration_0"] = responses
     response_data["aggregate_0"] = aggregated_response
 
-    # Step 2: Improvement rounds
+    # Step 2: Improvement rounds, until the model prices converge
+    rounds_run = 0
     for i in range(consensus_config.iterations):
+        if has_converged(responses, consensus_config):
+            print_colored(f"Model prices converged, skipping remaining {consensus_config.iterations - i} round(s)", "green")
+            break
+        rounds_run += 1
         print_colored(f"Running improvement round {i+1}...", "blue")
         responses = await send_round(
             provider, consensus_config, initial_conversation, aggregated_response
         )
         
         try:
-            aggregated_response = await async_centralized_llm_aggregator(
+            aggregation = await async_centralized_llm_aggregator(
                 provider, consensus_config.aggregator_config, responses
             )
+            aggregated_response = aggregation.text
             print_colored(f"Improvement round {i+1} complete", "blue")
         except IndexError:
             # Handle aggregation failure in improvement rounds
@@ -240,6 +198,10 @@ async def run_consensus_with_data(
         response_data[f"iteration_{i + 1}"] = responses
         response_data[f"aggregate_{i + 1}"] = aggregated_response
 
+    response_data["rounds_run"] = rounds_run
+    response_data["rounds_saved"] = consensus_config.iterations - rounds_run
+    response_data["aggregation"] = aggregation.report() if aggregation else None
+
     # Return both the final consensus and all response data
     return aggregated_response, response_data
 
@@ -260,8 +222,8 @@ async def fetch_nft_data(contract_address: str, token_id: str):
     # Now import using relative path
     from Backend.Ai.Sideinfo_api.sideinfo import main
     
-    # Call the main function directly
-    return main(contract_address, token_id)
+    # Call the blocking main function off the event loop
+    return await asyncio.to_thread(main, contract_address, token_id)
 
 
 async def fetch_ethereum_price():
@@ -272,12 +234,12 @@ async def fetch_ethereum_price():
         "vs_currencies": "usd"
     }
     
-    async with aiohttp.ClientSession() as session:
-        async with session.get(url, params=params) as response:
-            if response.status != 200:
-                raise Exception(f"CoinGecko API request failed with status {response.status}")
-            data = await response.json()
-            return data["ethereum"]["usd"]
+    session = get_aiohttp_session()
+    async with session.get(url, params=params) as response:
+        if response.status != 200:
+            raise Exception(f"CoinGecko API request failed with status {response.status}")
+        data = await response.json()
+        return data["ethereum"]["usd"]
 
 
 async def process_nft_appraisal(contract_address: str, token_id: str):
@@ -302,7 +264,7 @@ async def process_nft_appraisal(contract_address: str, token_id: str):
     settings = Settings()
     
     # Create paths for configuration and data
-    config_path = Path("config")
+    config_path = Path(__file__).parent / "config"
     config_path.mkdir(exist_ok=True)
     
     # Load or create the consensus configuration
@@ -319,8 +281,14 @@ async def process_nft_appraisal(contract_address: str, token_id: str):
         base_url=settings.open_router_base_url
     )
     
-    # Patch the provider for better logging
-    provider = await patch_provider_for_logging(provider)
+    # Register per-model timeout, retry and hedging policies
+    provider.configure_models([
+        *settings.consensus_config.models,
+        settings.consensus_config.aggregator_config.model,
+    ])
+    
+    # Log every model request and response made by the router
+    provider.add_observer(log_router_event)
     
     content_prompt = """You are an expert at conducting NFT appraisals, and your goal is to output the price in USD value of the NFT at this specific date, which is $$$$$$. You will be given pricing history and other metadata about the NFT and will have to extrapolate and analyze the trends from the data. Your response MUST be in JSON format starting with a single value of price in USD, followed by a detailed explanation of your reasoning.
 
@@ -408,7 +376,7 @@ async def process_nft_appraisal(contract_address: str, token_id: str):
         # Extract price estimates from individual responses
         initial_prices = {}
         for model_id, response in individual_responses.items():
-            price = extract_price_from_text(response)
+            price = response.price
             if price is not None:
                 initial_prices[model_id] = price
                 print_colored(f"Extracted price from {model_id}: ${price:.2f}", "green")
@@ -446,10 +414,10 @@ async def process_nft_appraisal(contract_address: str, token_id: str):
         print_colored("\n" + "=" * 80, "green")
         
         # Extract final price from consensus result
-        final_consensus_price = extract_price_from_text(consensus_result)
+        final_consensus_price = extract_price(consensus_result)
         
         # Get final model responses from the last iteration of consensus
-        final_iteration = settings.consensus_config.iterations
+        final_iteration = all_responses_data.get("rounds_run", settings.consensus_config.iterations)
         if final_iteration > 0 and f"iteration_{final_iteration}" in all_responses_data:
             final_responses = all_responses_data[f"iteration_{final_iteration}"]
             print_colored(f"\nUsing responses from iteration {final_iteration} for statistics", "magenta")
@@ -465,7 +433,7 @@ async def process_nft_appraisal(contract_address: str, token_id: str):
         final_prices = {}
         for model_id, response in final_responses.items():
             if response:  # Only process non-empty responses
-                price = extract_price_from_text(response)
+                price = response.price
                 if price is not None:
                     final_prices[model_id] = price
                     print_colored(f"Extracted final price from {model_id}: ${price:.2f}", "green")
@@ -526,6 +494,9 @@ async def process_nft_appraisal(contract_address: str, token_id: str):
             "standard_deviation": final_std_dev,
             "total_confidence": final_confidence_score,
             "ethereum_price_usd":  final_consensus_price / eth_price if eth_price > 0 else 0,
+            "rounds_saved": all_responses_data.get("rounds_saved", 0),
+            "prompt_cache": provider.prompt_cache_stats(),
+            "aggregation": all_responses_data.get("aggregation"),
         }
         
         error_accuracy = abs(final_output["price"] - ACTUAL_VALUE) / ACTUAL_VALUE 
@@ -578,6 +549,12 @@ async def process_nft_appraisal(contract_address: str, token_id: str):
         await provider.close()
 
 
+# Router latency, token and cost metrics in the Prometheus text format
+@app.route('/metrics', methods=['GET'])
+def metrics():
+    return Response(render_metrics(), mimetype="text/plain; version=0.0.4")
+
+
 # Flask route for the API
 @app.route('/centralized_appraise', methods=['GET'])
 def appraise_nft_api():
@@ -596,8 +573,8 @@ def appraise_nft_api():
                 "total_confidence": 0
             }), 400
         
-        # Run the async processing in a new event loop
-        result_json = asyncio.run(process_nft_appraisal(contract_address, token_id))
+        # Run the async processing on the shared background event loop
+        result_json = background_loop.run(process_nft_appraisal(contract_address, token_id))
         
         # Parse the result back to a dictionary
         result = json.loads(result_json)
@@ -625,12 +602,16 @@ if __name__ == "__main__":
         # Run as API server
         port = int(sys.argv[2]) if len(sys.argv) > 2 else 8080
         print_colored(f"Starting API server on port {port}...", "green")
+        background_loop.run(prewarm_connections())
         app.run(host='0.0.0.0', port=8080)
     elif len(sys.argv) == 3:
         # Run as CLI
         contract_address = sys.argv[1]
         token_id = sys.argv[2]
-        result = asyncio.run(process_nft_appraisal(contract_address, token_id))
+        try:
+            result = background_loop.run(process_nft_appraisal(contract_address, token_id))
+        finally:
+            background_loop.stop()
         print_colored("\nProgram completed.", "green")
     else:
         print("Usage:")
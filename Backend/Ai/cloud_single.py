@@ -6,13 +6,17 @@ import re
 import statistics
 from pathlib import Path
 import textwrap
-import aiohttp
-from flask import Flask, request, jsonify
+from flask import Flask, request, jsonify, Response
 from flask_cors import CORS
 
-from flare_ai_consensus.router import AsyncOpenRouterProvider
+from flare_ai_consensus.router import (
+    AsyncOpenRouterProvider,
+    get_aiohttp_session,
+    prewarm_connections,
+    render_metrics,
+)
 from flare_ai_consensus.settings import Settings, Message
-from flare_ai_consensus.utils import load_json
+from flare_ai_consensus.utils import background_loop, extract_price, load_json
 from datetime import datetime
 
 from dotenv import load_dotenv
@@ -51,51 +55,6 @@ def print_colored(text, color=None):
         print(text)
 
 
-def extract_price_from_text(text):
-    """Extract the price from a response text or JSON string"""
-    if not isinstance(text, str):
-        if isinstance(text, dict) and "price" in text:
-            return float(text["price"])
-        elif isinstance(text, dict) and "predicted_price" in text:
-            return float(text["predicted_price"])
-        text = str(text)
-        
-    # First try to parse as JSON
-    try:
-        # Remove JSON code block markers if present
-        if text.strip().startswith("```json"):
-            text = re.sub(r'```json\s*|\s*```', '', text)
-        
-        # Try parsing the text as JSON
-        data = json.loads(text)
-        if isinstance(data, dict):
-            if "price" in data:
-                return float(data["price"])
-            elif "predicted_price" in data:
-                return float(data["predicted_price"])
-            elif "predicted_price_USD" in data:
-                return float(data["predicted_price_USD"])
-    except (json.JSONDecodeError, ValueError, TypeError):
-        pass
-    
-    # If JSON parsing fails, try regular expression pattern matching
-    try:
-        # Look for "price": 1234.56 or "predicted_price": 1234.56
-        price_match = re.search(r'"(?:price|predicted_price|predicted_price_USD)"\s*:\s*([0-9,]+\.?[0-9]*)', text)
-        if price_match:
-            return float(price_match.group(1).replace(',', ''))
-        
-        # Also try looking for dollar amounts
-        dollar_match = re.search(r'\$([0-9,]+\.?[0-9]*)', text)
-        if dollar_match:
-            return float(dollar_match.group(1).replace(',', ''))
-    except (ValueError, AttributeError):
-        pass
-    
-    # Return None if no price was found
-    return None
-
-
 def extract_confidence_from_text(text):
     """Extract the confidence level from a response text or JSON string"""
     if not isinstance(text, str):
@@ -137,17 +96,10 @@ def extract_confidence_from_text(text):
     return None
 
 
-async def patch_provider_for_logging(provider):
-    """Patch the provider's _post method to log request/response details"""
-    original_post = provider._post
-    
-    async def logged_post(endpoint, json_payload):
-        print_colored(f"Request to {endpoint}: max_tokens={json_payload.get('max_tokens')}", "blue")
-        response = await original_post(endpoint, json_payload)
-        return response
-    
-    provider._post = logged_post
-    return provider
+def log_router_event(event_type, data):
+    """Print each model request made by the router"""
+    if event_type == "model_request":
+        print_colored(f"Request to {data['endpoint']}: max_tokens={data['max_tokens']}", "blue")
 
 
 async def fetch_nft_data(contract_address: str, token_id: str):
@@ -166,8 +118,8 @@ async def fetch_nft_data(contract_address: str, token_id: str):
     # Now import using relative path
     from Backend.Ai.Sideinfo_api.sideinfo import main
     
-    # Call the main function directly
-    return main(contract_address, token_id)
+    # Call the blocking main function off the event loop
+    return await asyncio.to_thread(main, contract_address, token_id)
 
 
 async def fetch_ethereum_price():
@@ -178,12 +130,12 @@ async def fetch_ethereum_price():
         "vs_currencies": "usd"
     }
     
-    async with aiohttp.ClientSession() as session:
-        async with session.get(url, params=params) as response:
-            if response.status != 200:
-                raise Exception(f"CoinGecko API request failed with status {response.status}")
-            data = await response.json()
-            return data["ethereum"]["usd"]
+    session = get_aiohttp_session()
+    async with session.get(url, params=params) as response:
+        if response.status != 200:
+            raise Exception(f"CoinGecko API request failed with status {response.status}")
+        data = await response.json()
+        return data["ethereum"]["usd"]
 
 
 async def query_single_llm(provider, model_id, messages, max_tokens=2000):
@@ -245,8 +197,8 @@ async def process_nft_appraisal(contract_address: str, token_id: str):
             base_url="https://openrouter.ai/api/v1"
         )
         
-        # Patch the provider for better logging
-        provider = await patch_provider_for_logging(provider)
+        # Log every model request and response made by the router
+        provider.add_observer(log_router_event)
         
         # Use Llama model as default
         model_id = "google/gemini-2.0-flash-001"
@@ -340,7 +292,7 @@ async def process_nft_appraisal(contract_address: str, token_id: str):
         print_colored("\n" + "=" * 80, "cyan")
         
         # Extract the price and confidence from the response
-        price = extract_price_from_text(response)
+        price = extract_price(response)
         confidence = extract_confidence_from_text(response)
         
         if price is not None:
@@ -439,6 +391,12 @@ async def process_nft_appraisal(contract_address: str, token_id: str):
                 print_colored(f"Error closing provider: {e}", "yellow")
 
 
+# Router latency, token and cost metrics in the Prometheus text format
+@app.route('/metrics', methods=['GET'])
+def metrics():
+    return Response(render_metrics(), mimetype="text/plain; version=0.0.4")
+
+
 # Flask route for the API
 @app.route('/single_llm_appraisal', methods=['GET'])
 def appraise_nft_api():
@@ -457,8 +415,8 @@ def appraise_nft_api():
                 "accuracy": 0
             }), 400
         
-        # Run the async processing in a new event loop
-        result_json = asyncio.run(process_nft_appraisal(contract_address, token_id))
+        # Run the async processing on the shared background event loop
+        result_json = background_loop.run(process_nft_appraisal(contract_address, token_id))
         
         # Parse the result back to a dictionary
         result = json.loads(result_json)
@@ -487,12 +445,16 @@ if __name__ == "__main__":
         # Run as API server
         port = int(sys.argv[2]) if len(sys.argv) > 2 else 8080
         print_colored(f"Starting API server on port {port}...", "green")
+        background_loop.run(prewarm_connections())
         app.run(host='0.0.0.0', port=8083)
     elif len(sys.argv) == 3:
         # Run as CLI
         contract_address = sys.argv[1]
         token_id = sys.argv[2]
-        result = asyncio.run(process_nft_appraisal(contract_address, token_id))
+        try:
+            result = background_loop.run(process_nft_appraisal(contract_address, token_id))
+        finally:
+            background_loop.stop()
         print_colored("\nProgram completed.", "green")
     else:
         print("Usage:")
@@ -1,3 +1,16 @@
+from .routes.appraisal import AppraisalRouter, Appraiser
 from .routes.chat import ChatMessage, ChatRouter, router
+from .routes.jobs import AppraisalJobRequest, JobRouter
+from .routes.stream import StreamRouter, sse_events
 
-__all__ = ["ChatMessage", "ChatRouter", "router"]
+__all__ = [
+    "AppraisalJobRequest",
+    "AppraisalRouter",
+    "Appraiser",
+    "ChatMessage",
+    "ChatRouter",
+    "JobRouter",
+    "StreamRouter",
+    "router",
+    "sse_events",
+]
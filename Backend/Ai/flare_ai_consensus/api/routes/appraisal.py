@@ -0,0 +1,91 @@
+from collections.abc import Awaitable, Callable
+from typing import Any
+
+import structlog
+from fastapi import APIRouter, HTTPException
+
+from flare_ai_consensus.jobs import SchedulerSaturated, get_job_scheduler
+
+logger = structlog.get_logger(__name__)
+
+# An appraisal strategy: (contract address, token id) -> result dict, or its
+# JSON encoding, or None if the appraisal could not run
+Appraiser = Callable[[str, str], Awaitable[dict[str, Any] | str | None]]
+
+
+def saturated(e: SchedulerSaturated) -> HTTPException:
+    """Turn a refused submission into a 503 telling the client when to retry."""
+    return HTTPException(
+        status_code=503,
+        detail=str(e),
+        headers={"Retry-After": str(e.retry_after)},
+    )
+
+
+class AppraisalRouter:
+    """
+    Exposes NFT appraisal strategies as GET endpoints on the server loop.
+
+    Every strategy runs as a coroutine on the ASGI server's event loop, so
+    concurrent appraisals share the loop's pooled HTTP clients, rate limiter
+    and caches instead of each request paying for its own. Requests wait for
+    a worker of the job scheduler like submitted jobs do, so they count
+    against the same concurrency limit and are refused with 503 when its
+    queue is full.
+    """
+
+    def __init__(self, router: APIRouter, strategies: dict[str, Appraiser]) -> None:
+        """
+        Initialize the AppraisalRouter.
+
+        Args:
+            router (APIRouter): FastAPI router to attach endpoints.
+            strategies: appraisal coroutines keyed by their route path,
+                e.g. "/centralized_appraise".
+        """
+        self._router = router
+        self.strategies = strategies
+        self.logger = logger.bind(router="appraisal")
+        for path, appraise in strategies.items():
+            self._add_route(path, appraise)
+
+    def _add_route(self, path: str, appraise: Appraiser) -> None:
+        """
+        Register one strategy under `path`.
+        """
+
+        @self._router.get(path, name=path.strip("/"))
+        async def appraisal(  # pyright: ignore [reportUnusedFunction]
+            contract_address: str | None = None,
+            token_id: str | None = None,
+        ) -> dict[str, Any]:
+            """
+            Appraise an NFT and return the strategy's JSON result.
+            """
+            if not contract_address or not token_id:
+                raise HTTPException(
+                    status_code=400,
+                    detail="Missing contract_address or token_id parameter",
+                )
+            self.logger.info(
+                "appraisal requested",
+                strategy=path,
+                contract_address=contract_address,
+                token_id=token_id,
+            )
+            try:
+                job = await get_job_scheduler().run(
+                    path.strip("/"), appraise, contract_address, token_id
+                )
+            except SchedulerSaturated as e:
+                raise saturated(e) from e
+            if job.result is None:
+                raise HTTPException(
+                    status_code=500, detail=job.error or "Appraisal did not run"
+                )
+            return job.result
+
+    @property
+    def router(self) -> APIRouter:
+        """Return the underlying FastAPI router with registered endpoints."""
+        return self._router
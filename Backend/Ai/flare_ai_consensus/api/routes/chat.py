@@ -68,7 +68,7 @@ class ChatRouter:
                 ]
 
                 # Run consensus algorithm
-                answer = await run_consensus(
+                result = await run_consensus(
                     self.provider,
                     self.consensus_config,
                     initial_conversation,
@@ -78,8 +78,13 @@ class ChatRouter:
                 self.logger.exception("Chat processing failed", error=str(e))
                 raise HTTPException(status_code=500, detail=str(e)) from e
             else:
-                self.logger.info("Response generated", answer=answer)
-                return {"response": answer}
+                self.logger.info(
+                    "Response generated",
+                    answer=result.text,
+                    rounds_run=result.rounds_run,
+                    rounds_saved=result.rounds_saved,
+                )
+                return {"response": result.text}
 
     @property
     def router(self) -> APIRouter:
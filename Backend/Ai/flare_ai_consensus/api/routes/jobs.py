@@ -0,0 +1,119 @@
+from typing import Any
+
+import structlog
+from fastapi import APIRouter, HTTPException, Response
+from pydantic import BaseModel
+
+from flare_ai_consensus.api.routes.appraisal import Appraiser, saturated
+from flare_ai_consensus.jobs import SchedulerSaturated, get_job_scheduler
+
+logger = structlog.get_logger(__name__)
+
+
+class AppraisalJobRequest(BaseModel):
+    """
+    Pydantic model for appraisal job submissions.
+
+    Attributes:
+        contract_address (str): The NFT contract.
+        token_id (str): The NFT token.
+        strategy (str | None): Name of the appraisal strategy, e.g.
+            "confidence_appraise"; the first registered strategy if omitted.
+    """
+
+    contract_address: str
+    token_id: str
+    strategy: str | None = None
+
+
+class JobRouter:
+    """
+    Runs appraisals as jobs polled by the client.
+
+    Submitting returns a job id right away instead of holding the request
+    open for the whole multi-round run; the job waits for a worker of the
+    bounded scheduler and its result is fetched once it has finished. When
+    the queue is full, submissions are refused with 503 and Retry-After.
+    """
+
+    def __init__(self, router: APIRouter, strategies: dict[str, Appraiser]) -> None:
+        """
+        Initialize the JobRouter.
+
+        Args:
+            router (APIRouter): FastAPI router to attach endpoints.
+            strategies: appraisal coroutines keyed by their route path, e.g.
+                "/confidence_appraise"; jobs name them without the slash.
+        """
+        self._router = router
+        self.strategies = {
+            path.strip("/"): appraise for path, appraise in strategies.items()
+        }
+        self.logger = logger.bind(router="jobs")
+        self._setup_routes()
+
+    def _setup_routes(self) -> None:
+        """
+        Set up FastAPI routes for submitting, polling and cancelling jobs.
+        """
+
+        @self._router.post("/appraisals", status_code=202)
+        async def submit(  # pyright: ignore [reportUnusedFunction]
+            request: AppraisalJobRequest, response: Response
+        ) -> dict[str, Any]:
+            """
+            Queue an appraisal and return its job id.
+            """
+            strategy = request.strategy or next(iter(self.strategies))
+            appraise = self.strategies.get(strategy)
+            if appraise is None:
+                raise HTTPException(
+                    status_code=400,
+                    detail=f"Unknown strategy {strategy!r}, expected one of "
+                    f"{sorted(self.strategies)}",
+                )
+            scheduler = get_job_scheduler()
+            try:
+                job = scheduler.submit(
+                    strategy, appraise, request.contract_address, request.token_id
+                )
+            except SchedulerSaturated as e:
+                raise saturated(e) from e
+            response.headers["Location"] = f"/appraisals/{job.id}"
+            return {**job.to_dict(), "queue_position": scheduler.position(job)}
+
+        @self._router.get("/appraisals/{job_id}")
+        async def status(job_id: str) -> dict[str, Any]:  # pyright: ignore [reportUnusedFunction]
+            """
+            Return a job's status, and its result or error once finished.
+            """
+            scheduler = get_job_scheduler()
+            job = scheduler.get(job_id)
+            if job is None:
+                raise HTTPException(
+                    status_code=404, detail=f"Unknown or expired job: {job_id}"
+                )
+            data = job.to_dict()
+            if job.status == "queued":
+                data["queue_position"] = scheduler.position(job)
+            return data
+
+        @self._router.delete("/appraisals/{job_id}")
+        async def cancel(job_id: str) -> dict[str, Any]:  # pyright: ignore [reportUnusedFunction]
+            """
+            Cancel a queued or running job.
+            """
+            scheduler = get_job_scheduler()
+            job = scheduler.get(job_id)
+            if job is None:
+                raise HTTPException(
+                    status_code=404, detail=f"Unknown or expired job: {job_id}"
+                )
+            if scheduler.cancel(job_id):
+                self.logger.info("appraisal job cancelled", job_id=job_id)
+            return job.to_dict()
+
+    @property
+    def router(self) -> APIRouter:
+        """Return the underlying FastAPI router with registered endpoints."""
+        return self._router
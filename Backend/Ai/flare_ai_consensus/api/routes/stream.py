@@ -0,0 +1,166 @@
+import asyncio
+from collections.abc import AsyncIterator
+from contextlib import aclosing
+from datetime import datetime
+from typing import Any
+
+import structlog
+from fastapi import APIRouter, Header, HTTPException
+from fastapi.responses import StreamingResponse
+
+from flare_ai_consensus.api.routes.appraisal import Appraiser
+from flare_ai_consensus.streaming import (
+    EventChannel,
+    cancel_job,
+    cancel_when_abandoned,
+    format_sse,
+    get_channel_registry,
+    get_heartbeat,
+    parse_event_id,
+    run_job,
+)
+
+logger = structlog.get_logger(__name__)
+
+SSE_HEADERS = {
+    "Cache-Control": "no-cache",
+    "X-Accel-Buffering": "no",  # Disable nginx buffering
+}
+
+
+async def sse_events(channel: EventChannel, after: int = 0) -> AsyncIterator[str]:
+    """
+    Stream a job's channel as server-sent events.
+
+    :param channel: The job's channel.
+    :param after: Sequence number to resume after.
+    """
+    yield format_sse(
+        "connect",
+        {
+            "connected": True,
+            "job_id": channel.job_id,
+            "timestamp": datetime.now().isoformat(),
+        },
+    )
+    # Close the channel stream as soon as this one closes, so that a
+    # disconnecting client is detached right away
+    events = channel.astream(after, heartbeat=get_heartbeat())
+    async with aclosing(events):
+        async for event in events:
+            yield event
+
+
+class StreamRouter:
+    """
+    Streams appraisals as server-sent events from the server's event loop.
+
+    Appraisals run as tasks on the loop and publish into per-job channels;
+    subscribers await their channel instead of holding a thread, and idle
+    streams share one heartbeat timer, so open streams cost little more than
+    their socket. A job whose subscribers have all disconnected is cancelled
+    together with its outstanding model calls.
+    """
+
+    def __init__(self, router: APIRouter, strategies: dict[str, Appraiser]) -> None:
+        """
+        Initialize the StreamRouter.
+
+        Args:
+            router (APIRouter): FastAPI router to attach endpoints.
+            strategies: appraisal coroutines keyed by their route path, e.g.
+                "/appraise/stream"; they publish progress with `publish_event`.
+        """
+        self._router = router
+        self.strategies = strategies
+        self.jobs: dict[str, asyncio.Task[Any]] = {}
+        self.logger = logger.bind(router="stream")
+        for path, appraise in strategies.items():
+            self._add_route(path, appraise)
+
+    def start_job(
+        self, appraise: Appraiser, contract_address: str, token_id: str
+    ) -> EventChannel:
+        """
+        Start an appraisal task publishing into a new channel.
+
+        :param appraise: The appraisal strategy.
+        :param contract_address: The NFT contract.
+        :param token_id: The NFT token.
+        :return: The job's channel.
+        """
+        channel = get_channel_registry().create()
+        task = asyncio.create_task(
+            run_job(channel, appraise(contract_address, token_id)),
+            name=f"appraisal-{channel.job_id}",
+        )
+        # Keep a reference so the task is not garbage collected mid-run
+        self.jobs[channel.job_id] = task
+        task.add_done_callback(lambda _: self.jobs.pop(channel.job_id, None))
+        cancel_when_abandoned(channel, task)
+        self.logger.info("appraisal job started", job_id=channel.job_id)
+        return channel
+
+    async def cancel_jobs(self, reason: str = "shutdown") -> None:
+        """
+        Cancel every running job and wait for it to unwind.
+
+        :param reason: Cancellation reason recorded in the metrics.
+        """
+        registry = get_channel_registry()
+        tasks = list(self.jobs.items())
+        for job_id, task in tasks:
+            channel = registry.get(job_id)
+            if channel is not None:
+                cancel_job(channel, task, reason)
+            else:
+                task.cancel()
+        await asyncio.gather(*(task for _, task in tasks), return_exceptions=True)
+
+    def _add_route(self, path: str, appraise: Appraiser) -> None:
+        """
+        Register one streaming strategy under `path`.
+        """
+
+        @self._router.get(path, name=path.strip("/").replace("/", "_"))
+        async def stream(  # pyright: ignore [reportUnusedFunction]
+            contract_address: str | None = None,
+            token_id: str | None = None,
+            job_id: str | None = None,
+            last_event_id: str | None = None,
+            last_event_id_header: str | None = Header(None, alias="Last-Event-ID"),
+        ) -> StreamingResponse:
+            """
+            Start an appraisal, or attach to a running one, and stream it.
+
+            A reconnecting EventSource sends the Last-Event-ID header and
+            resumes its job after that event instead of starting a new one.
+            """
+            registry = get_channel_registry()
+            resume = parse_event_id(last_event_id_header or last_event_id)
+            channel, after = None, 0
+            if resume and job_id in (None, resume[0]):
+                channel, after = registry.get(resume[0]), resume[1]
+            if channel is None and job_id:
+                channel, after = registry.get(job_id), 0
+                if channel is None:
+                    raise HTTPException(
+                        status_code=404, detail=f"Unknown or expired job: {job_id}"
+                    )
+            if channel is None:
+                if not contract_address or not token_id:
+                    raise HTTPException(
+                        status_code=400,
+                        detail="Missing contract_address or token_id parameter",
+                    )
+                channel = self.start_job(appraise, contract_address, token_id)
+            return StreamingResponse(
+                sse_events(channel, after),
+                media_type="text/event-stream",
+                headers={**SSE_HEADERS, "X-Job-Id": channel.job_id},
+            )
+
+    @property
+    def router(self) -> APIRouter:
+        """Return the underlying FastAPI router with registered endpoints."""
+        return self._router
@@ -1,7 +1,8 @@
 from .aggregator import async_centralized_llm_aggregator, centralized_llm_aggregator
-from .consensus import run_consensus, send_round
+from .consensus import ConsensusResult, run_consensus, send_round
 
 __all__ = [
+    "ConsensusResult",
     "async_centralized_llm_aggregator",
     "centralized_llm_aggregator",
     "run_consensus",
@@ -0,0 +1,134 @@
+import json
+from collections.abc import Mapping
+from dataclasses import dataclass
+from typing import Literal
+
+import numpy as np
+
+from flare_ai_consensus.router import ModelResponse
+from flare_ai_consensus.settings import AggregatorConfig, ModelConfig
+
+AggregationTier = Literal["local", "fast", "main"]
+TRIM_PROPORTION = 0.2
+
+
+@dataclass(frozen=True, slots=True)
+class AggregationResult:
+    """
+    Aggregated response text and how it was produced.
+
+    :param text: The aggregated response.
+    :param tier: Aggregation tier that produced the response.
+    :param latency: Seconds spent aggregating.
+    :param dispersion: Price dispersion of the models that selected the tier.
+    """
+
+    text: str
+    tier: AggregationTier
+    latency: float
+    dispersion: float | None
+
+    def report(self) -> dict[str, str | float | None]:
+        """Return the aggregation details for the result JSON."""
+        return {
+            "tier": self.tier,
+            "latency_seconds": round(self.latency, 3),
+            "dispersion": self.dispersion,
+        }
+
+
+def select_tier(
+    dispersion: float | None, aggregator_config: AggregatorConfig
+) -> AggregationTier:
+    """
+    Pick the cheapest aggregation tier the models' disagreement allows.
+
+    :param dispersion: Coefficient of variation of the model prices.
+    :param aggregator_config: An instance of AggregatorConfig.
+    :return: "local" for a numeric aggregate without an LLM call, "fast" for
+        the small aggregator model, "main" for the configured aggregator.
+    """
+    if dispersion is None:
+        return "main"
+    local = aggregator_config.local_threshold
+    if local is not None and dispersion <= local:
+        return "local"
+    fast = aggregator_config.fast_threshold
+    if aggregator_config.fast_model is not None and fast is not None:
+        if dispersion <= fast:
+            return "fast"
+    return "main"
+
+
+def tier_model(
+    aggregator_config: AggregatorConfig, tier: AggregationTier
+) -> ModelConfig:
+    """Return the model that aggregates for an LLM tier."""
+    if tier == "fast" and aggregator_config.fast_model is not None:
+        return aggregator_config.fast_model
+    return aggregator_config.model
+
+
+def weighted_median(prices: list[float], weights: list[float]) -> float:
+    """
+    Return the price at which half of the total weight lies on either side.
+
+    :param prices: Price estimates.
+    :param weights: Non-negative weight of each estimate.
+    """
+    order = np.argsort(prices)
+    sorted_prices = np.asarray(prices, dtype=float)[order]
+    cumulative = np.cumsum(np.asarray(weights, dtype=float)[order])
+    index = np.searchsorted(cumulative, cumulative[-1] / 2)
+    return float(sorted_prices[index])
+
+
+def trimmed_mean(prices: list[float], proportion: float = TRIM_PROPORTION) -> float:
+    """
+    Mean of the prices after cutting `proportion` from each end.
+
+    :param prices: Price estimates.
+    :param proportion: Fraction trimmed from each tail.
+    """
+    values = np.sort(np.asarray(prices, dtype=float))
+    cut = int(len(values) * proportion)
+    return float(values[cut : len(values) - cut].mean())
+
+
+def local_aggregate(
+    responses: Mapping[str, ModelResponse],
+    prices: dict[str, float],
+    weights: dict[str, float] | None = None,
+) -> str:
+    """
+    Combine responses numerically when the models already agree.
+
+    Uses the weighted median of the prices when weights are given, otherwise
+    a trimmed mean. The explanation is taken from the model whose price is
+    closest to the aggregate.
+
+    :param responses: Parsed responses keyed by model ID.
+    :param prices: Extracted prices keyed by model ID.
+    :param weights: Optional confidence weights keyed by model ID.
+    :return: A JSON response in the aggregator's format.
+    """
+    model_ids = [m for m, p in prices.items() if p > 0]
+    values = [prices[m] for m in model_ids]
+    if weights:
+        price = weighted_median(values, [weights.get(m, 0.0) for m in model_ids])
+    else:
+        price = trimmed_mean(values)
+
+    closest = min(model_ids, key=lambda m: abs(prices[m] - price))
+    explanation = responses[closest].explanation
+    return json.dumps(
+        {
+            "price": round(price, 2),
+            "explanation": (
+                f"{len(values)} models agreed closely, so their estimates were "
+                f"combined directly. {explanation}"
+            ).strip(),
+        }
+    )
+
+
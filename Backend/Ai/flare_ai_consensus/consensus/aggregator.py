@@ -1,16 +1,32 @@
+import time
+from collections.abc import Mapping
+
+import structlog
+
+from flare_ai_consensus.consensus.adaptive import (
+    AggregationResult,
+    AggregationTier,
+    local_aggregate,
+    select_tier,
+    tier_model,
+)
+from flare_ai_consensus.consensus.convergence import price_dispersion, response_prices
 from flare_ai_consensus.router import (
     AsyncOpenRouterProvider,
     ChatRequest,
+    ModelResponse,
     OpenRouterProvider,
 )
 from flare_ai_consensus.settings import AggregatorConfig, Message
 
+logger = structlog.get_logger(__name__)
 
-def _concatenate_aggregator(responses: dict[str, str]) -> str:
+
+def _concatenate_aggregator(responses: Mapping[str, str | ModelResponse]) -> str:
     """
     Aggregate responses by concatenating each model's answer with a label.
 
-    :param responses: A dictionary mapping model IDs to their response texts.
+    :param responses: A dictionary mapping model IDs to their responses.
     :return: A single aggregated string.
     """
     return "\n\n".join([f"{model}: {text}" for model, text in responses.items()])
@@ -57,29 +73,58 @@ def centralized_llm_aggregator(
 async def async_centralized_llm_aggregator(
     provider: AsyncOpenRouterProvider,
     aggregator_config: AggregatorConfig,
-    aggregated_responses: dict[str, str],
-) -> str:
+    aggregated_responses: Mapping[str, ModelResponse],
+) -> AggregationResult:
     """
     Use a centralized LLM (via an async provider) to combine responses.
 
+    The aggregation tier follows the price dispersion of the responses: close
+    agreement is resolved locally with a trimmed mean, moderate disagreement
+    by `aggregator_config.fast_model` and the rest by `aggregator_config.model`.
+
     :param provider: An asynchronous OpenRouterProvider.
     :param aggregator_config: An instance of AggregatorConfig.
-    :param aggregated_responses: A string containing aggregated
-        responses from individual models.
-    :return: The aggregator's combined response as a string.
+    :param aggregated_responses: The parsed responses of the individual
+        models keyed by model ID.
+    :return: The aggregator's combined response as a string, annotated with
+        the tier used and its latency.
     """
+    start = time.perf_counter()
+    prices = response_prices(aggregated_responses)
+    dispersion = price_dispersion(prices.values())
+    tier = select_tier(dispersion, aggregator_config)
+    if tier == "local":
+        text = local_aggregate(aggregated_responses, prices)
+    else:
+        text = await _llm_aggregate(
+            provider, aggregator_config, aggregated_responses, tier
+        )
+    result = AggregationResult(text, tier, time.perf_counter() - start, dispersion)
+    logger.info("aggregation complete", **result.report())
+    return result
+
+
+async def _llm_aggregate(
+    provider: AsyncOpenRouterProvider,
+    aggregator_config: AggregatorConfig,
+    aggregated_responses: Mapping[str, ModelResponse],
+    tier: AggregationTier,
+) -> str:
+    """Ask the aggregator model of `tier` to combine the responses."""
+    model = tier_model(aggregator_config, tier)
+    texts = {
+        model_id: str(response) for model_id, response in aggregated_responses.items()
+    }
     messages = []
     messages.extend(aggregator_config.context)
-    messages.append(
-        {"role": "system", "content": f"Aggregated responses:\n{aggregated_responses}"}
-    )
+    messages.append({"role": "system", "content": f"Aggregated responses:\n{texts}"})
     messages.extend(aggregator_config.prompt)
 
     payload: ChatRequest = {
-        "model": aggregator_config.model.model_id,
+        "model": model.model_id,
         "messages": messages,
-        "max_tokens": aggregator_config.model.max_tokens,
-        "temperature": aggregator_config.model.temperature,
+        "max_tokens": model.max_tokens,
+        "temperature": model.temperature,
     }
 
     response = await provider.send_chat_completion(payload)
@@ -5,20 +5,68 @@ Confidence-based consensus package.
 from .confidence_aggregator import async_weighted_llm_aggregator, select_challenge_prompts
 from .confidence_consensus import run_confident_consensus, send_round, send_challenge_round
 from .confidence_embeddings import (
+    async_calculate_confidence_score,
+    async_calculate_text_similarity,
+    async_get_embeddings,
     calculate_confidence_score, 
     extract_price_and_explanation, 
-    calculate_text_similarity
+    calculate_text_similarity,
+    get_embedding_service,
+)
+from .confidence_matrix import (
+    ConfidenceMatrix,
+    async_confidence_matrix,
+    confidence_matrix,
+    cosine_similarity_matrix,
 )
 from .confidence_prompts import CHALLENGE_PROMPTS
+from .embedding_cache import EmbeddingCache, SQLiteEmbeddingStore, get_embedding_cache
+from .embedding_service import AsyncEmbeddingService
+from .shapley import (
+    CoalitionValues,
+    consensus_value_function,
+    exact_shapley,
+    sampled_shapley,
+    shapley_values,
+    shapley_weights,
+)
+from .local_embeddings import HashedTfidfEmbedder, get_local_embedder
+from .logprob_confidence import logprob_confidence, price_token_confidence
+from .similarity_cascade import SimilarityCascade, get_similarity_cascade, normalize_text
 
 __all__ = [
+    "AsyncEmbeddingService",
+    "async_calculate_confidence_score",
+    "async_calculate_text_similarity",
+    "async_confidence_matrix",
+    "async_get_embeddings",
     "async_weighted_llm_aggregator",
     "calculate_confidence_score",
     "calculate_text_similarity",
     "CHALLENGE_PROMPTS",
+    "CoalitionValues",
+    "ConfidenceMatrix",
+    "confidence_matrix",
+    "consensus_value_function",
+    "cosine_similarity_matrix",
+    "EmbeddingCache",
+    "exact_shapley",
     "extract_price_and_explanation",
+    "get_embedding_cache",
+    "get_embedding_service",
+    "get_local_embedder",
+    "get_similarity_cascade",
+    "HashedTfidfEmbedder",
+    "logprob_confidence",
+    "normalize_text",
+    "price_token_confidence",
     "run_confident_consensus",
+    "sampled_shapley",
     "select_challenge_prompts",
     "send_challenge_round",
     "send_round",
+    "shapley_values",
+    "shapley_weights",
+    "SimilarityCascade",
+    "SQLiteEmbeddingStore",
 ]
\ No newline at end of file
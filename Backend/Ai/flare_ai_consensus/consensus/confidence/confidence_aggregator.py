@@ -2,31 +2,36 @@
 
 import asyncio
 import random
-from typing import Dict, List
+import time
+from typing import Dict, List, Optional
 
+import numpy as np
 import structlog
 
-from flare_ai_consensus.router import AsyncOpenRouterProvider, ChatRequest
+from flare_ai_consensus.router import AsyncOpenRouterProvider, ChatRequest, ModelResponse
 from flare_ai_consensus.settings import AggregatorConfig
 
-# Import from confidence package
-from flare_ai_consensus.consensus.confidence.confidence_embeddings import (
-    calculate_confidence_score, extract_price_and_explanation
+from flare_ai_consensus.consensus.adaptive import (
+    AggregationResult, local_aggregate, select_tier, tier_model
 )
+from flare_ai_consensus.consensus.convergence import price_dispersion, response_prices
+
+# Import from confidence package
+from flare_ai_consensus.consensus.confidence.confidence_matrix import async_confidence_matrix
 from flare_ai_consensus.consensus.confidence.confidence_prompts import CHALLENGE_PROMPTS
 
 logger = structlog.get_logger(__name__)
 
 
 def _concatenate_weighted_aggregator(
-    responses: Dict[str, str], 
+    responses: Dict[str, ModelResponse], 
     weights: Dict[str, float]
 ) -> str:
     """
     Aggregate responses with weights.
 
     Args:
-        responses: A dictionary mapping model IDs to their response texts.
+        responses: A dictionary mapping model IDs to their parsed responses.
         weights: A dictionary mapping model IDs to their confidence scores.
     Returns:
         A single aggregated string with weight information.
@@ -34,7 +39,7 @@ def _concatenate_weighted_aggregator(
     weighted_responses = []
     for model_id, response in responses.items():
         weight = weights.get(model_id, 0.333)  # Default weight if not found
-        price, _ = extract_price_and_explanation(response)
+        price = response.price or 0.0
         
         # Include price and weight information
         weighted_responses.append(
@@ -47,59 +52,76 @@ def _concatenate_weighted_aggregator(
 async def async_weighted_llm_aggregator(
     provider: AsyncOpenRouterProvider,
     aggregator_config: AggregatorConfig,
-    model_responses: Dict[str, Dict[str, str]],
-) -> str:
+    model_responses: Dict[str, Dict[str, ModelResponse]],
+    logprob_scores: Optional[Dict[str, float]] = None,
+) -> AggregationResult:
     """
     Use a weighted aggregation approach based on model confidence.
     
+    When the final prices barely disagree, the confidence-weighted median is
+    returned without an LLM call; moderate disagreement goes to the fast
+    aggregator model and the rest to the configured aggregator model.
+    
     Args:
         provider: An asynchronous OpenRouterProvider.
         aggregator_config: An instance of AggregatorConfig.
         model_responses: A dictionary with model responses from different iterations.
             Format: {model_id: {"initial": response, "final": response}}
+        logprob_scores: Confidence of models that were scored from their
+            initial price logprobs instead of being challenged
     Returns:
-        The aggregator's combined response as a string.
+        The aggregator's combined response as a string, annotated with the
+        aggregation tier used and its latency.
     """
+    start = time.perf_counter()
+    
     # Calculate confidence scores for each model
-    confidence_scores = {}
     final_responses = {}
     
     logger.info("Calculating confidence scores for aggregation")
     
+    model_ids = list(model_responses)
+    prices = []
+    explanations = []
     for model_id, responses in model_responses.items():
-        initial_response = responses.get("initial", "")
+        initial_response = responses["initial"]
         final_response = responses.get("final", initial_response)
         
         # Store the final response for aggregation
         final_responses[model_id] = final_response
         
-        # Calculate confidence score
-        confidence_score = calculate_confidence_score(initial_response, final_response)
-        confidence_scores[model_id] = confidence_score
-        
-        # Extract prices for logging
-        initial_price, _ = extract_price_and_explanation(initial_response)
-        final_price, _ = extract_price_and_explanation(final_response)
-        
+        prices.append([initial_response.price or 0.0, final_response.price or 0.0])
+        explanations.append([initial_response.explanation, final_response.explanation])
+    
+    # Score all models in one embedding batch and one NumPy pass, with equal
+    # weight on price change and explanation similarity
+    matrix = await async_confidence_matrix(
+        model_ids,
+        ["initial", "final"],
+        np.array(prices, dtype=float).reshape(len(model_ids), 2),
+        explanations,
+        price_weight=0.5,
+        zero_price_change=1.0,
+    )
+    if logprob_scores:
+        matrix = matrix.with_final_confidence(logprob_scores)
+    confidence_scores = matrix.final_confidence
+    
+    for model_id, analysis in matrix.analysis().items():
         logger.info(
             "model confidence analysis", 
             model_id=model_id,
-            confidence_score=f"{confidence_score:.4f}",
-            initial_price=f"${initial_price:.2f}",
-            final_price=f"${final_price:.2f}"
+            confidence_score=f"{analysis['confidence_score']:.4f}",
+            initial_price=f"${analysis['initial_price']:.2f}",
+            final_price=f"${analysis['challenge_price']:.2f}"
         )
     
-    # Normalize confidence scores to get weights
-    total_confidence = sum(confidence_scores.values())
-    if total_confidence > 0:
-        weights = {
-            model_id: score / total_confidence 
-            for model_id, score in confidence_scores.items()
-        }
-    else:
-        # Equal weights if all confidence scores are 0
-        weight = 1.0 / len(confidence_scores)
-        weights = {model_id: weight for model_id in confidence_scores}
+    # Normalize confidence scores, or Shapley values, to get weights
+    weights = (
+        matrix.shapley_weights()
+        if aggregator_config.weighting == "shapley"
+        else matrix.weights()
+    )
     
     # Log the normalized weights
     for model_id, weight in weights.items():
@@ -109,6 +131,21 @@ async def async_weighted_llm_aggregator(
             weight=f"{weight:.4f}"
         )
     
+    # Skip the LLM round-trip when the models already agree
+    final_prices = response_prices(final_responses)
+    dispersion = price_dispersion(final_prices.values())
+    tier = select_tier(dispersion, aggregator_config)
+    if tier == "local":
+        result = AggregationResult(
+            local_aggregate(final_responses, final_prices, weights),
+            tier,
+            time.perf_counter() - start,
+            dispersion,
+        )
+        logger.info("aggregated locally", **result.report())
+        return result
+    aggregator_model = tier_model(aggregator_config, tier)
+    
     # Create weighted aggregation for the meta-model
     weighted_responses = _concatenate_weighted_aggregator(final_responses, weights)
     
@@ -140,37 +177,40 @@ async def async_weighted_llm_aggregator(
     
     # Send request to the aggregator model
     payload = ChatRequest(
-        model=aggregator_config.model.model_id,
+        model=aggregator_model.model_id,
         messages=messages,
-        max_tokens=aggregator_config.model.max_tokens,
-        temperature=aggregator_config.model.temperature,
+        max_tokens=aggregator_model.max_tokens,
+        temperature=aggregator_model.temperature,
     )
     
     logger.info(
         "sending aggregation request", 
-        aggregator_model=aggregator_config.model.model_id,
+        aggregator_model=aggregator_model.model_id,
+        tier=tier,
         num_models_aggregated=len(model_responses)
     )
     
-    response = await provider.send_chat_completion(payload)
-    aggregated_text = response.get("choices", [])[0].get("message", {}).get("content", "")
-    
-    # Extract price from aggregated response
-    agg_price, _ = extract_price_and_explanation(aggregated_text)
+    response = await provider.send_chat(payload)
+    aggregated_text = response.text
+    agg_price = response.price or 0.0
     
+    result = AggregationResult(
+        aggregated_text, tier, time.perf_counter() - start, dispersion
+    )
     logger.info(
         "received aggregated response", 
-        aggregator_model=aggregator_config.model.model_id,
+        aggregator_model=aggregator_model.model_id,
         response_length=len(aggregated_text),
-        aggregated_price=f"${agg_price:.2f}"
+        aggregated_price=f"${agg_price:.2f}",
+        **result.report()
     )
     
-    return aggregated_text
+    return result
 
 
 async def select_challenge_prompts(
     provider: AsyncOpenRouterProvider,
-    model_responses: Dict[str, str],
+    model_responses: Dict[str, ModelResponse],
     num_challenges: int = 1,
 ) -> Dict[str, List[str]]:
     """
@@ -2,19 +2,26 @@
 
 import asyncio
 import random
-from typing import Dict, List, Tuple, Optional
+from collections.abc import Awaitable
+from typing import Dict, List, Optional, Tuple
 
 import structlog
 
-from flare_ai_consensus.router import AsyncOpenRouterProvider, ChatRequest
+from flare_ai_consensus.router import AsyncOpenRouterProvider, ChatRequest, ModelResponse
 from flare_ai_consensus.settings import ConsensusConfig, Message, ModelConfig
-from flare_ai_consensus.utils import parse_chat_response
 
 # Import from confidence package
 from flare_ai_consensus.consensus.confidence.confidence_aggregator import (
     async_weighted_llm_aggregator, select_challenge_prompts
 )
+from flare_ai_consensus.consensus.confidence.confidence_embeddings import (
+    async_calculate_text_similarity
+)
 from flare_ai_consensus.consensus.confidence.confidence_prompts import CHALLENGE_PROMPTS
+from flare_ai_consensus.consensus.confidence.logprob_confidence import (
+    TOP_LOGPROBS, logprob_confidence
+)
+from flare_ai_consensus.consensus.quorum import RoundResponses, gather_quorum
 
 logger = structlog.get_logger(__name__)
 
@@ -24,7 +31,7 @@ async def run_confident_consensus(
     consensus_config: ConsensusConfig,
     initial_conversation: List[Message],
     num_challenges: int = 3,  # Number of challenge iterations
-    response_collector: Optional[Dict[str, Dict[str, str]]] = None
+    response_collector: Optional[Dict[str, Dict[str, ModelResponse]]] = None
 ) -> str:
     """
     Run the confidence-based consensus process with challenge rounds.
@@ -39,79 +46,205 @@ async def run_confident_consensus(
     Returns:
         Final aggregated response
     """
+    aggregator_config = consensus_config.aggregator_config
+    provider.configure_models(
+        [*consensus_config.models, aggregator_config.model]
+        + ([aggregator_config.fast_model] if aggregator_config.fast_model else [])
+    )
+
     # Store all responses from different iterations
     all_model_responses = response_collector or {}
+    # Confidence read from the initial price tokens, in "logprobs" mode
+    logprob_scores: Optional[Dict[str, float]] = (
+        {} if consensus_config.confidence_mode == "logprobs" else None
+    )
     
     # Step 1: Get initial responses from all models if not already provided
     if not all(model_id in all_model_responses for model_id in [m.model_id for m in consensus_config.models]):
         logger.info("Getting initial responses from models")
         initial_responses = await send_round(
-            provider, consensus_config, initial_conversation
+            provider, consensus_config, initial_conversation, logprob_scores=logprob_scores
         )
         
         # Initialize the all_model_responses dictionary
         for model_id, response in initial_responses.items():
             all_model_responses[model_id] = {"initial": response}
     
-    # Step 2: Run challenge rounds
-    for i in range(num_challenges):
-        logger.info(f"Running challenge round {i+1}/{num_challenges}")
-        
-        # Select challenge prompts for each model
-        challenges = await select_challenge_prompts(
-            provider, {model_id: responses["initial"] for model_id, responses in all_model_responses.items()}, 
-            num_challenges=1
+    # Only models without a logprob confidence need to be challenged
+    challenged_config = consensus_config
+    if logprob_scores:
+        challenged_config = consensus_config.model_copy(update={"models": [
+            model for model in consensus_config.models if model.model_id not in logprob_scores
+        ]})
+        logger.info(
+            "Scored confidence from logprobs",
+            scored=list(logprob_scores),
+            challenged=[model.model_id for model in challenged_config.models],
         )
-        
-        # Log the selected challenges
-        for model_id, challenge_list in challenges.items():
-            logger.info(
-                "Selected challenge", 
-                model_id=model_id, 
-                challenge_round=i+1,
-                challenge=challenge_list[0][:100] + "..." if len(challenge_list[0]) > 100 else challenge_list[0]
-            )
-        
-        # Send challenges to models
-        challenge_responses = await send_challenge_round(
-            provider, 
-            consensus_config, 
+    challenged_responses = {
+        model_id: responses
+        for model_id, responses in all_model_responses.items()
+        if not logprob_scores or model_id not in logprob_scores
+    }
+    
+    # Step 2: Run challenge rounds. Every round challenges the same initial
+    # answer, so the rounds are independent and can run side by side.
+    if not challenged_config.models:
+        logger.info("Every model was scored from logprobs, skipping challenges")
+    elif consensus_config.parallel_challenges:
+        await _run_parallel_challenge_rounds(
+            provider,
+            challenged_config,
             initial_conversation,
-            challenges
+            challenged_responses,
+            num_challenges,
         )
-        
-        # Store the response from this challenge round
-        for model_id, response in challenge_responses.items():
-            all_model_responses[model_id][f"challenge_{i+1}"] = response
-            # Update the "final" response with the latest response
-            all_model_responses[model_id]["final"] = response
+    else:
+        for i in range(num_challenges):
+            logger.info(f"Running challenge round {i+1}/{num_challenges}")
             
-            # Log response changes
-            initial_response = all_model_responses[model_id]["initial"]
-            from flare_ai_consensus.consensus.confidence.confidence_embeddings import (
-                extract_price_and_explanation, calculate_text_similarity
+            # Select challenge prompts for each model
+            challenges = await select_challenge_prompts(
+                provider, {model_id: responses["initial"] for model_id, responses in challenged_responses.items()}, 
+                num_challenges=1
             )
             
-            initial_price, _ = extract_price_and_explanation(initial_response)
-            current_price, _ = extract_price_and_explanation(response)
-            similarity = calculate_text_similarity(initial_response, response)
+            # Log the selected challenges
+            for model_id, challenge_list in challenges.items():
+                logger.info(
+                    "Selected challenge", 
+                    model_id=model_id, 
+                    challenge_round=i+1,
+                    challenge=challenge_list[0][:100] + "..." if len(challenge_list[0]) > 100 else challenge_list[0]
+                )
             
-            logger.info(
-                "Challenge response analysis", 
-                model_id=model_id,
-                round=i+1,
-                initial_price=f"${initial_price:.2f}",
-                current_price=f"${current_price:.2f}",
-                similarity=f"{similarity:.4f}"
+            # Send challenges to models
+            challenge_responses = await send_challenge_round(
+                provider, 
+                challenged_config, 
+                initial_conversation,
+                challenges
             )
+            await _record_challenge_round(challenged_responses, i + 1, challenge_responses)
     
     # Step 3: Create weighted aggregation based on confidence
     logger.info("Creating weighted aggregation based on confidence")
-    aggregated_response = await async_weighted_llm_aggregator(
-        provider, consensus_config.aggregator_config, all_model_responses
+    aggregation = await async_weighted_llm_aggregator(
+        provider, consensus_config.aggregator_config, all_model_responses, logprob_scores
+    )
+    
+    return aggregation.text
+
+
+async def _run_parallel_challenge_rounds(
+    provider: AsyncOpenRouterProvider,
+    consensus_config: ConsensusConfig,
+    initial_conversation: List[Message],
+    all_model_responses: Dict[str, Dict[str, ModelResponse]],
+    num_challenges: int,
+) -> None:
+    """
+    Dispatch all challenge rounds for all models at once.
+    
+    Each round keeps its own quorum policy; a shared semaphore caps the
+    challenge requests in flight at `consensus_config.challenge_concurrency`.
+    Rounds are analyzed as they complete, and each model's "final" response
+    is its answer to the highest-numbered round.
+    
+    Args:
+        provider: OpenRouter provider
+        consensus_config: Consensus configuration
+        initial_conversation: Original conversation
+        all_model_responses: Responses per model, updated in place
+        num_challenges: Number of challenge rounds to run
+    """
+    logger.info(
+        "Running challenge rounds in parallel",
+        rounds=num_challenges,
+        concurrency=consensus_config.challenge_concurrency,
     )
     
-    return aggregated_response
+    # Draw distinct challenges for each model across the rounds
+    challenges = await select_challenge_prompts(
+        provider,
+        {model_id: responses["initial"] for model_id, responses in all_model_responses.items()},
+        num_challenges=num_challenges,
+    )
+    semaphore = (
+        asyncio.Semaphore(consensus_config.challenge_concurrency)
+        if consensus_config.challenge_concurrency
+        else None
+    )
+    
+    async def run_round(round_number: int) -> Tuple[int, RoundResponses]:
+        round_challenges = {
+            model_id: prompts[round_number - 1 : round_number]
+            for model_id, prompts in challenges.items()
+        }
+        responses = await send_challenge_round(
+            provider, consensus_config, initial_conversation, round_challenges, semaphore
+        )
+        return round_number, responses
+    
+    for finished in asyncio.as_completed(
+        [run_round(i + 1) for i in range(num_challenges)]
+    ):
+        round_number, challenge_responses = await finished
+        await _record_challenge_round(all_model_responses, round_number, challenge_responses)
+    
+    # Rounds finish out of order; keep "final" pointing at the last round
+    for responses in all_model_responses.values():
+        for round_number in range(num_challenges, 0, -1):
+            if f"challenge_{round_number}" in responses:
+                responses["final"] = responses[f"challenge_{round_number}"]
+                break
+
+
+async def _record_challenge_round(
+    all_model_responses: Dict[str, Dict[str, ModelResponse]],
+    round_number: int,
+    challenge_responses: Dict[str, ModelResponse],
+) -> None:
+    """
+    Store one challenge round's responses and log how they moved.
+    
+    Args:
+        all_model_responses: Responses per model, updated in place
+        round_number: 1-based number of the challenge round
+        challenge_responses: The round's responses keyed by model ID
+    """
+    # Dropped from the initial round, nothing to compare against
+    recorded = {
+        model_id: response
+        for model_id, response in challenge_responses.items()
+        if model_id in all_model_responses
+    }
+    
+    # Store the response from this challenge round
+    for model_id, response in recorded.items():
+        all_model_responses[model_id][f"challenge_{round_number}"] = response
+        # Update the "final" response with the latest response
+        all_model_responses[model_id]["final"] = response
+    
+    # Embed the whole round in one batch
+    similarities = await asyncio.gather(*(
+        async_calculate_text_similarity(all_model_responses[model_id]["initial"].text, response.text)
+        for model_id, response in recorded.items()
+    ))
+    
+    # Log response changes
+    for (model_id, response), similarity in zip(recorded.items(), similarities):
+        initial_price = all_model_responses[model_id]["initial"].price or 0.0
+        current_price = response.price or 0.0
+        
+        logger.info(
+            "Challenge response analysis", 
+            model_id=model_id,
+            round=round_number,
+            initial_price=f"${initial_price:.2f}",
+            current_price=f"${current_price:.2f}",
+            similarity=f"{similarity:.4f}"
+        )
 
 
 def _build_challenge_conversation(
@@ -143,7 +276,7 @@ async def _get_response_for_model_with_challenge(
     model: ModelConfig,
     initial_conversation: List[Message],
     challenge_prompt: str,
-) -> Tuple[str, str]:
+) -> ModelResponse:
     """
     Get a response from a model with a challenge prompt.
     
@@ -154,7 +287,7 @@ async def _get_response_for_model_with_challenge(
         challenge_prompt: Challenge prompt to add
         
     Returns:
-        Tuple of (model_id, response)
+        The parsed response
     """
     # Build conversation with challenge
     conversation = _build_challenge_conversation(
@@ -173,10 +306,11 @@ async def _get_response_for_model_with_challenge(
         messages=conversation,
         max_tokens=model.max_tokens,
         temperature=model.temperature,
+        cache_prefix=len(initial_conversation),
     )
     
-    response = await provider.send_chat_completion(payload)
-    text = parse_chat_response(response)
+    response = await provider.send_chat(payload)
+    text = response.text
     
     logger.info(
         "received challenge response", 
@@ -185,7 +319,17 @@ async def _get_response_for_model_with_challenge(
         response_preview=text[:100] + "..." if len(text) > 100 else text
     )
     
-    return model.model_id, text
+    return response
+
+
+async def _bounded(
+    semaphore: Optional[asyncio.Semaphore], request: Awaitable[ModelResponse]
+) -> ModelResponse:
+    """Await a request, holding the semaphore if one is given."""
+    if semaphore is None:
+        return await request
+    async with semaphore:
+        return await request
 
 
 async def send_challenge_round(
@@ -193,7 +337,8 @@ async def send_challenge_round(
     consensus_config: ConsensusConfig,
     initial_conversation: List[Message],
     model_challenges: Dict[str, List[str]],
-) -> Dict[str, str]:
+    semaphore: Optional[asyncio.Semaphore] = None,
+) -> RoundResponses:
     """
     Send challenge prompts to all models and get their responses.
     
@@ -202,11 +347,14 @@ async def send_challenge_round(
         consensus_config: Consensus configuration
         initial_conversation: Original conversation
         model_challenges: Dictionary mapping model IDs to challenge prompts
+        semaphore: Optional semaphore shared across rounds to cap the
+            requests in flight
         
     Returns:
-        Dictionary mapping model IDs to their responses
+        Dictionary mapping model IDs to their responses, with models that
+        failed or missed the quorum listed in its `dropped` attribute
     """
-    tasks = []
+    requests = {}
     
     for model in consensus_config.models:
         # Get challenge prompt for this model
@@ -219,17 +367,17 @@ async def send_challenge_round(
         else:
             challenge = challenges[0]  # Use the first challenge in the list
         
-        # Create task for getting response
-        task = _get_response_for_model_with_challenge(
-            provider, model, initial_conversation, challenge
+        requests[model_id] = _bounded(
+            semaphore,
+            _get_response_for_model_with_challenge(
+                provider, model, initial_conversation, challenge
+            ),
         )
-        tasks.append(task)
     
-    # Run all tasks concurrently
-    results = await asyncio.gather(*tasks)
-    
-    # Convert results to dictionary
-    return dict(results)
+    # Run all requests concurrently until the quorum is met
+    return await gather_quorum(
+        requests, consensus_config.min_responses, consensus_config.round_deadline
+    )
 
 
 async def send_round(
@@ -237,7 +385,8 @@ async def send_round(
     consensus_config: ConsensusConfig,
     initial_conversation: List[Message],
     aggregated_response: Optional[str] = None,
-) -> Dict[str, str]:
+    logprob_scores: Optional[Dict[str, float]] = None,
+) -> RoundResponses:
     """
     Send initial conversation to all models and get their responses.
     
@@ -249,11 +398,14 @@ async def send_round(
         consensus_config: Consensus configuration
         initial_conversation: Original conversation
         aggregated_response: Not used in this implementation
+        logprob_scores: If given, token logprobs are requested and the price
+            confidence of every model that returned them is stored here
         
     Returns:
-        Dictionary mapping model IDs to their responses
+        Dictionary mapping model IDs to their responses, with models that
+        failed or missed the quorum listed in its `dropped` attribute
     """
-    tasks = []
+    requests = {}
     
     for model in consensus_config.models:
         logger.info("sending initial prompt", model_id=model.model_id)
@@ -264,21 +416,25 @@ async def send_round(
             messages=initial_conversation,
             max_tokens=model.max_tokens,
             temperature=model.temperature,
+            cache_prefix=len(initial_conversation),
         )
+        if logprob_scores is not None:
+            payload["logprobs"] = True
+            payload["top_logprobs"] = TOP_LOGPROBS
         
         # Define coroutine to get response
         async def get_response(model_id, payload):
-            response = await provider.send_chat_completion(payload)
-            text = parse_chat_response(response)
+            response = await provider.send_chat(payload)
             logger.info("received initial response", model_id=model_id)
-            return model_id, text
+            if logprob_scores is not None:
+                confidence = logprob_confidence(response)
+                if confidence is not None:
+                    logprob_scores[model_id] = confidence
+            return response
         
-        # Create task
-        task = get_response(model.model_id, payload)
-        tasks.append(task)
-    
-    # Run all tasks concurrently
-    results = await asyncio.gather(*tasks)
+        requests[model.model_id] = get_response(model.model_id, payload)
     
-    # Convert results to dictionary
-    return dict(results)
\ No newline at end of file
+    # Run all requests concurrently until the quorum is met
+    return await gather_quorum(
+        requests, consensus_config.min_responses, consensus_config.round_deadline
+    )
\ No newline at end of file
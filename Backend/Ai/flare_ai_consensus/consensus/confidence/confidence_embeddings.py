@@ -1,9 +1,8 @@
 """Utility functions for embedding-based similarity using Gemini model."""
 
-import re
 import os
 import numpy as np
-from typing import Tuple
+from typing import List, Optional, Tuple
 import importlib.util
 import structlog
 
@@ -24,56 +23,123 @@ try:
 except ImportError:
     pass
 
+from flare_ai_consensus.consensus.confidence.embedding_cache import get_embedding_cache
+from flare_ai_consensus.consensus.confidence.embedding_service import AsyncEmbeddingService
+from flare_ai_consensus.consensus.confidence.local_embeddings import get_local_embedder
+from flare_ai_consensus.consensus.confidence.similarity_cascade import get_similarity_cascade
+from flare_ai_consensus.settings import settings
+from flare_ai_consensus.utils import parse_price_and_explanation
+
 logger = structlog.get_logger(__name__)
 
+EMBEDDING_MODEL = "text-embedding-004"
+
 def get_embeddings(text: str) -> np.ndarray:
     """
     Get embeddings for a text using Gemini's embedding model.
     
+    Gemini embeddings are cached by model and text hash, so each distinct
+    text is embedded once across rounds, requests and restarts. The local
+    hashed TF-IDF backend is used when selected in settings, when Gemini is
+    not configured, and when a Gemini call fails.
+    
     Args:
         text: Text to embed
         
     Returns:
         numpy.ndarray: Embedding vector
     """
-    if not gemini_available:
-        logger.warning("Gemini API not available, using fallback embedding method")
-        # Fallback to a simple approach if Gemini API is not available
-        # This creates a simplistic frequency-based vector
-        words = text.lower().split()
-        unique_words = list(set(words))
-        embedding = np.zeros(len(unique_words))
-        for i, word in enumerate(unique_words):
-            embedding[i] = words.count(word) / len(words)
-        return embedding
+    if _use_local_backend():
+        return _fallback_embedding(text)
+    
+    cache = get_embedding_cache()
+    cached = cache.get(EMBEDDING_MODEL, text)
+    if cached is not None:
+        return cached
     
     try:
         # Use Gemini's text embedding model
         logger.info("Getting embeddings from Gemini API", text_length=len(text))
         result = client.models.embed_content(
-            model="text-embedding-004",
+            model=EMBEDDING_MODEL,
             contents=text
         )
         # Convert the ContentEmbedding object to a numpy array
         # The values are stored in the 'values' field of the embedding
         values = result.embeddings[0].values
         logger.info("Received embeddings from Gemini API", embedding_size=len(values))
-        return np.array(values)
+        embedding = np.array(values)
+        cache.set(EMBEDDING_MODEL, text, embedding)
+        return embedding
     except Exception as e:
         logger.error("Error getting embeddings from Gemini API", error=str(e))
-        # Fallback to simple approach
-        words = text.lower().split()
-        unique_words = list(set(words))
-        embedding = np.zeros(len(unique_words))
-        for i, word in enumerate(unique_words):
-            embedding[i] = words.count(word) / len(words)
-        return embedding
+        return _fallback_embedding(text)
+
+
+def _use_local_backend() -> bool:
+    """Whether embeddings come from the local backend instead of Gemini."""
+    if settings.embedding_backend == "local":
+        return True
+    if not gemini_available:
+        logger.warning("Gemini API not available, using local embedding backend")
+        return True
+    return False
+
+
+def _fallback_embedding(text: str) -> np.ndarray:
+    """
+    Embed a text with the local hashed TF-IDF backend.
+    
+    Args:
+        text: Text to embed
+        
+    Returns:
+        numpy.ndarray: Fixed-dimension, L2-normalized vector
+    """
+    return get_local_embedder().embed(text)
+
+
+_embedding_service: Optional[AsyncEmbeddingService] = None
+
+
+def get_embedding_service() -> AsyncEmbeddingService:
+    """Return the process-wide batching embedding service for the Gemini client."""
+    global _embedding_service  # noqa: PLW0603
+    if _embedding_service is None:
+        _embedding_service = AsyncEmbeddingService(
+            client,
+            EMBEDDING_MODEL,
+            cache=get_embedding_cache(),
+            fallback=_fallback_embedding,
+        )
+    return _embedding_service
+
+
+async def async_get_embeddings(texts: List[str]) -> List[np.ndarray]:
+    """
+    Get embeddings for several texts without blocking the event loop.
+    
+    Texts requested concurrently are sent to Gemini in batched calls
+    through the async client.
+    
+    Args:
+        texts: Texts to embed
+        
+    Returns:
+        Embedding vectors in the order of `texts`
+    """
+    if _use_local_backend():
+        return list(get_local_embedder().embed_many(texts))
+    return await get_embedding_service().embed_many(texts)
 
 
 def extract_price_and_explanation(text: str) -> Tuple[float, str]:
     """
     Extract the price estimate and explanation from a model response.
     
+    Uses the same price patterns as `ModelResponse`, and 0.0 when the
+    response contains no price.
+    
     Args:
         text: Full response text from a model
         
@@ -107,49 +173,13 @@ def extract_price_and_explanation(text: str) -> Tuple[float, str]:
     
     print(f"{COLORS['blue']}Extracting price from response of length {len(text)}{COLORS['reset']}")
     
-    # Try to extract a dollar amount from the beginning of the text
-    price_match = re.search(r'^\$?([0-9,]+\.?[0-9]*)', text.strip())
-    price = None
-    if price_match:
-        try:
-            price = float(price_match.group(1).replace(',', ''))
-            logger.debug("Extracted price from beginning of text", price=price)
-        except ValueError:
-            pass
-    
-    # If no price found at the beginning, try a more general search
-    if price is None:
-        price_patterns = [
-            r'\$([0-9,]+\.?[0-9]*)',  # $123.45
-            r'([0-9,]+\.?[0-9]*)\s*USD',  # 123.45 USD
-            r'([0-9,]+\.?[0-9]*)\s*dollars',  # 123.45 dollars
-            r'price[^\$]*\$([0-9,]+\.?[0-9]*)',  # price is $123.45
-            r'value[^\$]*\$([0-9,]+\.?[0-9]*)',  # value is $123.45
-            r'estimate[^\$]*\$([0-9,]+\.?[0-9]*)',  # estimate is $123.45
-            r'worth[^\$]*\$([0-9,]+\.?[0-9]*)',  # worth is $123.45
-        ]
-        
-        for pattern in price_patterns:
-            price_match = re.search(pattern, text, re.IGNORECASE)
-            if price_match:
-                try:
-                    price = float(price_match.group(1).replace(',', ''))
-                    logger.debug("Extracted price using pattern", pattern=pattern, price=price)
-                    break
-                except ValueError:
-                    continue
+    price, explanation = parse_price_and_explanation(text)
     
     # Default to 0 if no price found
     if price is None:
         logger.warning("No price found in text", text_preview=text[:100] + "..." if len(text) > 100 else text)
         price = 0.0
     
-    # For explanation, remove the price declaration from the beginning if it exists
-    if price_match and price_match.start() == 0:
-        explanation = text[price_match.end():].strip()
-    else:
-        explanation = text.strip()
-    
     return price, explanation
 
 
@@ -157,6 +187,9 @@ def calculate_text_similarity(text1: str, text2: str) -> float:
     """
     Calculate the cosine similarity between two texts using Gemini embeddings.
     
+    Pairs the similarity cascade can settle cheaply (identical or clearly
+    rewritten texts) are scored without embeddings.
+    
     Args:
         text1: First text
         text2: Second text
@@ -166,10 +199,72 @@ def calculate_text_similarity(text1: str, text2: str) -> float:
     """
     logger.info("Calculating text similarity", text1_length=len(text1), text2_length=len(text2))
     
-    # Get embeddings
-    embedding1 = get_embeddings(text1)
-    embedding2 = get_embeddings(text2)
+    cheap = _screen_similarity(text1, text2)
+    if cheap is not None:
+        return cheap
+    
+    embedding1, embedding2 = get_embeddings(text1), get_embeddings(text2)
+    if embedding1.shape != embedding2.shape:
+        # Only one text fell back to the local backend; compare both locally
+        embedding1, embedding2 = get_local_embedder().embed_many([text1, text2])
+    return _cosine_similarity(embedding1, embedding2)
+
+
+async def async_calculate_text_similarity(text1: str, text2: str) -> float:
+    """
+    Calculate the cosine similarity between two texts without blocking the loop.
+    
+    Args:
+        text1: First text
+        text2: Second text
+        
+    Returns:
+        float: Cosine similarity score (0-1)
+    """
+    logger.info("Calculating text similarity", text1_length=len(text1), text2_length=len(text2))
+    
+    cheap = _screen_similarity(text1, text2)
+    if cheap is not None:
+        return cheap
+    
+    embedding1, embedding2 = await async_get_embeddings([text1, text2])
+    if embedding1.shape != embedding2.shape:
+        # Only one text fell back to the local backend; compare both locally
+        embedding1, embedding2 = get_local_embedder().embed_many([text1, text2])
+    return _cosine_similarity(embedding1, embedding2)
+
+
+def _screen_similarity(text1: str, text2: str) -> Optional[float]:
+    """
+    Score a pair with the cheap cascade tiers, if enabled.
     
+    Args:
+        text1: First text
+        text2: Second text
+        
+    Returns:
+        Optional[float]: The similarity, or None if the pair needs embeddings
+    """
+    cascade = get_similarity_cascade()
+    if cascade is None:
+        return None
+    similarity = cascade.screen(text1, text2)
+    if similarity is not None:
+        logger.info("Similarity settled without embeddings", similarity=similarity)
+    return similarity
+
+
+def _cosine_similarity(embedding1: np.ndarray, embedding2: np.ndarray) -> float:
+    """
+    Cosine similarity of two embeddings, clipped to [0, 1].
+    
+    Args:
+        embedding1: First embedding
+        embedding2: Second embedding
+        
+    Returns:
+        float: Cosine similarity score (0-1)
+    """
     # Ensure embeddings are 1D arrays
     if hasattr(embedding1, 'shape') and len(embedding1.shape) > 1:
         embedding1 = embedding1.flatten()
@@ -219,6 +314,52 @@ def calculate_confidence_score(initial_response: str, final_response: str) -> fl
     """
     logger.info("Calculating confidence score")
     
+    price_change, initial_explanation, final_explanation = _compare_responses(
+        initial_response, final_response
+    )
+    
+    # Calculate text similarity
+    text_similarity = calculate_text_similarity(initial_explanation, final_explanation)
+    logger.info("Text similarity calculated", similarity=text_similarity)
+    
+    return _combine_confidence(price_change, text_similarity)
+
+
+async def async_calculate_confidence_score(initial_response: str, final_response: str) -> float:
+    """
+    Calculate a confidence score without blocking the event loop.
+    
+    Args:
+        initial_response: The model's initial response
+        final_response: The model's response after challenges
+        
+    Returns:
+        float: Confidence score (0-1), where higher means less change (more confidence)
+    """
+    logger.info("Calculating confidence score")
+    
+    price_change, initial_explanation, final_explanation = _compare_responses(
+        initial_response, final_response
+    )
+    
+    # Calculate text similarity
+    text_similarity = await async_calculate_text_similarity(initial_explanation, final_explanation)
+    logger.info("Text similarity calculated", similarity=text_similarity)
+    
+    return _combine_confidence(price_change, text_similarity)
+
+
+def _compare_responses(initial_response: str, final_response: str) -> Tuple[float, str, str]:
+    """
+    Relative price change between two responses, plus their explanations.
+    
+    Args:
+        initial_response: The model's initial response
+        final_response: The model's response after challenges
+        
+    Returns:
+        tuple: (price_change, initial_explanation, final_explanation)
+    """
     initial_price, initial_explanation = extract_price_and_explanation(initial_response)
     final_price, final_explanation = extract_price_and_explanation(final_response)
     
@@ -236,10 +377,20 @@ def calculate_confidence_score(initial_response: str, final_response: str) -> fl
                    final_price=final_price, 
                    change_pct=f"{price_change*100:.2f}%")
     
-    # Calculate text similarity
-    text_similarity = calculate_text_similarity(initial_explanation, final_explanation)
-    logger.info("Text similarity calculated", similarity=text_similarity)
+    return price_change, initial_explanation, final_explanation
+
+
+def _combine_confidence(price_change: float, text_similarity: float) -> float:
+    """
+    Combine price change and text similarity into a confidence score.
     
+    Args:
+        price_change: Relative price change (0-1)
+        text_similarity: Similarity of the explanations (0-1)
+        
+    Returns:
+        float: Confidence score (0-1)
+    """
     # Calculate confidence score (inverse of change)
     confidence_score = 1 - (0.5 * price_change + 0.5 * (1 - text_similarity))
     logger.info("Confidence score calculated", 
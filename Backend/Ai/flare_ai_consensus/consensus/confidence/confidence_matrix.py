@@ -0,0 +1,313 @@
+"""Vectorized similarity and confidence scores across models and rounds."""
+
+from dataclasses import dataclass, replace
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+import structlog
+
+from flare_ai_consensus.consensus.confidence.confidence_embeddings import (
+    async_get_embeddings,
+)
+from flare_ai_consensus.consensus.confidence.local_embeddings import get_local_embedder
+from flare_ai_consensus.consensus.confidence.shapley import shapley_weights
+from flare_ai_consensus.consensus.confidence.similarity_cascade import (
+    get_similarity_cascade,
+)
+
+logger = structlog.get_logger(__name__)
+
+# Relative price change charged when a model moves away from a zero price
+ZERO_PRICE_CHANGE = 0.8
+
+
+@dataclass(frozen=True)
+class ConfidenceMatrix:
+    """
+    Similarity and confidence of every model in every round of a run.
+
+    Round 0 is the reference (initial) round; every later round is compared
+    against it. Arrays are indexed by model in `model_ids` order and by
+    round in `rounds` order.
+
+    Attributes:
+        model_ids: Models, one per row
+        rounds: Round names, one per column (e.g. "initial", "challenge_1")
+        prices: Extracted prices, shape (models, rounds)
+        similarity: Cosine similarity of every explanation with every other,
+            shape (models * rounds, models * rounds), row-major by model;
+            explanations the similarity cascade scored without embeddings
+            have zero rows
+        text_similarity: Similarity of each round's explanation to the
+            model's initial one, shape (models, rounds)
+        price_change: Relative price change from the initial round, capped
+            at 1, shape (models, rounds)
+        price_stability: 1 - price_change, shape (models, rounds)
+        confidence: Weighted combination of price stability and text
+            similarity, shape (models, rounds)
+    """
+
+    model_ids: List[str]
+    rounds: List[str]
+    prices: np.ndarray
+    similarity: np.ndarray
+    text_similarity: np.ndarray
+    price_change: np.ndarray
+    price_stability: np.ndarray
+    confidence: np.ndarray
+
+    @property
+    def final_confidence(self) -> Dict[str, float]:
+        """Confidence of each model in its last round."""
+        return dict(zip(self.model_ids, self.confidence[:, -1].tolist()))
+
+    def weights(self) -> Dict[str, float]:
+        """Final confidence normalized to sum to 1 (equal if all are zero)."""
+        scores = self.confidence[:, -1]
+        total = scores.sum()
+        if total > 0:
+            normalized = scores / total
+        else:
+            normalized = np.full(len(self.model_ids), 1.0 / max(len(self.model_ids), 1))
+        return dict(zip(self.model_ids, normalized.tolist()))
+
+    def with_final_confidence(self, scores: Dict[str, float]) -> "ConfidenceMatrix":
+        """
+        Replace the last-round confidence of some models.
+
+        Args:
+            scores: Confidence by model ID, e.g. estimated from logprobs
+                instead of a challenge round
+
+        Returns:
+            A copy of the matrix with the given scores in the last column
+        """
+        confidence = self.confidence.copy()
+        for i, model_id in enumerate(self.model_ids):
+            if model_id in scores:
+                confidence[i, -1] = scores[model_id]
+        return replace(self, confidence=confidence)
+
+    def shapley_weights(self, reference_price: Optional[float] = None) -> Dict[str, float]:
+        """
+        Weight models by their Shapley value in the appraisal game.
+
+        Args:
+            reference_price: Optional known value of the NFT (backtests only)
+
+        Returns:
+            Dictionary mapping model IDs to weights summing to 1
+        """
+        return shapley_weights(
+            self.model_ids,
+            self.prices[:, -1],
+            self.confidence[:, -1],
+            reference_price,
+        )
+
+    def analysis(self) -> Dict[str, Dict[str, float]]:
+        """
+        Per-model summary comparing the initial and the last round.
+
+        Returns:
+            Dictionary mapping model IDs to initial/challenge price, price
+            change, price stability, text similarity and confidence score
+        """
+        return {
+            model_id: {
+                "initial_price": float(self.prices[i, 0]),
+                "challenge_price": float(self.prices[i, -1]),
+                "price_change": float(self.price_change[i, -1]),
+                "price_stability": float(self.price_stability[i, -1]),
+                "text_similarity": float(self.text_similarity[i, -1]),
+                "confidence_score": float(self.confidence[i, -1]),
+            }
+            for i, model_id in enumerate(self.model_ids)
+        }
+
+    def to_dict(self) -> Dict[str, object]:
+        """Return the matrix as JSON-serializable data."""
+        return {
+            "models": self.model_ids,
+            "rounds": self.rounds,
+            "prices": self.prices.tolist(),
+            "text_similarity": self.text_similarity.round(6).tolist(),
+            "price_stability": self.price_stability.round(6).tolist(),
+            "confidence": self.confidence.round(6).tolist(),
+            "weights": self.weights(),
+        }
+
+
+def cosine_similarity_matrix(embeddings: np.ndarray) -> np.ndarray:
+    """
+    Compute the pairwise cosine similarity of a set of embeddings.
+
+    Args:
+        embeddings: One embedding per row, shape (n, dim)
+
+    Returns:
+        Similarity matrix of shape (n, n), clipped to [0, 1]; rows with a
+        zero norm are similar to nothing
+    """
+    norms = np.linalg.norm(embeddings, axis=1, keepdims=True)
+    unit = np.divide(embeddings, norms, where=norms > 0, out=np.zeros_like(embeddings))
+    return np.clip(unit @ unit.T, 0.0, 1.0)
+
+
+def price_change_matrix(
+    prices: np.ndarray, zero_price_change: float = ZERO_PRICE_CHANGE
+) -> np.ndarray:
+    """
+    Relative price change of every round against the initial round.
+
+    Args:
+        prices: Prices of shape (models, rounds); column 0 is the reference
+        zero_price_change: Change charged when the initial price is zero and
+            the later price is not
+
+    Returns:
+        Changes of shape (models, rounds), capped at 1
+    """
+    initial = prices[:, :1]
+    change = np.divide(
+        np.abs(prices - initial),
+        initial,
+        where=initial != 0,
+        out=np.zeros_like(prices, dtype=np.float64),
+    )
+    change = np.where((initial == 0) & (prices != 0), zero_price_change, change)
+    return np.minimum(change, 1.0)
+
+
+def confidence_matrix(
+    model_ids: Sequence[str],
+    rounds: Sequence[str],
+    prices: np.ndarray,
+    embeddings: np.ndarray,
+    price_weight: float = 0.7,
+    zero_price_change: float = ZERO_PRICE_CHANGE,
+    known_similarity: Optional[np.ndarray] = None,
+) -> ConfidenceMatrix:
+    """
+    Score every model in every round in a single NumPy pass.
+
+    Args:
+        model_ids: Models, one per row
+        rounds: Round names; the first is the reference round
+        prices: Extracted prices, shape (models, rounds)
+        embeddings: Explanation embeddings, shape (models, rounds, dim)
+        price_weight: Weight of price stability; text similarity gets the rest
+        zero_price_change: Change charged when moving away from a zero price
+        known_similarity: Text similarities already settled without
+            embeddings, shape (models, rounds), NaN where the embeddings decide
+
+    Returns:
+        The structured similarity and confidence scores
+    """
+    prices = np.asarray(prices, dtype=np.float64)
+    embeddings = np.asarray(embeddings, dtype=np.float64)
+    n_models, n_rounds = prices.shape
+
+    similarity = cosine_similarity_matrix(embeddings.reshape(n_models * n_rounds, -1))
+    # Each model's explanations against its own initial explanation
+    blocks = similarity.reshape(n_models, n_rounds, n_models, n_rounds)
+    models = np.arange(n_models)
+    text_similarity = blocks[models, 0, models, :]
+    if known_similarity is not None:
+        text_similarity = np.where(
+            np.isnan(known_similarity), text_similarity, known_similarity
+        )
+
+    price_change = price_change_matrix(prices, zero_price_change)
+    price_stability = 1.0 - price_change
+    confidence = np.clip(
+        price_weight * price_stability + (1.0 - price_weight) * text_similarity, 0.0, 1.0
+    )
+
+    return ConfidenceMatrix(
+        model_ids=list(model_ids),
+        rounds=list(rounds),
+        prices=prices,
+        similarity=similarity,
+        text_similarity=text_similarity,
+        price_change=price_change,
+        price_stability=price_stability,
+        confidence=confidence,
+    )
+
+
+async def async_confidence_matrix(
+    model_ids: Sequence[str],
+    rounds: Sequence[str],
+    prices: np.ndarray,
+    explanations: Sequence[Sequence[str]],
+    price_weight: float = 0.7,
+    zero_price_change: float = ZERO_PRICE_CHANGE,
+) -> ConfidenceMatrix:
+    """
+    Embed all explanations of a run in one batch, then score them.
+
+    When the similarity cascade is enabled, each later-round explanation is
+    first compared with the model's initial one cheaply, and only texts of
+    pairs left ambiguous are embedded.
+
+    Args:
+        model_ids: Models, one per row
+        rounds: Round names; the first is the reference round
+        prices: Extracted prices, shape (models, rounds)
+        explanations: Explanation texts, indexed [model][round]
+        price_weight: Weight of price stability; text similarity gets the rest
+        zero_price_change: Change charged when moving away from a zero price
+
+    Returns:
+        The structured similarity and confidence scores
+    """
+    n_models, n_rounds = len(model_ids), len(rounds)
+    known, needed = _screen_explanations(explanations, n_models, n_rounds)
+    texts = [
+        explanations[i][r] for i in range(n_models) for r in range(n_rounds) if needed[i, r]
+    ]
+    vectors = await async_get_embeddings(texts) if texts else []
+    if len({vector.shape for vector in vectors}) > 1:
+        # Some texts fell back to the local backend; embed all of them locally
+        logger.warning("Mixed embedding dimensions, using the local backend for the run")
+        vectors = list(get_local_embedder().embed_many(texts))
+    dim = vectors[0].shape[0] if vectors else 1
+    embeddings = np.zeros((n_models, n_rounds, dim))
+    if vectors:
+        embeddings[needed] = np.stack(vectors)
+    return confidence_matrix(
+        model_ids, rounds, prices, embeddings, price_weight, zero_price_change, known
+    )
+
+
+def _screen_explanations(
+    explanations: Sequence[Sequence[str]], n_models: int, n_rounds: int
+) -> Tuple[Optional[np.ndarray], np.ndarray]:
+    """
+    Settle what the similarity cascade can before embedding.
+
+    Args:
+        explanations: Explanation texts, indexed [model][round]
+        n_models: Number of models
+        n_rounds: Number of rounds
+
+    Returns:
+        Known similarities (None without a cascade) and a mask of the
+        explanations that still need embeddings, both shape (models, rounds)
+    """
+    cascade = get_similarity_cascade()
+    if cascade is None:
+        return None, np.ones((n_models, n_rounds), dtype=bool)
+
+    known = np.full((n_models, n_rounds), np.nan)
+    needed = np.zeros((n_models, n_rounds), dtype=bool)
+    known[:, 0] = 1.0
+    for i in range(n_models):
+        for r in range(1, n_rounds):
+            score = cascade.screen(explanations[i][0], explanations[i][r])
+            if score is None:
+                needed[i, 0] = needed[i, r] = True
+            else:
+                known[i, r] = score
+    return known, needed
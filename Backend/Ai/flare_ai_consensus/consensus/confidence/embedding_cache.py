@@ -0,0 +1,250 @@
+"""Content-addressed cache for text embeddings."""
+
+import hashlib
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from contextlib import closing
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import numpy as np
+import structlog
+
+from flare_ai_consensus.settings import settings
+
+logger = structlog.get_logger(__name__)
+
+
+def embedding_key(model: str, text: str) -> str:
+    """
+    Return the cache key of a text embedded by a given model.
+
+    Args:
+        model: Name of the embedding model
+        text: Embedded text
+
+    Returns:
+        Hex SHA-256 digest of the model name and text
+    """
+    return hashlib.sha256(f"{model}\0{text}".encode()).hexdigest()
+
+
+class SQLiteEmbeddingStore:
+    """Disk tier of the embedding cache, surviving restarts."""
+
+    def __init__(self, path: Path, max_entries: int = 50_000):
+        """
+        Args:
+            path: Location of the SQLite database file
+            max_entries: Vectors kept before the least recently used go
+        """
+        self.path = path
+        self.max_entries = max_entries
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with closing(self._connect()) as conn, conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS embeddings ("
+                "key TEXT PRIMARY KEY, model TEXT NOT NULL, vector BLOB NOT NULL, "
+                "created REAL NOT NULL, accessed REAL NOT NULL)"
+            )
+
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(self.path, timeout=30.0)
+
+    def get(self, key: str, ttl: float) -> Optional[np.ndarray]:
+        """Return the live vector for a key and mark it as recently used, or None."""
+        return self.get_many([key], ttl)[0]
+
+    def get_many(self, keys: List[str], ttl: float) -> List[Optional[np.ndarray]]:
+        """Look up several keys over one connection, in the order given."""
+        now = time.time()
+        found: Dict[str, np.ndarray] = {}
+        with closing(self._connect()) as conn, conn:
+            for key in keys:
+                row = conn.execute(
+                    "SELECT vector FROM embeddings WHERE key = ? AND created >= ?",
+                    (key, now - ttl),
+                ).fetchone()
+                if row is not None:
+                    found[key] = np.frombuffer(row[0], dtype=np.float64)
+            conn.executemany(
+                "UPDATE embeddings SET accessed = ? WHERE key = ?",
+                [(now, key) for key in found],
+            )
+        return [found.get(key) for key in keys]
+
+    def set(self, key: str, model: str, vector: np.ndarray, ttl: float) -> None:
+        """Store a vector, then drop expired and surplus vectors."""
+        now = time.time()
+        with closing(self._connect()) as conn, conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO embeddings "
+                "(key, model, vector, created, accessed) VALUES (?, ?, ?, ?, ?)",
+                (key, model, np.asarray(vector, dtype=np.float64).tobytes(), now, now),
+            )
+            conn.execute("DELETE FROM embeddings WHERE created < ?", (now - ttl,))
+            conn.execute(
+                "DELETE FROM embeddings WHERE key NOT IN ("
+                "SELECT key FROM embeddings ORDER BY accessed DESC LIMIT ?)",
+                (self.max_entries,),
+            )
+
+
+class EmbeddingCache:
+    """
+    Two-tier (in-memory LRU + optional SQLite) cache of embedding vectors.
+
+    Embeddings are deterministic for a given model and text, so the memory
+    tier only bounds its size; the disk tier also drops vectors older than
+    the TTL so that it does not grow without limit across restarts.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = 2048,
+        store: Optional[SQLiteEmbeddingStore] = None,
+        ttl: float = 30 * 86_400.0,
+    ):
+        """
+        Args:
+            max_entries: Vectors held in the in-memory LRU tier
+            store: Optional disk tier shared across restarts
+            ttl: Seconds a vector stays valid in the disk tier
+        """
+        self.max_entries = max_entries
+        self.store = store
+        self.ttl = ttl
+        self._entries: OrderedDict[str, np.ndarray] = OrderedDict()
+        self._lock = threading.Lock()
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+    def get(self, model: str, text: str) -> Optional[np.ndarray]:
+        """
+        Look up the embedding of a text, in memory and then on disk.
+
+        Args:
+            model: Name of the embedding model
+            text: Embedded text
+
+        Returns:
+            The cached vector, or None on a miss
+        """
+        vector = self.get_memory(model, text)
+        if vector is None:
+            vector = self.get_stored(model, [text])[0]
+        return vector
+
+    def get_memory(self, model: str, text: str) -> Optional[np.ndarray]:
+        """
+        Look up the embedding of a text in the memory tier only.
+
+        Never blocks on disk, so it is safe to call on an event loop. A miss
+        here is not counted; follow it with `get_stored`.
+
+        Args:
+            model: Name of the embedding model
+            text: Embedded text
+
+        Returns:
+            The cached vector, or None if it is not held in memory
+        """
+        key = embedding_key(model, text)
+        with self._lock:
+            vector = self._entries.get(key)
+            if vector is not None:
+                self._entries.move_to_end(key)
+                self.memory_hits += 1
+            return vector
+
+    def get_stored(self, model: str, texts: List[str]) -> List[Optional[np.ndarray]]:
+        """
+        Look up embeddings missing from memory in the disk tier.
+
+        Reads SQLite when a store is configured, so call it from a worker
+        thread when running on an event loop.
+
+        Args:
+            model: Name of the embedding model
+            texts: Texts to look up
+
+        Returns:
+            The stored vectors in the order of `texts`, None for misses
+        """
+        keys = [embedding_key(model, text) for text in texts]
+        vectors: List[Optional[np.ndarray]] = [None] * len(keys)
+        if self.store is not None and keys:
+            try:
+                vectors = self.store.get_many(keys, self.ttl)
+            except sqlite3.Error as e:
+                logger.warning("embedding store read failed", error=str(e))
+        with self._lock:
+            for key, vector in zip(keys, vectors):
+                if vector is None:
+                    self.misses += 1
+                else:
+                    self._remember(key, vector)
+                    self.disk_hits += 1
+        return vectors
+
+    def set(self, model: str, text: str, vector: np.ndarray) -> None:
+        """
+        Cache the embedding of a text.
+
+        Args:
+            model: Name of the embedding model
+            text: Embedded text
+            vector: The embedding vector
+        """
+        key = embedding_key(model, text)
+        vector = np.array(vector, dtype=np.float64)
+        with self._lock:
+            self._remember(key, vector)
+        if self.store is not None:
+            try:
+                self.store.set(key, model, vector, self.ttl)
+            except sqlite3.Error as e:
+                logger.warning("embedding store write failed", error=str(e))
+
+    def _remember(self, key: str, vector: np.ndarray) -> None:
+        # Cached vectors are shared between callers, so keep them read-only
+        vector.flags.writeable = False
+        self._entries[key] = vector
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def stats(self) -> dict:
+        """Return hit/miss counts and the number of vectors held in memory."""
+        with self._lock:
+            return {
+                "memory_hits": self.memory_hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "entries": len(self._entries),
+            }
+
+
+_default_cache: Optional[EmbeddingCache] = None
+
+
+def get_embedding_cache() -> EmbeddingCache:
+    """Return the process-wide embedding cache configured from settings."""
+    global _default_cache  # noqa: PLW0603
+    if _default_cache is None:
+        store = None
+        if settings.embedding_cache_persist:
+            store = SQLiteEmbeddingStore(
+                settings.embedding_cache_path
+                or settings.data_path / "embedding_cache.sqlite",
+                max_entries=settings.embedding_cache_max_disk_entries,
+            )
+        _default_cache = EmbeddingCache(
+            max_entries=settings.embedding_cache_max_entries,
+            store=store,
+            ttl=settings.embedding_cache_ttl,
+        )
+    return _default_cache
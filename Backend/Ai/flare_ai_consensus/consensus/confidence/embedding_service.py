@@ -0,0 +1,155 @@
+"""Micro-batching asynchronous front end for the Gemini embedding API."""
+
+import asyncio
+import weakref
+from typing import Any, Callable, Dict, List, Optional
+
+import numpy as np
+import structlog
+
+from flare_ai_consensus.consensus.confidence.embedding_cache import EmbeddingCache
+
+logger = structlog.get_logger(__name__)
+
+# Gemini accepts at most 100 contents per batched embed request
+EMBED_BATCH_LIMIT = 100
+
+
+class AsyncEmbeddingService:
+    """
+    Collects texts requested on an event loop and embeds them in batches.
+
+    Callers await per-text futures. Texts requested within `linger` seconds of
+    each other (e.g. every explanation of one round) are sent as a single
+    embed call through the async client, split at the API batch limit, so
+    neither the round-trips nor the blocking sync client stall the loop.
+    """
+
+    def __init__(
+        self,
+        client: Any,
+        model: str,
+        cache: Optional[EmbeddingCache] = None,
+        fallback: Optional[Callable[[str], np.ndarray]] = None,
+        max_batch: int = EMBED_BATCH_LIMIT,
+        linger: float = 0.002,
+    ):
+        """
+        Args:
+            client: A `google.genai.Client`
+            model: Name of the embedding model
+            cache: Optional cache consulted before and filled after each call
+            fallback: Embedding used for a text whose batch failed
+            max_batch: Maximum texts per embed call
+            linger: Seconds to wait for more texts before sending a batch
+        """
+        self.client = client
+        self.model = model
+        self.cache = cache
+        self.fallback = fallback
+        self.max_batch = max_batch
+        self.linger = linger
+        self._pending: weakref.WeakKeyDictionary[
+            asyncio.AbstractEventLoop, Dict[str, asyncio.Future]
+        ] = weakref.WeakKeyDictionary()
+        self._tasks: set[asyncio.Task] = set()
+
+    async def embed(self, text: str) -> np.ndarray:
+        """
+        Embed a single text, batched with other concurrent requests.
+
+        Args:
+            text: Text to embed
+
+        Returns:
+            numpy.ndarray: Embedding vector
+        """
+        return (await self.embed_many([text]))[0]
+
+    async def embed_many(self, texts: List[str]) -> List[np.ndarray]:
+        """
+        Embed several texts, batched with other concurrent requests.
+
+        Args:
+            texts: Texts to embed
+
+        Returns:
+            Embedding vectors in the order of `texts`
+        """
+        results: List[Optional[np.ndarray]] = [None] * len(texts)
+        missing = []
+        for i, text in enumerate(texts):
+            cached = self.cache.get_memory(self.model, text) if self.cache else None
+            if cached is not None:
+                results[i] = cached
+            else:
+                missing.append(i)
+        if missing and self.cache is not None:
+            # The disk tier is read off the loop, in one go for all misses
+            missing_texts = [texts[i] for i in missing]
+            if self.cache.store is None:
+                stored = self.cache.get_stored(self.model, missing_texts)
+            else:
+                stored = await asyncio.to_thread(
+                    self.cache.get_stored, self.model, missing_texts
+                )
+            for i, vector in zip(missing, stored):
+                results[i] = vector
+        waiting = {i: self._enqueue(texts[i]) for i in missing if results[i] is None}
+        if waiting:
+            vectors = await asyncio.gather(*waiting.values())
+            for i, vector in zip(waiting, vectors):
+                results[i] = vector
+        return results
+
+    def _enqueue(self, text: str) -> asyncio.Future:
+        loop = asyncio.get_running_loop()
+        pending = self._pending.get(loop)
+        if pending is None:
+            pending = self._pending[loop] = {}
+            loop.call_later(self.linger, self._flush, loop)
+        future = pending.get(text)
+        if future is None:
+            # Identical texts in one window share a single embedding
+            future = pending[text] = loop.create_future()
+            if len(pending) >= self.max_batch:
+                self._flush(loop)
+        return future
+
+    def _flush(self, loop: asyncio.AbstractEventLoop) -> None:
+        pending = self._pending.pop(loop, None)
+        if pending:
+            task = loop.create_task(self._send_batch(pending))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _send_batch(self, batch: Dict[str, asyncio.Future]) -> None:
+        texts = list(batch)
+        try:
+            logger.info("Getting batched embeddings from Gemini API", batch_size=len(texts))
+            result = await self.client.aio.models.embed_content(
+                model=self.model, contents=texts
+            )
+            vectors = [np.array(e.values) for e in result.embeddings]
+            if len(vectors) != len(texts):
+                raise ValueError(f"expected {len(texts)} embeddings, got {len(vectors)}")
+        except Exception as e:
+            logger.error("Error getting batched embeddings from Gemini API", error=str(e))
+            if self.fallback is None:
+                for future in batch.values():
+                    if not future.done():
+                        future.set_exception(e)
+                return
+            vectors = [self.fallback(text) for text in texts]
+            cacheable = False
+        else:
+            cacheable = self.cache is not None
+        for text, vector in zip(texts, vectors):
+            if not batch[text].done():
+                batch[text].set_result(vector)
+        if cacheable:
+            await asyncio.to_thread(self._store, texts, vectors)
+
+    def _store(self, texts: List[str], vectors: List[np.ndarray]) -> None:
+        for text, vector in zip(texts, vectors):
+            self.cache.set(self.model, text, vector)
@@ -0,0 +1,153 @@
+"""Offline hashed TF-IDF embeddings with a fixed dimension."""
+
+import atexit
+import re
+import threading
+import zlib
+from pathlib import Path
+from typing import List, Optional
+
+import numpy as np
+import structlog
+
+from flare_ai_consensus.settings import settings
+
+logger = structlog.get_logger(__name__)
+
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+(?:\.[0-9]+)?")
+
+
+class HashedTfidfEmbedder:
+    """
+    Feature-hashing TF-IDF vectorizer.
+
+    Every token is hashed into one of `dim` buckets, so all texts share one
+    coordinate space without a vocabulary. Term frequencies are sublinear
+    (1 + log tf), weighted by a smoothed IDF learned online from the distinct
+    texts embedded so far, and L2-normalized so a dot product is the cosine
+    similarity. IDF statistics can be persisted to keep weights stable
+    across restarts.
+    """
+
+    def __init__(self, dim: int = 1024, idf_path: Optional[Path] = None):
+        """
+        Args:
+            dim: Number of hash buckets (embedding dimension)
+            idf_path: Optional `.npz` file holding document frequencies
+        """
+        self.dim = dim
+        self.idf_path = idf_path
+        self.doc_count = 0
+        self.doc_freq = np.zeros(dim, dtype=np.float64)
+        # Texts already counted, so re-embedding a text does not skew the IDF
+        self._observed: set[int] = set()
+        self._lock = threading.Lock()
+        if idf_path is not None and idf_path.exists():
+            self.load(idf_path)
+
+    def _buckets(self, text: str) -> np.ndarray:
+        tokens = TOKEN_PATTERN.findall(text.lower())
+        hashes = np.fromiter(
+            (zlib.crc32(token.encode()) for token in tokens),
+            dtype=np.uint32,
+            count=len(tokens),
+        )
+        return hashes % self.dim
+
+    def _term_frequencies(self, texts: List[str]) -> np.ndarray:
+        counts = np.zeros((len(texts), self.dim), dtype=np.float64)
+        for row, text in enumerate(texts):
+            buckets = self._buckets(text)
+            if buckets.size:
+                counts[row] = np.bincount(buckets, minlength=self.dim)
+        return counts
+
+    def idf(self) -> np.ndarray:
+        """Return the smoothed inverse document frequency of every bucket."""
+        return np.log((1 + self.doc_count) / (1 + self.doc_freq)) + 1
+
+    def embed_many(self, texts: List[str], observe: bool = True) -> np.ndarray:
+        """
+        Embed several texts.
+
+        Args:
+            texts: Texts to embed
+            observe: Whether to add unseen texts to the IDF statistics first
+
+        Returns:
+            numpy.ndarray: One L2-normalized row of length `dim` per text
+        """
+        counts = self._term_frequencies(texts)
+        present = counts > 0
+        with self._lock:
+            if observe:
+                for row, text in enumerate(texts):
+                    key = zlib.crc32(text.encode()) << 32 | len(text)
+                    if key not in self._observed:
+                        self._observed.add(key)
+                        self.doc_count += 1
+                        self.doc_freq += present[row]
+            idf = self.idf()
+        vectors = np.log(counts, where=present, out=np.zeros_like(counts))
+        vectors = (vectors + present) * idf
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        return np.divide(vectors, norms, where=norms > 0, out=np.zeros_like(vectors))
+
+    def embed(self, text: str) -> np.ndarray:
+        """
+        Embed a single text.
+
+        Args:
+            text: Text to embed
+
+        Returns:
+            numpy.ndarray: L2-normalized vector of length `dim`
+        """
+        return self.embed_many([text])[0]
+
+    def save(self, path: Optional[Path] = None) -> None:
+        """Persist the IDF statistics."""
+        path = path or self.idf_path
+        if path is None:
+            return
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with self._lock:
+            doc_freq, doc_count = self.doc_freq.copy(), self.doc_count
+        with path.open("wb") as f:
+            np.savez(f, doc_freq=doc_freq, doc_count=doc_count)
+
+    def load(self, path: Path) -> None:
+        """Load IDF statistics saved by `save`, if they match the dimension."""
+        try:
+            with np.load(path) as data:
+                doc_freq = data["doc_freq"]
+                doc_count = int(data["doc_count"])
+        except (OSError, KeyError, ValueError) as e:
+            logger.warning("could not load IDF statistics", path=str(path), error=str(e))
+            return
+        if doc_freq.shape != (self.dim,):
+            logger.warning(
+                "ignoring IDF statistics of another dimension",
+                path=str(path),
+                dim=doc_freq.shape[0],
+            )
+            return
+        with self._lock:
+            self.doc_freq = doc_freq.astype(np.float64)
+            self.doc_count = doc_count
+
+
+_default_embedder: Optional[HashedTfidfEmbedder] = None
+
+
+def get_local_embedder() -> HashedTfidfEmbedder:
+    """Return the process-wide local embedder configured from settings."""
+    global _default_embedder  # noqa: PLW0603
+    if _default_embedder is None:
+        _default_embedder = HashedTfidfEmbedder(
+            dim=settings.local_embedding_dim,
+            idf_path=settings.local_embedding_idf_path,
+        )
+        if settings.local_embedding_idf_path is not None:
+            atexit.register(_default_embedder.save)
+    return _default_embedder
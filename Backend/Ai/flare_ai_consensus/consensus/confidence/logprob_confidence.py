@@ -0,0 +1,100 @@
+"""Confidence from the token distribution of a response's price field."""
+
+import math
+import re
+from typing import Any, Dict, Optional, Sequence
+
+import structlog
+
+from flare_ai_consensus.router import ModelResponse
+
+logger = structlog.get_logger(__name__)
+
+# Alternatives requested per generated token
+TOP_LOGPROBS = 5
+PRICE_FIELD_PATTERN = re.compile(
+    r'"(?:price|predicted_price|predicted_price_USD)"\s*:\s*"?\$?\s*([0-9][0-9,]*)'
+)
+
+
+def _digits(text: str) -> str:
+    return "".join(ch for ch in text if ch.isdigit())
+
+
+def price_token_confidence(content: Sequence[Dict[str, Any]]) -> Optional[float]:
+    """
+    Estimate how firmly a model committed to the price it generated.
+
+    The price field is located in the generated tokens, and for every token
+    of its integer part the expected absolute price change is computed from
+    the token's alternatives: numeric alternatives of the same width move
+    the price by their difference at the token's place value, and any other
+    probability mass is charged a change of the token's full magnitude. The
+    expected change relative to the price is capped at 1, so the result is a
+    price stability comparable to the one measured by challenge rounds.
+
+    Args:
+        content: The `choices[0].logprobs.content` entries of a response,
+            each with a `token`, its `logprob` and optional `top_logprobs`
+
+    Returns:
+        Confidence in [0, 1], or None if no positive price was found
+    """
+    tokens = [entry.get("token", "") for entry in content]
+    starts = [0]
+    for token in tokens:
+        starts.append(starts[-1] + len(token))
+    text = "".join(tokens)
+
+    match = PRICE_FIELD_PATTERN.search(text)
+    if match is None:
+        return None
+    span_start, span_end = match.span(1)
+    price = int(_digits(match.group(1)))
+    if price <= 0:
+        return None
+
+    expected_change = 0.0
+    for entry, token, start, end in zip(content, tokens, starts, starts[1:]):
+        if end <= span_start or start >= span_end:
+            continue
+        part = _digits(text[max(start, span_start) : min(end, span_end)])
+        if not part:
+            continue
+        place = 10 ** len(_digits(text[min(end, span_end) : span_end]))
+        chosen = int(part)
+        # Only whole tokens inside the span can be swapped digit for digit
+        whole = start >= span_start and end <= span_end
+
+        p_chosen = math.exp(entry.get("logprob", 0.0))
+        residual = 1.0 - p_chosen
+        for alternative in entry.get("top_logprobs") or []:
+            alt_token = alternative.get("token", "")
+            if alt_token == token:
+                continue
+            if whole and alt_token.isdigit() and len(alt_token) == len(part):
+                p_alt = math.exp(alternative.get("logprob", -math.inf))
+                expected_change += p_alt * abs(int(alt_token) - chosen) * place
+                residual -= p_alt
+        expected_change += max(residual, 0.0) * 10 ** len(part) * place
+
+    return 1.0 - min(expected_change / price, 1.0)
+
+
+def logprob_confidence(response: ModelResponse) -> Optional[float]:
+    """
+    Price confidence of a response that was requested with logprobs.
+
+    Args:
+        response: The parsed response
+
+    Returns:
+        Confidence in [0, 1], or None if the model returned no logprobs or
+        no price could be located in them
+    """
+    if not response.logprobs:
+        return None
+    confidence = price_token_confidence(response.logprobs)
+    if confidence is None:
+        logger.warning("no price found in logprobs", model_id=response.model_id)
+    return confidence
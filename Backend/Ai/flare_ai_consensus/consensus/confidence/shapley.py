@@ -0,0 +1,254 @@
+"""Shapley values of model contributions to the consensus."""
+
+import math
+from typing import Callable, Dict, Optional, Sequence, Union
+
+import numpy as np
+import structlog
+
+logger = structlog.get_logger(__name__)
+
+# Model sets up to this size get exact values (2^n coalitions)
+EXACT_MAX_MODELS = 10
+# Coalition caches up to this many models use a dense bitmask-indexed array
+DENSE_CACHE_MAX_MODELS = 20
+
+ValueFunction = Callable[[Sequence[int]], float]
+
+
+class CoalitionValues:
+    """
+    Memoized characteristic function indexed by coalition bitmask.
+
+    Bit i of a mask is set when model i is in the coalition. Each coalition
+    is evaluated at most once; small games use a dense NumPy array with NaN
+    marking unevaluated coalitions, larger ones a dictionary.
+    """
+
+    def __init__(self, n_models: int, value_fn: ValueFunction):
+        """
+        Args:
+            n_models: Number of players (models)
+            value_fn: Value of a coalition given the indices of its members
+        """
+        self.n_models = n_models
+        self.value_fn = value_fn
+        self.evaluations = 0
+        self._cache: Union[np.ndarray, Dict[int, float]] = (
+            np.full(1 << n_models, np.nan)
+            if n_models <= DENSE_CACHE_MAX_MODELS
+            else {}
+        )
+
+    def __call__(self, mask: int) -> float:
+        """Return the value of the coalition `mask`."""
+        if isinstance(self._cache, dict):
+            value = self._cache.get(mask)
+            if value is None:
+                value = self._cache[mask] = self._evaluate(mask)
+            return value
+        value = self._cache[mask]
+        if np.isnan(value):
+            value = self._cache[mask] = self._evaluate(mask)
+        return float(value)
+
+    def _evaluate(self, mask: int) -> float:
+        self.evaluations += 1
+        members = [i for i in range(self.n_models) if mask >> i & 1]
+        return float(self.value_fn(members)) if members else 0.0
+
+    def all_values(self) -> np.ndarray:
+        """Evaluate every coalition and return the values indexed by mask."""
+        if isinstance(self._cache, dict):
+            raise ValueError(f"too many models for a dense table: {self.n_models}")
+        for mask in np.flatnonzero(np.isnan(self._cache)):
+            self(int(mask))
+        return self._cache
+
+
+def exact_shapley(values: CoalitionValues) -> np.ndarray:
+    """
+    Compute exact Shapley values from the full coalition table.
+
+    Args:
+        values: Memoized characteristic function
+
+    Returns:
+        One Shapley value per model
+    """
+    n = values.n_models
+    table = values.all_values()
+    masks = np.arange(1 << n)
+    sizes = sum(masks >> i & 1 for i in range(n))
+    # |S|! (n - |S| - 1)! / n! for coalitions S not containing the player
+    weights = np.array(
+        [math.factorial(s) * math.factorial(n - s - 1) / math.factorial(n) for s in range(n)]
+    )
+
+    phi = np.zeros(n)
+    for i in range(n):
+        without = masks[(masks >> i & 1) == 0]
+        marginal = table[without | 1 << i] - table[without]
+        phi[i] = np.dot(weights[sizes[without]], marginal)
+    return phi
+
+
+def sampled_shapley(
+    values: CoalitionValues,
+    tolerance: float = 0.01,
+    min_permutations: int = 32,
+    max_permutations: int = 2000,
+    seed: Optional[int] = None,
+) -> np.ndarray:
+    """
+    Estimate Shapley values by sampling permutations.
+
+    Sampling stops early once the standard error of every estimate falls
+    below `tolerance` times the grand coalition's value.
+
+    Args:
+        values: Memoized characteristic function
+        tolerance: Relative standard error at which sampling stops
+        min_permutations: Permutations drawn before checking convergence
+        max_permutations: Hard cap on permutations drawn
+        seed: Seed for reproducible sampling
+
+    Returns:
+        One estimated Shapley value per model
+    """
+    n = values.n_models
+    rng = np.random.default_rng(seed)
+    grand = values((1 << n) - 1)
+    threshold = tolerance * max(abs(grand), 1e-12)
+
+    # Welford running mean and variance of each model's marginal contribution
+    mean = np.zeros(n)
+    m2 = np.zeros(n)
+    count = 0
+    marginal = np.zeros(n)
+    while count < max_permutations:
+        mask = 0
+        previous = 0.0
+        for i in rng.permutation(n):
+            mask |= 1 << int(i)
+            current = values(mask)
+            marginal[i] = current - previous
+            previous = current
+        count += 1
+        delta = marginal - mean
+        mean += delta / count
+        m2 += delta * (marginal - mean)
+
+        if count >= min_permutations:
+            stderr = np.sqrt(m2 / (count - 1) / count)
+            if np.all(stderr <= threshold):
+                break
+
+    logger.info(
+        "sampled shapley values",
+        models=n,
+        permutations=count,
+        coalitions_evaluated=values.evaluations,
+    )
+    return mean
+
+
+def shapley_values(
+    n_models: int,
+    value_fn: ValueFunction,
+    exact_max_models: int = EXACT_MAX_MODELS,
+    **sampling_options,
+) -> np.ndarray:
+    """
+    Compute Shapley values, exactly for small games and by sampling otherwise.
+
+    Args:
+        n_models: Number of players (models)
+        value_fn: Value of a coalition given the indices of its members
+        exact_max_models: Largest game solved exactly
+        **sampling_options: Passed to `sampled_shapley`
+
+    Returns:
+        One Shapley value per model
+    """
+    if n_models == 0:
+        return np.zeros(0)
+    values = CoalitionValues(n_models, value_fn)
+    if n_models <= exact_max_models:
+        return exact_shapley(values)
+    return sampled_shapley(values, **sampling_options)
+
+
+def consensus_value_function(
+    prices: Sequence[float],
+    confidence: Sequence[float],
+    reference_price: Optional[float] = None,
+) -> ValueFunction:
+    """
+    Build the characteristic function of the appraisal game.
+
+    Without a reference price, a coalition is worth its total confidence
+    discounted by how much its prices disagree (1 - coefficient of
+    variation, floored at 0). With a reference price, e.g. in backtests, it
+    is worth 1 minus the relative error of its confidence-weighted mean price.
+
+    Args:
+        prices: Final price of each model
+        confidence: Confidence score of each model
+        reference_price: Optional known value of the NFT
+
+    Returns:
+        Value function over coalition member indices
+    """
+    prices = np.asarray(prices, dtype=np.float64)
+    confidence = np.asarray(confidence, dtype=np.float64)
+
+    def value(members: Sequence[int]) -> float:
+        p = prices[members]
+        c = confidence[members]
+        if reference_price:
+            total = c.sum()
+            estimate = np.dot(c, p) / total if total > 0 else p.mean()
+            return max(0.0, 1.0 - abs(estimate - reference_price) / reference_price)
+        mean = p.mean()
+        dispersion = p.std() / mean if mean > 0 else 1.0
+        return float(c.sum() * max(0.0, 1.0 - dispersion))
+
+    return value
+
+
+def shapley_weights(
+    model_ids: Sequence[str],
+    prices: Sequence[float],
+    confidence: Sequence[float],
+    reference_price: Optional[float] = None,
+    **options,
+) -> Dict[str, float]:
+    """
+    Weight models by their Shapley value in the appraisal game.
+
+    Negative contributions get zero weight; the rest are normalized to sum
+    to 1, with equal weights if no model contributes.
+
+    Args:
+        model_ids: Models, in the order of `prices` and `confidence`
+        prices: Final price of each model
+        confidence: Confidence score of each model
+        reference_price: Optional known value of the NFT
+        **options: Passed to `shapley_values`
+
+    Returns:
+        Dictionary mapping model IDs to their weights
+    """
+    phi = shapley_values(
+        len(model_ids),
+        consensus_value_function(prices, confidence, reference_price),
+        **options,
+    )
+    positive = np.clip(phi, 0.0, None)
+    total = positive.sum()
+    if total > 0:
+        weights = positive / total
+    else:
+        weights = np.full(len(model_ids), 1.0 / max(len(model_ids), 1))
+    return dict(zip(model_ids, weights.tolist()))
@@ -0,0 +1,176 @@
+"""Cheap similarity tiers that avoid embedding calls for clear-cut pairs."""
+
+import re
+import threading
+import zlib
+from collections import Counter
+from typing import Dict, List, Optional, Set
+
+import numpy as np
+
+from flare_ai_consensus.router.metrics import (
+    metric_header,
+    metric_labels,
+    register_collector,
+)
+from flare_ai_consensus.settings import settings
+
+WORD_PATTERN = re.compile(r"[a-z0-9]+(?:\.[0-9]+)?")
+# Mersenne prime for the universal hash family (a * x + b) mod p; products of
+# two values below 2^31 fit in 64 bits
+MINHASH_PRIME = (1 << 31) - 1
+TIERS = ("exact", "near_duplicate", "embedding")
+
+
+def normalize_text(text: str) -> str:
+    """Lowercase a text and reduce it to its words separated by single spaces."""
+    return " ".join(WORD_PATTERN.findall(text.lower()))
+
+
+class SimilarityCascade:
+    """
+    Tiered text similarity that only embeds pairs it cannot settle cheaply.
+
+    1. Texts that are equal after normalization score 1.0.
+    2. Otherwise the Jaccard similarity of their word-bigram shingles is
+       estimated with MinHash. At or above `high` the texts are near
+       duplicates, scored by the cosine similarity of their shingle sets,
+       which sits on the same scale as an embedding cosine for such pairs.
+    3. Anything else goes to the embedding backend. A low Jaccard estimate
+       only says the wording changed, not that the meaning did, so it is
+       never used as a score.
+
+    Hit counts per tier are kept so `high` can be tuned against the
+    embedding calls it saves.
+    """
+
+    def __init__(self, high: float = 0.9, num_perm: int = 128):
+        """
+        Args:
+            high: Jaccard estimate at or above which a pair is a near duplicate
+            num_perm: Number of MinHash permutations (signature length)
+        """
+        self.high = high
+        self.num_perm = num_perm
+        rng = np.random.default_rng(0)
+        self._a = rng.integers(1, MINHASH_PRIME, num_perm, dtype=np.uint64)
+        self._b = rng.integers(0, MINHASH_PRIME, num_perm, dtype=np.uint64)
+        self._lock = threading.Lock()
+        self.hits: Counter[str] = Counter()
+
+    @staticmethod
+    def shingles(normalized: str) -> Set[str]:
+        """Word bigrams of a normalized text (its only word for one-word texts)."""
+        words = normalized.split()
+        shingles = {" ".join(words[i : i + 2]) for i in range(max(len(words) - 1, 1))}
+        shingles.discard("")
+        return shingles
+
+    def signature(self, normalized: str) -> Optional[np.ndarray]:
+        """
+        MinHash signature of a normalized text's word bigrams.
+
+        Args:
+            normalized: Output of `normalize_text`
+
+        Returns:
+            Signature of length `num_perm`, or None for an empty text
+        """
+        return self._signature(self.shingles(normalized))
+
+    def _signature(self, shingles: Set[str]) -> Optional[np.ndarray]:
+        if not shingles:
+            return None
+        hashes = np.fromiter(
+            (zlib.crc32(shingle.encode()) % MINHASH_PRIME for shingle in shingles),
+            dtype=np.uint64,
+            count=len(shingles),
+        )
+        permuted = (hashes[:, None] * self._a + self._b) % np.uint64(MINHASH_PRIME)
+        return permuted.min(axis=0)
+
+    def jaccard(self, text1: str, text2: str) -> float:
+        """Estimate the Jaccard similarity of two texts' word bigrams."""
+        sig1 = self.signature(normalize_text(text1))
+        sig2 = self.signature(normalize_text(text2))
+        if sig1 is None or sig2 is None:
+            return 0.0
+        return float(np.mean(sig1 == sig2))
+
+    def screen(self, text1: str, text2: str) -> Optional[float]:
+        """
+        Score a pair with the cheap tiers.
+
+        Args:
+            text1: First text
+            text2: Second text
+
+        Returns:
+            1.0 for equal texts, the shingle-set cosine similarity for near
+            duplicates, or None when the pair needs embeddings
+        """
+        normalized1, normalized2 = normalize_text(text1), normalize_text(text2)
+        if normalized1 == normalized2:
+            self._count("exact")
+            return 1.0
+
+        shingles1, shingles2 = self.shingles(normalized1), self.shingles(normalized2)
+        sig1, sig2 = self._signature(shingles1), self._signature(shingles2)
+        if sig1 is not None and sig2 is not None:
+            estimate = float(np.mean(sig1 == sig2))
+            if estimate >= self.high:
+                self._count("near_duplicate")
+                # |A & B| = J (|A| + |B|) / (1 + J), over sqrt(|A| |B|)
+                size1, size2 = len(shingles1), len(shingles2)
+                overlap = estimate * (size1 + size2) / (1 + estimate)
+                return min(1.0, overlap / float(np.sqrt(size1 * size2)))
+        self._count("embedding")
+        return None
+
+    def _count(self, tier: str) -> None:
+        with self._lock:
+            self.hits[tier] += 1
+
+    def stats(self) -> Dict[str, float]:
+        """Return the hits per tier and the share of pairs that skipped embeddings."""
+        with self._lock:
+            hits = {tier: self.hits[tier] for tier in TIERS}
+        total = sum(hits.values())
+        return {
+            **hits,
+            "pairs": total,
+            "embedding_calls_saved": (total - hits["embedding"]) / total if total else 0.0,
+        }
+
+
+_default_cascade: Optional[SimilarityCascade] = None
+
+
+def get_similarity_cascade() -> Optional[SimilarityCascade]:
+    """Return the process-wide cascade, or None when disabled in settings."""
+    global _default_cascade  # noqa: PLW0603
+    if not settings.similarity_cascade_enabled:
+        return None
+    if _default_cascade is None:
+        _default_cascade = SimilarityCascade(high=settings.similarity_cascade_high)
+    return _default_cascade
+
+
+def _render_cascade_metrics() -> List[str]:
+    """Text pairs scored per cascade tier, when the cascade is enabled."""
+    cascade = get_similarity_cascade()
+    if cascade is None:
+        return []
+    stats = cascade.stats()
+    lines = metric_header(
+        "similarity_cascade_pairs_total",
+        "counter",
+        "Text pairs scored per similarity cascade tier.",
+    )
+    for tier in TIERS:
+        labels = metric_labels(tier=tier)
+        lines.append(f"similarity_cascade_pairs_total{labels} {stats[tier]}")
+    return lines
+
+
+register_collector("similarity_cascade", _render_cascade_metrics)
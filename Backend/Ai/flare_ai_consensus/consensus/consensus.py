@@ -1,55 +1,97 @@
-import asyncio
+import time
+from collections.abc import Callable
+from dataclasses import dataclass
+from typing import Any
 
 import structlog
 
 from flare_ai_consensus.consensus.aggregator import async_centralized_llm_aggregator
-from flare_ai_consensus.router import AsyncOpenRouterProvider, ChatRequest
+from flare_ai_consensus.consensus.convergence import has_converged
+from flare_ai_consensus.consensus.quorum import RoundResponses, gather_quorum
+from flare_ai_consensus.router import (
+    AsyncOpenRouterProvider,
+    ChatRequest,
+    ModelResponse,
+)
 from flare_ai_consensus.settings import ConsensusConfig, Message, ModelConfig
-from flare_ai_consensus.utils import parse_chat_response
+from flare_ai_consensus.utils import parse_stream_delta
 
 logger = structlog.get_logger(__name__)
 
+# Called with (model_id, text) for every partial piece of a streamed response.
+DeltaCallback = Callable[[str, str], None]
+
+
+@dataclass(frozen=True, slots=True)
+class ConsensusResult:
+    """
+    Final aggregated response of the consensus loop and how the loop ran.
+
+    `rounds_run` and `rounds_saved` tell how many improvement rounds ran and
+    how many were skipped because the prices converged; `response_data`
+    holds the responses, dropped models and aggregate of every round.
+    """
+
+    text: str
+    rounds_run: int
+    rounds_saved: int
+    response_data: dict[str, Any]
+
 
 async def run_consensus(
     provider: AsyncOpenRouterProvider,
     consensus_config: ConsensusConfig,
     initial_conversation: list[Message],
-) -> str:
+) -> ConsensusResult:
     """
     Asynchronously runs the consensus learning loop.
 
+    Improvement rounds stop early once the models' price estimates converge
+    (see `ConsensusConfig.convergence_threshold`).
+
     :param provider: An instance of an AsyncOpenRouterProvider.
     :param consensus_config: An instance of ConsensusConfig.
     :param initial_conversation: the input user prompt with system instructions.
-
-    Returns: aggregated response (str)
-    All responses are stored in response_data and can be returned for future use.
+    :return: The final aggregated response with the rounds run and saved
+        and the data of every round.
     """
-    response_data = {}
+    aggregator_config = consensus_config.aggregator_config
+    provider.configure_models(
+        [*consensus_config.models, aggregator_config.model]
+        + ([aggregator_config.fast_model] if aggregator_config.fast_model else [])
+    )
+    response_data: dict[str, Any] = {}
     response_data["initial_conversation"] = initial_conversation
 
     # Step 1: Initial round.
     responses = await send_round(
         provider, consensus_config, response_data["initial_conversation"]
     )
-    aggregated_response = await async_centralized_llm_aggregator(
+    aggregation = await async_centralized_llm_aggregator(
         provider, consensus_config.aggregator_config, responses
     )
+    aggregated_response = aggregation.text
     logger.info(
         "initial response aggregation complete", aggregated_response=aggregated_response
     )
 
     response_data["iteration_0"] = responses
+    response_data["dropped_0"] = responses.dropped
     response_data["aggregate_0"] = aggregated_response
 
-    # Step 2: Improvement rounds.
+    # Step 2: Improvement rounds, until the price estimates converge.
+    rounds_run = 0
     for i in range(consensus_config.iterations):
+        if has_converged(responses, consensus_config):
+            break
+        rounds_run += 1
         responses = await send_round(
             provider, consensus_config, initial_conversation, aggregated_response
         )
-        aggregated_response = await async_centralized_llm_aggregator(
+        aggregation = await async_centralized_llm_aggregator(
             provider, consensus_config.aggregator_config, responses
         )
+        aggregated_response = aggregation.text
         logger.info(
             "responses aggregated",
             iteration=i + 1,
@@ -57,9 +99,14 @@ async def run_consensus(
         )
 
         response_data[f"iteration_{i + 1}"] = responses
+        response_data[f"dropped_{i + 1}"] = responses.dropped
         response_data[f"aggregate_{i + 1}"] = aggregated_response
 
-    return aggregated_response
+    rounds_saved = consensus_config.iterations - rounds_run
+    response_data["rounds_run"] = rounds_run
+    response_data["rounds_saved"] = rounds_saved
+    logger.info("consensus complete", rounds_run=rounds_run, rounds_saved=rounds_saved)
+    return ConsensusResult(aggregated_response, rounds_run, rounds_saved, response_data)
 
 
 def _build_improvement_conversation(
@@ -97,7 +144,8 @@ async def _get_response_for_model(
     model: ModelConfig,
     initial_conversation: list[Message],
     aggregated_response: str | None,
-) -> tuple[str | None, str]:
+    on_delta: DeltaCallback | None = None,
+) -> ModelResponse:
     """
     Asynchronously sends a chat completion request for a given model.
 
@@ -107,7 +155,9 @@ async def _get_response_for_model(
     :param initial_conversation: the input user prompt with system instructions.
     :param aggregated_response: The aggregated consensus response
         from the previous round (or None).
-    :return: A tuple of (model_id, response text).
+    :param on_delta: Optional callback receiving partial text as it streams in.
+        When set, the response is requested with `stream=true`.
+    :return: The parsed response.
     """
     if not aggregated_response:
         # Use initial prompt for the first round.
@@ -125,11 +175,40 @@ async def _get_response_for_model(
         "messages": conversation,
         "max_tokens": model.max_tokens,
         "temperature": model.temperature,
+        # The initial conversation is shared by every model and round.
+        "cache_prefix": len(initial_conversation),
     }
-    response = await provider.send_chat_completion(payload)
-    text = parse_chat_response(response)
-    logger.info("new response", model_id=model.model_id, response=text)
-    return model.model_id, text
+    if on_delta is None:
+        response = await provider.send_chat(payload)
+    else:
+        response = await _stream_response(provider, payload, on_delta)
+    logger.info("new response", model_id=model.model_id, response=response.text)
+    return response
+
+
+async def _stream_response(
+    provider: AsyncOpenRouterProvider,
+    payload: ChatRequest,
+    on_delta: DeltaCallback,
+) -> ModelResponse:
+    """
+    Stream a chat completion, forwarding each text delta to `on_delta`.
+
+    :return: The full response, parsed once the stream completes.
+    """
+    start = time.perf_counter()
+    parts: list[str] = []
+    usage = None
+    async for chunk in provider.stream_chat_completion(payload):
+        delta = parse_stream_delta(chunk)
+        if delta:
+            parts.append(delta)
+            on_delta(payload["model"], delta)
+        usage = chunk.get("usage") or usage
+    logger.debug("stream complete", model_id=payload["model"], usage=usage)
+    return ModelResponse(
+        payload["model"], "".join(parts), time.perf_counter() - start, usage
+    )
 
 
 async def send_round(
@@ -137,22 +216,36 @@ async def send_round(
     consensus_config: ConsensusConfig,
     initial_conversation: list[Message],
     aggregated_response: str | None = None,
-) -> dict:
+    on_delta: DeltaCallback | None = None,
+) -> RoundResponses:
     """
     Asynchronously sends a round of chat completion requests for all models.
 
+    The round follows the quorum policy of `consensus_config`: it closes once
+    `min_responses` models have answered or `round_deadline` has passed,
+    cancelling the remaining requests. Failed or cut-off models are listed in
+    the result's `dropped` mapping.
+
     :param provider: An instance of an asynchronous OpenRouter provider.
     :param consensus_config: An instance of ConsensusConfig.
     :param initial_conversation: the input user prompt with system instructions.
     :param aggregated_response: The aggregated consensus response from the
         previous round (or None).
-    :return: A dictionary mapping model IDs to their response texts.
+    :param on_delta: Optional callback receiving (model_id, partial text) while
+        responses stream in, e.g. to push progress to an SSE client.
+    :return: A dictionary mapping model IDs to their parsed responses.
     """
-    tasks = [
-        _get_response_for_model(
-            provider, consensus_config, model, initial_conversation, aggregated_response
+    requests = {
+        model.model_id: _get_response_for_model(
+            provider,
+            consensus_config,
+            model,
+            initial_conversation,
+            aggregated_response,
+            on_delta,
         )
         for model in consensus_config.models
-    ]
-    results = await asyncio.gather(*tasks)
-    return dict(results)
+    }
+    return await gather_quorum(
+        requests, consensus_config.min_responses, consensus_config.round_deadline
+    )
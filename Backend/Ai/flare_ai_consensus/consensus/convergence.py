@@ -0,0 +1,67 @@
+from collections.abc import Iterable, Mapping
+
+import numpy as np
+import structlog
+
+from flare_ai_consensus.router import ModelResponse
+from flare_ai_consensus.settings import ConsensusConfig
+
+logger = structlog.get_logger(__name__)
+
+
+def response_prices(responses: Mapping[str, ModelResponse]) -> dict[str, float]:
+    """
+    Collect the price estimate of every response that contains one.
+
+    :param responses: Parsed responses keyed by model ID.
+    :return: Prices keyed by model ID.
+    """
+    return {
+        model_id: response.price
+        for model_id, response in responses.items()
+        if response.price is not None
+    }
+
+
+def price_dispersion(prices: Iterable[float], metric: str = "cv") -> float | None:
+    """
+    Measure how far apart a set of price estimates is.
+
+    :param prices: The price estimates.
+    :param metric: "cv" for the coefficient of variation (std / mean) or
+        "spread" for the relative spread ((max - min) / median).
+    :return: The dispersion, or None with fewer than two positive prices.
+    """
+    values = np.array([p for p in prices if p > 0], dtype=float)
+    if values.size < 2:  # noqa: PLR2004
+        return None
+    if metric == "spread":
+        return float(np.ptp(values) / np.median(values))
+    return float(values.std() / values.mean())
+
+
+def has_converged(
+    responses: Mapping[str, ModelResponse], consensus_config: ConsensusConfig
+) -> bool:
+    """
+    Decide whether a round's price estimates agree closely enough to stop.
+
+    :param responses: Parsed responses of the round keyed by model ID.
+    :param consensus_config: An instance of ConsensusConfig.
+    :return: True if the dispersion is below `convergence_threshold`.
+    """
+    threshold = consensus_config.convergence_threshold
+    if threshold is None:
+        return False
+    dispersion = price_dispersion(
+        response_prices(responses).values(), consensus_config.convergence_metric
+    )
+    converged = dispersion is not None and dispersion <= threshold
+    logger.info(
+        "convergence check",
+        metric=consensus_config.convergence_metric,
+        dispersion=dispersion,
+        threshold=threshold,
+        converged=converged,
+    )
+    return converged
@@ -0,0 +1,93 @@
+import asyncio
+import time
+from collections.abc import Awaitable, Callable
+
+import structlog
+
+from flare_ai_consensus.router import ModelResponse
+
+logger = structlog.get_logger(__name__)
+
+
+class RoundResponses(dict[str, ModelResponse]):
+    """
+    Responses of one round keyed by model ID.
+
+    Models that did not contribute are listed in `dropped` with the reason
+    ("error: ...", "empty response", "deadline" or "quorum reached").
+    """
+
+    def __init__(self) -> None:
+        super().__init__()
+        self.dropped: dict[str, str] = {}
+
+
+async def gather_quorum(
+    requests: dict[str, Awaitable[ModelResponse]],
+    min_responses: int | None = None,
+    deadline: float | None = None,
+    is_valid: Callable[[ModelResponse], bool] = bool,
+) -> RoundResponses:
+    """
+    Run per-model requests concurrently until a quorum of valid answers exists.
+
+    The round returns as soon as `min_responses` valid answers are in or
+    `deadline` seconds have passed, whichever comes first; outstanding
+    requests are cancelled. A failing model is dropped instead of failing
+    the whole round.
+
+    :param requests: Awaitables producing the parsed responses, keyed by model ID.
+    :param min_responses: Valid answers needed to close the round early.
+        Defaults to waiting for every model.
+    :param deadline: Seconds after which the round closes with whatever
+        answers have arrived.
+    :param is_valid: Predicate deciding whether a response counts.
+    :return: The valid responses, with the dropped models recorded.
+    :raises Exception: The first error, if no model produced a valid answer.
+    """
+    result = RoundResponses()
+    tasks = {
+        asyncio.ensure_future(request): model_id
+        for model_id, request in requests.items()
+    }
+    quorum = min(min_responses or len(tasks), len(tasks))
+    end = time.monotonic() + deadline if deadline is not None else None
+    pending = set(tasks)
+    first_error: BaseException | None = None
+
+    try:
+        while pending and len(result) < quorum:
+            timeout = None if end is None else end - time.monotonic()
+            if timeout is not None and timeout <= 0:
+                break
+            done, pending = await asyncio.wait(
+                pending, timeout=timeout, return_when=asyncio.FIRST_COMPLETED
+            )
+            for task in done:
+                model_id = tasks[task]
+                error = task.exception()
+                if error is not None:
+                    first_error = first_error or error
+                    result.dropped[model_id] = f"error: {error}"
+                    logger.warning("model failed", model_id=model_id, error=str(error))
+                elif not is_valid(task.result()):
+                    result.dropped[model_id] = "empty response"
+                else:
+                    result[model_id] = task.result()
+    finally:
+        reason = "quorum reached" if len(result) >= quorum else "deadline"
+        for task in pending:
+            task.cancel()
+            result.dropped[tasks[task]] = reason
+        if pending:
+            await asyncio.gather(*pending, return_exceptions=True)
+
+    if result.dropped:
+        logger.info(
+            "round closed without all models",
+            responses=len(result),
+            dropped=result.dropped,
+        )
+    if not result and first_error is not None:
+        raise first_error
+    return result
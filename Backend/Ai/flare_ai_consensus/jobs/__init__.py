@@ -0,0 +1,17 @@
+from .scheduler import (
+    Job,
+    JobScheduler,
+    JobStatus,
+    SchedulerSaturated,
+    close_job_scheduler,
+    get_job_scheduler,
+)
+
+__all__ = [
+    "Job",
+    "JobScheduler",
+    "JobStatus",
+    "SchedulerSaturated",
+    "close_job_scheduler",
+    "get_job_scheduler",
+]
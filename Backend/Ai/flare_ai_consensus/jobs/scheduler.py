@@ -0,0 +1,414 @@
+"""
+Bounded scheduler for appraisals submitted as jobs.
+
+A synchronous appraisal holds its HTTP connection open for the whole
+multi-round model run, and nothing limits how many run at once. Jobs instead
+wait in a bounded queue for one of a fixed number of workers, so at most
+`concurrency` appraisals compete for the rate limiter and connection pool
+while the rest queue up. Once the queue is full, submissions are refused with
+an estimate of how long the queued jobs take to start, which the API returns
+as Retry-After. Finished jobs are kept for a retention period so that clients
+can poll for their result. Outcomes and queue depth are exported on
+`/metrics`.
+"""
+
+import asyncio
+import json
+import math
+import threading
+import time
+import uuid
+import weakref
+from collections import Counter, deque
+from collections.abc import Awaitable, Callable
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Any, Literal
+
+import structlog
+
+from flare_ai_consensus.router import (
+    metric_header,
+    metric_labels,
+    register_collector,
+)
+from flare_ai_consensus.settings import settings
+
+logger = structlog.get_logger(__name__)
+
+JobStatus = Literal["queued", "running", "succeeded", "failed", "cancelled"]
+
+FINISHED: frozenset[JobStatus] = frozenset({"succeeded", "failed", "cancelled"})
+
+# Assumed duration of a job until one has finished, and the longest
+# Retry-After ever suggested
+DEFAULT_JOB_SECONDS = 60.0
+MAX_RETRY_AFTER = 600
+
+# Outcomes of every scheduler in the process, kept across scheduler restarts
+_outcomes: Counter[str] = Counter()
+_outcomes_lock = threading.Lock()
+
+
+def _record_outcome(outcome: str) -> None:
+    with _outcomes_lock:
+        _outcomes[outcome] += 1
+
+
+class SchedulerSaturated(Exception):
+    """Raised when a job is submitted while the queue is full."""
+
+    def __init__(self, retry_after: int) -> None:
+        """
+        :param retry_after: Seconds after which a retry is likely to be queued.
+        """
+        super().__init__(f"Appraisal queue is full, retry in {retry_after}s")
+        self.retry_after = retry_after
+
+
+@dataclass(slots=True, eq=False)
+class Job:
+    """An appraisal submitted to the scheduler, and its outcome."""
+
+    strategy: str
+    contract_address: str
+    token_id: str
+    appraise: Callable[[str, str], Awaitable[dict[str, Any] | str | None]] = field(
+        repr=False
+    )
+    id: str = field(default_factory=lambda: uuid.uuid4().hex)
+    status: JobStatus = "queued"
+    submitted_at: float = field(default_factory=time.time)
+    started_at: float | None = None
+    finished_at: float | None = None
+    result: dict[str, Any] | None = None
+    error: str | None = None
+    done: asyncio.Event = field(default_factory=asyncio.Event, repr=False)
+    task: "asyncio.Task[None] | None" = field(default=None, repr=False)
+
+    @property
+    def finished(self) -> bool:
+        return self.status in FINISHED
+
+    def to_dict(self) -> dict[str, Any]:
+        """Return the job's status, and its result or error once finished."""
+        data: dict[str, Any] = {
+            "job_id": self.id,
+            "status": self.status,
+            "strategy": self.strategy,
+            "contract_address": self.contract_address,
+            "token_id": self.token_id,
+        }
+        for name in ("submitted_at", "started_at", "finished_at"):
+            value = getattr(self, name)
+            if value is not None:
+                data[name] = datetime.fromtimestamp(value).isoformat()
+        if self.result is not None:
+            data["result"] = self.result
+        if self.error is not None:
+            data["error"] = self.error
+        return data
+
+
+class JobScheduler:
+    """Runs appraisal jobs on a fixed number of workers behind a bounded queue."""
+
+    def __init__(
+        self,
+        concurrency: int = 4,
+        max_queue: int = 64,
+        timeout: float | None = None,
+        retention: float = 3600.0,
+        max_jobs: int = 10000,
+    ) -> None:
+        """
+        :param concurrency: Jobs run at once.
+        :param max_queue: Jobs waiting for a worker before submissions are
+            refused.
+        :param timeout: Seconds before a running job is failed, or None.
+        :param retention: Seconds a finished job stays available.
+        :param max_jobs: Jobs kept before finished ones are discarded early,
+            oldest first.
+        """
+        self.concurrency = concurrency
+        self.max_queue = max_queue
+        self.timeout = timeout
+        self.retention = retention
+        self.max_jobs = max_jobs
+        self.running = 0
+        self.counts: Counter[str] = Counter()
+        # Moving average of how long finished jobs ran
+        self.average_duration: float | None = None
+        self._pending: deque[Job] = deque()
+        self._ready = asyncio.Event()
+        self._jobs: dict[str, Job] = {}
+        self._workers: list[asyncio.Task[None]] = []
+
+    @property
+    def queued(self) -> int:
+        """Number of jobs waiting for a worker."""
+        return len(self._pending)
+
+    def start(self) -> None:
+        """Start the workers on the running event loop, if not already started."""
+        if not self._workers:
+            loop = asyncio.get_running_loop()
+            self._workers = [
+                loop.create_task(self._work(), name=f"appraisal-worker-{i}")
+                for i in range(self.concurrency)
+            ]
+
+    def submit(
+        self,
+        strategy: str,
+        appraise: Callable[[str, str], Awaitable[dict[str, Any] | str | None]],
+        contract_address: str,
+        token_id: str,
+    ) -> Job:
+        """
+        Queue an appraisal.
+
+        :param strategy: Name of the appraisal strategy.
+        :param appraise: The strategy's coroutine function.
+        :param contract_address: The NFT contract.
+        :param token_id: The NFT token.
+        :return: The queued job.
+        :raises SchedulerSaturated: If the queue is full.
+        """
+        if len(self._pending) >= self.max_queue:
+            self.counts["rejected"] += 1
+            _record_outcome("rejected")
+            retry_after = self.retry_after()
+            logger.warning(
+                "appraisal queue full",
+                queued=len(self._pending),
+                running=self.running,
+                retry_after=retry_after,
+            )
+            raise SchedulerSaturated(retry_after)
+        self.start()
+        job = Job(strategy, contract_address, token_id, appraise)
+        self._prune(reserve=1)
+        self._jobs[job.id] = job
+        self._pending.append(job)
+        self._ready.set()
+        logger.info("appraisal job queued", job_id=job.id, strategy=strategy)
+        return job
+
+    async def run(
+        self,
+        strategy: str,
+        appraise: Callable[[str, str], Awaitable[dict[str, Any] | str | None]],
+        contract_address: str,
+        token_id: str,
+    ) -> Job:
+        """
+        Queue an appraisal and wait for it to finish.
+
+        The job is cancelled if the caller is.
+
+        :return: The finished job.
+        :raises SchedulerSaturated: If the queue is full.
+        """
+        job = self.submit(strategy, appraise, contract_address, token_id)
+        try:
+            await job.done.wait()
+        except asyncio.CancelledError:
+            self.cancel(job.id)
+            raise
+        return job
+
+    def get(self, job_id: str) -> Job | None:
+        """Return a job, or None if unknown or expired."""
+        self._prune()
+        return self._jobs.get(job_id)
+
+    def position(self, job: Job) -> int | None:
+        """Return how many jobs are queued ahead of `job`, or None if not queued."""
+        try:
+            return self._pending.index(job)
+        except ValueError:
+            return None
+
+    def cancel(self, job_id: str) -> bool:
+        """
+        Cancel a queued or running job.
+
+        :param job_id: The job.
+        :return: Whether the job had not finished yet.
+        """
+        job = self._jobs.get(job_id)
+        if job is None or job.finished:
+            return False
+        if job.task is not None:
+            job.task.cancel()
+        else:
+            self._pending.remove(job)
+            self._finish(job, "cancelled")
+        return True
+
+    def retry_after(self) -> int:
+        """
+        Estimate the seconds until the currently queued jobs have started.
+
+        A job submitted sooner would only wait behind them, or be refused
+        again, so this is what a refused client is asked to wait.
+        """
+        average = self.average_duration or self.timeout or DEFAULT_JOB_SECONDS
+        waves = math.ceil((len(self._pending) + 1) / self.concurrency)
+        return max(1, min(MAX_RETRY_AFTER, math.ceil(waves * average)))
+
+    async def _work(self) -> None:
+        while True:
+            while not self._pending:
+                self._ready.clear()
+                await self._ready.wait()
+            job = self._pending.popleft()
+            job.task = asyncio.create_task(
+                self._execute(job), name=f"appraisal-job-{job.id}"
+            )
+            # Wait without propagating the job's cancellation to the worker
+            await asyncio.wait({job.task})
+            if not job.finished:
+                # Cancelled before it got to run
+                self._finish(job, "cancelled")
+
+    async def _execute(self, job: Job) -> None:
+        job.status = "running"
+        job.started_at = time.time()
+        self.running += 1
+        status: JobStatus = "cancelled"
+        try:
+            result = await asyncio.wait_for(
+                job.appraise(job.contract_address, job.token_id), self.timeout
+            )
+            if result is None:
+                job.error = "Appraisal did not run"
+                status = "failed"
+            else:
+                result = json.loads(result) if isinstance(result, str) else result
+                # Strategies report failures as {"error": ...} rather than raising
+                if isinstance(result, dict) and "error" in result:
+                    job.error = str(result["error"])
+                    status = "failed"
+                else:
+                    job.result = result
+                    status = "succeeded"
+        except TimeoutError:
+            job.error = f"Appraisal timed out after {self.timeout}s"
+            status = "failed"
+        except Exception as e:
+            logger.exception("appraisal job failed", job_id=job.id, error=str(e))
+            job.error = str(e)
+            status = "failed"
+        finally:
+            self.running -= 1
+            self._finish(job, status)
+
+    def _finish(self, job: Job, status: JobStatus) -> None:
+        job.status = status
+        job.finished_at = time.time()
+        if status != "cancelled" and job.started_at is not None:
+            duration = job.finished_at - job.started_at
+            self.average_duration = (
+                duration
+                if self.average_duration is None
+                else 0.8 * self.average_duration + 0.2 * duration
+            )
+        self.counts[status] += 1
+        _record_outcome(status)
+        job.done.set()
+        logger.info("appraisal job finished", job_id=job.id, status=status)
+
+    def _prune(self, reserve: int = 0) -> None:
+        """Discard expired jobs, and the oldest finished ones when full."""
+        now = time.time()
+        finished = [
+            job for job in self._jobs.values() if job.finished_at is not None
+        ]
+        excess = len(self._jobs) + reserve - self.max_jobs
+        for job in finished:
+            if excess > 0 or now - (job.finished_at or now) > self.retention:
+                del self._jobs[job.id]
+                excess -= 1
+
+    def stats(self) -> dict[str, int]:
+        """Return the queued and running jobs, and finished ones by outcome."""
+        return {"queued": len(self._pending), "running": self.running, **self.counts}
+
+    async def stop(self) -> None:
+        """Cancel every queued and running job, then stop the workers."""
+        jobs = list(self._jobs.values())
+        for job in jobs:
+            self.cancel(job.id)
+        tasks = [job.task for job in jobs if job.task is not None]
+        await asyncio.gather(*tasks, return_exceptions=True)
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+        for job in jobs:
+            if not job.finished:
+                self._finish(job, "cancelled")
+
+
+_schedulers: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, JobScheduler]" = (
+    weakref.WeakKeyDictionary()
+)
+
+
+def get_job_scheduler() -> JobScheduler:
+    """
+    Return the running event loop's job scheduler, configured from settings.
+
+    Workers are tasks of the loop they were started on, so each loop gets
+    its own scheduler.
+    """
+    loop = asyncio.get_running_loop()
+    scheduler = _schedulers.get(loop)
+    if scheduler is None:
+        scheduler = JobScheduler(
+            concurrency=settings.job_concurrency,
+            max_queue=settings.job_queue_size,
+            timeout=settings.job_timeout,
+            retention=settings.job_retention,
+            max_jobs=settings.job_max_jobs,
+        )
+        _schedulers[loop] = scheduler
+        logger.debug(
+            "created job scheduler",
+            concurrency=scheduler.concurrency,
+            max_queue=scheduler.max_queue,
+        )
+    return scheduler
+
+
+async def close_job_scheduler() -> None:
+    """Cancel the jobs of the running event loop's scheduler and forget it."""
+    scheduler = _schedulers.pop(asyncio.get_running_loop(), None)
+    if scheduler is not None:
+        await scheduler.stop()
+
+
+def _render_job_metrics() -> list[str]:
+    """Job outcomes, and the jobs waiting or running on every loop."""
+    with _outcomes_lock:
+        outcomes = sorted(_outcomes.items())
+    schedulers = list(_schedulers.values())
+    lines = metric_header(
+        "appraisal_jobs_total", "counter", "Scheduled appraisals by outcome."
+    )
+    for outcome, count in outcomes:
+        labels = metric_labels(outcome=outcome)
+        lines.append(f"appraisal_jobs_total{labels} {count}")
+    lines += metric_header(
+        "appraisal_jobs", "gauge", "Scheduled appraisals waiting or running."
+    )
+    queued = sum(scheduler.queued for scheduler in schedulers)
+    running = sum(scheduler.running for scheduler in schedulers)
+    lines.append(f"appraisal_jobs{metric_labels(state='queued')} {queued}")
+    lines.append(f"appraisal_jobs{metric_labels(state='running')} {running}")
+    return lines
+
+
+register_collector("appraisal_jobs", _render_job_metrics)
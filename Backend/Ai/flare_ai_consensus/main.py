@@ -0,0 +1,114 @@
+"""
+ASGI application serving every appraisal strategy from one event loop.
+
+The server's loop is long-lived, so the pooled HTTP clients, rate limiter,
+response cache and embedding services it owns are created once and shared
+by all concurrent appraisals, instead of being rebuilt per request. How
+many appraisals run at once is bounded by the loop's job scheduler.
+"""
+
+from collections.abc import AsyncIterator
+from contextlib import asynccontextmanager
+
+import structlog
+from fastapi import APIRouter, FastAPI
+from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import PlainTextResponse
+
+from flare_ai_consensus.api import (
+    AppraisalRouter,
+    Appraiser,
+    ChatRouter,
+    JobRouter,
+    StreamRouter,
+)
+from flare_ai_consensus.jobs import close_job_scheduler
+from flare_ai_consensus.router import (
+    AsyncOpenRouterProvider,
+    close_client_pool,
+    prewarm_connections,
+    render_metrics,
+)
+from flare_ai_consensus.settings import ConsensusConfig, settings
+from flare_ai_consensus.streaming import close_heartbeat
+
+logger = structlog.get_logger(__name__)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI) -> AsyncIterator[None]:
+    """Open pooled connections at startup; cancel jobs and close at shutdown."""
+    await prewarm_connections()
+    yield
+    stream: StreamRouter | None = getattr(app.state, "stream_router", None)
+    if stream is not None:
+        await stream.cancel_jobs()
+    await close_job_scheduler()
+    await close_heartbeat()
+    await close_client_pool()
+    logger.info("closed pooled connections")
+
+
+def create_app(
+    strategies: dict[str, Appraiser] | None = None,
+    streams: dict[str, Appraiser] | None = None,
+    consensus_config: ConsensusConfig | None = None,
+) -> FastAPI:
+    """
+    Create the FastAPI application.
+
+    :param strategies: Appraisal coroutines keyed by route path; they are
+        also submitted as jobs to `/appraisals` under the path's name.
+    :param streams: Appraisal coroutines that publish their progress, keyed
+        by the route path of their server-sent event stream.
+    :param consensus_config: Configuration of the chat endpoint; the endpoint
+        is only mounted when a configuration is given.
+    :return: The application.
+    """
+    app = FastAPI(
+        title="NFT Appraisal API",
+        redirect_slashes=False,
+        lifespan=lifespan,
+    )
+    app.add_middleware(
+        CORSMiddleware,
+        allow_origins=settings.cors_origins,
+        allow_credentials=True,
+        allow_methods=["*"],
+        allow_headers=["*"],
+    )
+
+    if strategies:
+        appraisal = AppraisalRouter(router=APIRouter(), strategies=strategies)
+        app.include_router(appraisal.router, tags=["appraisal"])
+        jobs = JobRouter(router=APIRouter(), strategies=strategies)
+        app.include_router(jobs.router, tags=["jobs"])
+
+    if streams:
+        stream = StreamRouter(router=APIRouter(), strategies=streams)
+        app.include_router(stream.router, tags=["stream"])
+        app.state.stream_router = stream
+
+    if consensus_config is not None:
+        provider = AsyncOpenRouterProvider(
+            api_key=settings.open_router_api_key,
+            base_url=settings.open_router_base_url,
+        )
+        provider.configure_models(
+            [*consensus_config.models, consensus_config.aggregator_config.model]
+        )
+        chat = ChatRouter(
+            router=APIRouter(),
+            provider=provider,
+            consensus_config=consensus_config,
+        )
+        app.include_router(chat.router, prefix="/api/routes/chat", tags=["chat"])
+
+    @app.get("/metrics", response_class=PlainTextResponse)
+    async def metrics() -> PlainTextResponse:  # pyright: ignore [reportUnusedFunction]
+        """Router latency, token and cost metrics in the Prometheus text format."""
+        return PlainTextResponse(
+            render_metrics(), media_type="text/plain; version=0.0.4"
+        )
+
+    return app
@@ -1,9 +1,66 @@
-from .base_router import ChatRequest, CompletionRequest
+from .base_router import (
+    ChatRequest,
+    CompletionRequest,
+    RouterHTTPError,
+    RouterObserver,
+)
+from .cache import ResponseCache, SQLiteResponseStore, cache_key, get_response_cache
+from .client_pool import (
+    ClientPool,
+    close_client_pool,
+    get_aiohttp_session,
+    get_client_pool,
+    get_http_client,
+    prewarm_connections,
+)
+from .latency import LatencyTracker, get_latency_tracker
+from .metrics import (
+    MetricsCollector,
+    RouterMetrics,
+    get_router_metrics,
+    metric_header,
+    metric_labels,
+    register_collector,
+    render_metrics,
+)
 from .openrouter import AsyncOpenRouterProvider, OpenRouterProvider
+from .rate_limiter import (
+    ModelRateLimits,
+    RateLimiter,
+    SQLiteBucketStore,
+    get_rate_limiter,
+)
+from .response import ModelResponse
 
 __all__ = [
     "AsyncOpenRouterProvider",
     "ChatRequest",
+    "ClientPool",
     "CompletionRequest",
+    "LatencyTracker",
+    "MetricsCollector",
+    "ModelRateLimits",
+    "ModelResponse",
     "OpenRouterProvider",
+    "RateLimiter",
+    "ResponseCache",
+    "RouterHTTPError",
+    "RouterMetrics",
+    "RouterObserver",
+    "SQLiteBucketStore",
+    "SQLiteResponseStore",
+    "cache_key",
+    "close_client_pool",
+    "get_aiohttp_session",
+    "get_client_pool",
+    "get_http_client",
+    "get_latency_tracker",
+    "get_rate_limiter",
+    "get_response_cache",
+    "get_router_metrics",
+    "metric_header",
+    "metric_labels",
+    "prewarm_connections",
+    "register_collector",
+    "render_metrics",
 ]
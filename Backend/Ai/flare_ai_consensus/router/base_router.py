@@ -1,9 +1,34 @@
-from typing import Any, TypedDict
+import asyncio
+import json
+import random
+import time
+from collections import Counter
+from collections.abc import AsyncIterator, Callable, Iterable
+from contextlib import AbstractAsyncContextManager, nullcontext
+from typing import Any, NotRequired, TypedDict
 
 import httpx
 import requests
+import structlog
 
-from flare_ai_consensus.settings import Message
+from flare_ai_consensus.router.client_pool import get_http_client
+from flare_ai_consensus.router.latency import LatencyTracker, get_latency_tracker
+from flare_ai_consensus.router.metrics import RouterMetrics, get_router_metrics
+from flare_ai_consensus.settings import Message, ModelConfig
+
+logger = structlog.get_logger(__name__)
+
+# Statuses worth retrying: rate limiting and transient upstream failures.
+RETRYABLE_STATUSES = frozenset({408, 429, 500, 502, 503, 504})
+MIN_ADAPTIVE_TIMEOUT = 5.0
+ADAPTIVE_TIMEOUT_FACTOR = 3.0
+BACKOFF_BASE = 0.5
+BACKOFF_CAP = 30.0
+
+# Receives (event type, data) for every call, e.g. an SSE `send_event`.
+# Events: "model_request" before each attempt and "model_response_received"
+# once it completes (successfully or not).
+RouterObserver = Callable[[str, dict[str, Any]], None]
 
 
 class CompletionRequest(TypedDict):
@@ -18,6 +43,41 @@ class ChatRequest(TypedDict):
     messages: list[Message]
     max_tokens: int
     temperature: float
+    # Number of leading messages that are identical across models and rounds.
+    # The provider marks the end of this prefix as a prompt-cache breakpoint.
+    cache_prefix: NotRequired[int]
+    # Return the log probability of every generated token, with the
+    # `top_logprobs` most likely alternatives at each position.
+    logprobs: NotRequired[bool]
+    top_logprobs: NotRequired[int]
+
+
+class RouterHTTPError(ConnectionError):
+    """Raised when the API answers with a non-200 status."""
+
+    def __init__(
+        self, status_code: int, text: str, retry_after: float | None = None
+    ) -> None:
+        super().__init__(f"Error ({status_code}): {text}")
+        self.status_code = status_code
+        self.retry_after = retry_after
+
+    @property
+    def retryable(self) -> bool:
+        """Whether the request may succeed if sent again."""
+        return self.status_code in RETRYABLE_STATUSES
+
+    @classmethod
+    def from_response(cls, response: httpx.Response) -> "RouterHTTPError":
+        """Build the error from an httpx response, honouring Retry-After."""
+        retry_after = None
+        header = response.headers.get("retry-after")
+        if header is not None:
+            try:
+                retry_after = float(header)
+            except ValueError:
+                retry_after = None
+        return cls(response.status_code, response.text, retry_after)
 
 
 class BaseRouter:
@@ -88,17 +148,117 @@ class AsyncBaseRouter:
     common logic for API interaction.
     """
 
-    def __init__(self, base_url: str, api_key: str | None = None) -> None:
+    def __init__(
+        self,
+        base_url: str,
+        api_key: str | None = None,
+        shared_client: bool = True,  # noqa: FBT001, FBT002
+        metrics: RouterMetrics | None = None,
+        latency: LatencyTracker | None = None,
+    ) -> None:
         """
         :param base_url: The base URL for the API.
         :param api_key: Optional API key for authentication.
+        :param shared_client: Use the pooled per-event-loop HTTP client instead
+            of a private one. Pooled clients outlive the router and are closed
+            with `close_client_pool`.
+        :param metrics: Registry receiving call statistics. Defaults to the
+            process-wide registry exported on `/metrics`.
+        :param latency: Latency samples driving hedging and adaptive timeouts.
+            Defaults to the process-wide tracker, so that routers built per
+            appraisal share what earlier ones observed.
         """
         self.base_url = base_url.rstrip("/")
         self.api_key = api_key
-        self.client = httpx.AsyncClient(timeout=30.0)
+        self.shared_client = shared_client
+        self._client: httpx.AsyncClient | None = None
         self.headers = {"accept": "application/json"}
         if self.api_key:
             self.headers["Authorization"] = f"Bearer {self.api_key}"
+        self.model_policies: dict[str, ModelConfig] = {}
+        self.latency = latency or get_latency_tracker()
+        self.hedges_fired: Counter[str] = Counter()
+        self.hedges_won: Counter[str] = Counter()
+        self.retries: Counter[str] = Counter()
+        self.metrics = metrics or get_router_metrics()
+        self.observers: list[RouterObserver] = []
+
+    def add_observer(self, observer: RouterObserver) -> None:
+        """
+        Register a callback notified of every request and response.
+
+        :param observer: Called with (event type, data); exceptions it raises
+            are logged and otherwise ignored.
+        """
+        self.observers.append(observer)
+
+    def _notify(self, event_type: str, data: dict[str, Any]) -> None:
+        for observer in self.observers:
+            try:
+                observer(event_type, data)
+            except Exception as e:  # noqa: BLE001
+                logger.warning("router observer failed", error=str(e))
+
+    def _record_response(
+        self,
+        endpoint: str,
+        model_id: str,
+        status: int | str,
+        latency: float,
+        usage: dict | None = None,
+    ) -> None:
+        """Record a finished attempt in the metrics and notify observers."""
+        self.metrics.record_call(model_id, status, latency)
+        cost = self.metrics.record_usage(model_id, usage)
+        usage = usage or {}
+        self._notify(
+            "model_response_received",
+            {
+                "endpoint": endpoint,
+                "model": model_id,
+                "status": status,
+                "latency_seconds": latency,
+                "prompt_tokens": usage.get("prompt_tokens"),
+                "completion_tokens": usage.get("completion_tokens"),
+                "cost_usd": cost,
+            },
+        )
+
+    def configure_models(self, models: Iterable[ModelConfig]) -> None:
+        """
+        Register the request policy (timeout, retries, hedging) of each model.
+
+        Requests for models that were never registered use the
+        `ModelConfig` defaults.
+
+        :param models: Model configurations keyed by their `model_id`.
+        """
+        for model in models:
+            self.model_policies[model.model_id] = model
+
+    def hedge_stats(self) -> dict[str, dict[str, int]]:
+        """Return the number of hedged requests fired and won per model."""
+        return {
+            model_id: {
+                "fired": self.hedges_fired[model_id],
+                "won": self.hedges_won[model_id],
+            }
+            for model_id in self.hedges_fired
+        }
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        """
+        The HTTP client used for requests.
+
+        Resolved lazily so that routers can be constructed outside
+        a running event loop.
+        """
+        if self.shared_client:
+            return get_http_client(self.base_url)
+        if self._client is None or self._client.is_closed:
+            self._client = httpx.AsyncClient(timeout=30.0)
+        return self._client
 
     async def _get(self, endpoint: str, params: dict | None = None) -> dict:
         """
@@ -115,8 +275,7 @@ class AsyncBaseRouter:
         success_status = 200
         if response.status_code == success_status:
             return response.json()
-        msg = f"Error ({response.status_code}): {response.text}"
-        raise ConnectionError(msg)
+        raise RouterHTTPError.from_response(response)
 
     async def _post(
         self,
@@ -127,22 +286,327 @@ class AsyncBaseRouter:
         Make an asynchronous POST request to the API with a JSON
         payload and return the JSON response.
 
+        The request follows the policy registered for the payload's model:
+        429/5xx responses and transport errors are retried with jittered
+        exponential backoff, and, when hedging is enabled, a duplicate request
+        is fired once the model's p95 latency elapses.
+
         :param endpoint: The API endpoint
             (should begin with a slash, e.g., "/completions").
         :param json_payload: The JSON payload to send.
         :return: JSON response as a dictionary.
         """
+        model_id = str(json_payload.get("model", ""))
+        policy = self.model_policies.get(model_id) or ModelConfig(model_id=model_id)
+
+        for attempt in range(policy.max_retries + 1):
+            try:
+                return await self._hedged_post(endpoint, json_payload, policy)
+            except RouterHTTPError as e:
+                if not e.retryable or attempt == policy.max_retries:
+                    raise
+                delay = self._backoff(attempt, e.retry_after)
+                logger.warning(
+                    "retrying request",
+                    model_id=model_id,
+                    status=e.status_code,
+                    attempt=attempt + 1,
+                    delay=round(delay, 2),
+                )
+            except httpx.TransportError as e:
+                if attempt == policy.max_retries:
+                    raise
+                delay = self._backoff(attempt)
+                logger.warning(
+                    "retrying request",
+                    model_id=model_id,
+                    error=type(e).__name__,
+                    attempt=attempt + 1,
+                    delay=round(delay, 2),
+                )
+            self.retries[model_id] += 1
+            self.metrics.record_retry(model_id)
+            await asyncio.sleep(delay)
+        msg = "unreachable: retry loop exited without returning"
+        raise RuntimeError(msg)
+
+    @staticmethod
+    def _backoff(attempt: int, retry_after: float | None = None) -> float:
+        """Full-jitter exponential backoff, never shorter than Retry-After."""
+        ceiling = min(BACKOFF_CAP, BACKOFF_BASE * 2**attempt)
+        delay = random.uniform(0, ceiling)  # noqa: S311
+        if retry_after is not None:
+            delay = max(delay, min(retry_after, BACKOFF_CAP))
+        return delay
+
+    def _timeout_for(self, policy: ModelConfig) -> float:
+        """Per-request timeout, tightened towards the model's p95 if adaptive."""
+        p95 = self.latency.p95(policy.model_id)
+        if not policy.adaptive_timeout or p95 is None:
+            return policy.timeout
+        adaptive = max(MIN_ADAPTIVE_TIMEOUT, p95 * ADAPTIVE_TIMEOUT_FACTOR)
+        return min(policy.timeout, adaptive)
+
+    async def _hedged_post(
+        self,
+        endpoint: str,
+        json_payload: dict[str, Any] | CompletionRequest | ChatRequest,
+        policy: ModelConfig,
+    ) -> dict:
+        """
+        Send a request, duplicating it once the model's p95 latency elapses.
+
+        Whichever copy succeeds first wins and the other is cancelled.
+        Without hedging, or before enough latency samples exist, this is a
+        single request. The delay counts from when the primary is actually
+        sent, not from when it started waiting for an attempt slot.
+        """
+        timeout = self._timeout_for(policy)
+        hedge_after = self.latency.p95(policy.model_id) if policy.hedge else None
+        if hedge_after is None:
+            return await self._send(endpoint, json_payload, policy.model_id, timeout)
+
+        sent = asyncio.Event()
+        primary = asyncio.create_task(
+            self._send(endpoint, json_payload, policy.model_id, timeout, sent)
+        )
+        sending = asyncio.create_task(sent.wait())
+        try:
+            await asyncio.wait({primary, sending}, return_when=asyncio.FIRST_COMPLETED)
+            done, _ = await asyncio.wait({primary}, timeout=hedge_after)
+        except asyncio.CancelledError:
+            primary.cancel()
+            raise
+        finally:
+            sending.cancel()
+        if done:
+            return primary.result()
+
+        self.hedges_fired[policy.model_id] += 1
+        self.metrics.record_hedge(policy.model_id, "fired")
+        logger.info("hedging request", model_id=policy.model_id, after=hedge_after)
+        hedge = asyncio.create_task(
+            self._send(endpoint, json_payload, policy.model_id, timeout)
+        )
+        pending = {primary, hedge}
+        try:
+            while pending:
+                done, pending = await asyncio.wait(
+                    pending, return_when=asyncio.FIRST_COMPLETED
+                )
+                for task in done:
+                    if task.exception() is None:
+                        if task is hedge:
+                            self.hedges_won[policy.model_id] += 1
+                            self.metrics.record_hedge(policy.model_id, "won")
+                        return task.result()
+            # Both copies failed: surface the primary's error.
+            return primary.result()
+        finally:
+            for task in pending:
+                task.cancel()
+
+    def _attempt_slot(
+        self, json_payload: dict[str, Any] | CompletionRequest | ChatRequest
+    ) -> AbstractAsyncContextManager[None]:
+        """
+        Wait for capacity before sending one HTTP attempt; a no-op here.
+
+        Every attempt enters it, retries and hedged copies included, so that
+        subclasses enforcing rate limits charge each request actually sent.
+        """
+        return nullcontext()
+
+    async def _send(
+        self,
+        endpoint: str,
+        json_payload: dict[str, Any] | CompletionRequest | ChatRequest,
+        model_id: str,
+        timeout: float,
+        sent: asyncio.Event | None = None,
+    ) -> dict:
+        """
+        Send a single POST request, recording its latency, status and usage.
+
+        :param sent: Set once the attempt slot is acquired and the request
+            goes out.
+        """
         url = self.base_url + endpoint
-        response = await self.client.post(url, headers=self.headers, json=json_payload)
+        self._notify(
+            "model_request",
+            {
+                "endpoint": endpoint,
+                "model": model_id,
+                "max_tokens": json_payload.get("max_tokens"),
+            },
+        )
+        async with self._attempt_slot(json_payload):
+            if sent is not None:
+                sent.set()
+            start = time.perf_counter()
+            try:
+                response = await self.client.post(
+                    url, headers=self.headers, json=json_payload, timeout=timeout
+                )
+            except httpx.TransportError as e:
+                self._record_response(
+                    endpoint, model_id, type(e).__name__, time.perf_counter() - start
+                )
+                raise
+            except asyncio.CancelledError:
+                # The caller gave up, e.g. its client disconnected; httpx
+                # closes the connection of the unfinished request
+                self._record_response(
+                    endpoint, model_id, "cancelled", time.perf_counter() - start
+                )
+                raise
+            latency = time.perf_counter() - start
 
         success_status = 200
         if response.status_code == success_status:
-            return response.json()
-        msg = f"Error ({response.status_code}): {response.text}"
-        raise ConnectionError(msg)
+            self.latency.record(model_id, latency)
+            body = response.json()
+            self._record_response(
+                endpoint, model_id, response.status_code, latency, body.get("usage")
+            )
+            return body
+        self._record_response(endpoint, model_id, response.status_code, latency)
+        raise RouterHTTPError.from_response(response)
+
+    async def _stream(
+        self,
+        endpoint: str,
+        json_payload: dict[str, Any] | CompletionRequest | ChatRequest,
+    ) -> AsyncIterator[dict]:
+        """
+        Make a streaming POST request and yield the decoded SSE chunks.
+
+        Failures before the first chunk arrives are retried like `_post`;
+        once data has been yielded the stream is never restarted, so callers
+        do not see duplicated output.
+
+        :param endpoint: The API endpoint
+            (should begin with a slash, e.g., "/chat/completions").
+        :param json_payload: The JSON payload to send. `stream` is set to True.
+        :return: An async iterator over the JSON chunks of the stream.
+        """
+        model_id = str(json_payload.get("model", ""))
+        policy = self.model_policies.get(model_id) or ModelConfig(model_id=model_id)
+        payload = {
+            **json_payload,
+            "stream": True,
+            "stream_options": {"include_usage": True},
+        }
+        url = self.base_url + endpoint
+
+        for attempt in range(policy.max_retries + 1):
+            started = False
+            usage = None
+            self._notify(
+                "model_request",
+                {
+                    "endpoint": endpoint,
+                    "model": model_id,
+                    "max_tokens": json_payload.get("max_tokens"),
+                },
+            )
+            start = time.perf_counter()
+            try:
+                async with (
+                    self._attempt_slot(json_payload),
+                    self.client.stream(
+                        "POST",
+                        url,
+                        headers=self.headers,
+                        json=payload,
+                        timeout=self._timeout_for(policy),
+                    ) as response,
+                ):
+                    success_status = 200
+                    if response.status_code != success_status:
+                        await response.aread()
+                        raise RouterHTTPError.from_response(response)
+                    async for chunk in _iter_sse_chunks(response):
+                        started = True
+                        usage = chunk.get("usage") or usage
+                        yield chunk
+                latency = time.perf_counter() - start
+                self.latency.record(model_id, latency)
+                self._record_response(endpoint, model_id, 200, latency, usage)
+                return
+            except RouterHTTPError as e:
+                self._record_response(
+                    endpoint, model_id, e.status_code, time.perf_counter() - start
+                )
+                if started or not e.retryable or attempt == policy.max_retries:
+                    raise
+                delay = self._backoff(attempt, e.retry_after)
+            except httpx.TransportError as e:
+                self._record_response(
+                    endpoint, model_id, type(e).__name__, time.perf_counter() - start
+                )
+                if started or attempt == policy.max_retries:
+                    raise
+                delay = self._backoff(attempt)
+            except (asyncio.CancelledError, GeneratorExit):
+                # Leaving the `async with` above has closed the HTTP stream
+                self._record_response(
+                    endpoint, model_id, "cancelled", time.perf_counter() - start
+                )
+                raise
+            logger.warning(
+                "retrying stream",
+                model_id=model_id,
+                attempt=attempt + 1,
+                delay=round(delay, 2),
+            )
+            self.retries[model_id] += 1
+            self.metrics.record_retry(model_id)
+            await asyncio.sleep(delay)
 
     async def close(self) -> None:
         """
         Close the underlying asynchronous HTTP client.
+
+        Pooled clients are shared with other routers and are left open.
         """
-        await self.client.aclose()
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+
+async def _iter_sse_chunks(response: httpx.Response) -> AsyncIterator[dict]:
+    """
+    Decode an OpenAI-style server-sent event stream.
+
+    Comment lines (OpenRouter sends ": OPENROUTER PROCESSING" keep-alives) and
+    blank separators are skipped, and the stream ends at `data: [DONE]`.
+    Data lines that are not valid JSON are logged and skipped rather than
+    aborting the stream. Errors reported inside the stream are raised as
+    `RouterHTTPError`.
+    """
+    async for line in response.aiter_lines():
+        if not line.startswith("data:"):
+            continue
+        data = line[len("data:") :].strip()
+        if data == "[DONE]":
+            return
+        if not data:
+            continue
+        try:
+            chunk = json.loads(data)
+        except json.JSONDecodeError as e:
+            logger.warning(
+                "skipping malformed stream chunk", data=data[:200], error=str(e)
+            )
+            continue
+        if not isinstance(chunk, dict):
+            continue
+        error = chunk.get("error")
+        if error:
+            status = error.get("code")
+            raise RouterHTTPError(
+                status if isinstance(status, int) else 500,
+                error.get("message", str(error)),
+            )
+        yield chunk
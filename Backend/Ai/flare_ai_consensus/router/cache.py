@@ -0,0 +1,249 @@
+"""
+Content-addressed cache for chat completion responses.
+
+Repeat appraisals of an unchanged token send byte-identical requests, so
+responses are keyed by a canonical hash of (model, messages, temperature,
+max_tokens), plus the logprob options when a request sets them. Entries live
+in an in-memory LRU tier backed by an optional SQLite tier that survives
+restarts; both tiers expire entries after a TTL and evict the least recently
+used entries once they are full.
+"""
+
+import asyncio
+import hashlib
+import json
+import sqlite3
+import time
+from collections import OrderedDict
+from contextlib import closing
+from pathlib import Path
+from typing import Any
+
+import structlog
+
+from flare_ai_consensus.router.metrics import (
+    metric_header,
+    metric_labels,
+    register_collector,
+)
+from flare_ai_consensus.settings import settings
+
+logger = structlog.get_logger(__name__)
+
+CACHE_KEY_FIELDS = ("model", "messages", "temperature", "max_tokens")
+# Part of the key only when set, so keys of requests without them are unchanged
+OPTIONAL_CACHE_KEY_FIELDS = ("logprobs", "top_logprobs")
+
+
+def cache_key(payload: dict[str, Any]) -> str:
+    """
+    Return the canonical hash of the fields that determine a response.
+
+    :param payload: A chat completion request payload.
+    :return: Hex SHA-256 digest.
+    """
+    fields = {field: payload.get(field) for field in CACHE_KEY_FIELDS}
+    for field in OPTIONAL_CACHE_KEY_FIELDS:
+        if payload.get(field) is not None:
+            fields[field] = payload[field]
+    canonical = json.dumps(
+        fields,
+        sort_keys=True,
+        separators=(",", ":"),
+        ensure_ascii=False,
+    )
+    return hashlib.sha256(canonical.encode()).hexdigest()
+
+
+class SQLiteResponseStore:
+    """Disk tier of the response cache."""
+
+    def __init__(self, path: Path, max_entries: int = 10_000) -> None:
+        """
+        :param path: Location of the SQLite database file.
+        :param max_entries: Entries kept before the least recently used go.
+        """
+        self.path = path
+        self.max_entries = max_entries
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with closing(self._connect()) as conn, conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS responses ("
+                "key TEXT PRIMARY KEY, response TEXT NOT NULL, latency REAL, "
+                "created REAL NOT NULL, accessed REAL NOT NULL)"
+            )
+
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(self.path, timeout=30.0)
+
+    def get(self, key: str, ttl: float) -> tuple[dict, float] | None:
+        """
+        Look up a live entry and mark it as recently used.
+
+        :return: The (response, original latency) pair, or None.
+        """
+        now = time.time()
+        with closing(self._connect()) as conn, conn:
+            row = conn.execute(
+                "SELECT response, latency FROM responses "
+                "WHERE key = ? AND created >= ?",
+                (key, now - ttl),
+            ).fetchone()
+            if row is None:
+                return None
+            conn.execute("UPDATE responses SET accessed = ? WHERE key = ?", (now, key))
+        return json.loads(row[0]), row[1] or 0.0
+
+    def set(self, key: str, response: dict, latency: float, ttl: float) -> None:
+        """Store an entry, then drop expired and surplus entries."""
+        now = time.time()
+        with closing(self._connect()) as conn, conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO responses "
+                "(key, response, latency, created, accessed) VALUES (?, ?, ?, ?, ?)",
+                (key, json.dumps(response), latency, now, now),
+            )
+            conn.execute("DELETE FROM responses WHERE created < ?", (now - ttl,))
+            conn.execute(
+                "DELETE FROM responses WHERE key NOT IN ("
+                "SELECT key FROM responses ORDER BY accessed DESC LIMIT ?)",
+                (self.max_entries,),
+            )
+
+
+class ResponseCache:
+    """Two-tier (memory + optional disk) cache of chat completion responses."""
+
+    def __init__(
+        self,
+        max_entries: int = 512,
+        ttl: float = 86_400.0,
+        store: SQLiteResponseStore | None = None,
+    ) -> None:
+        """
+        :param max_entries: Entries held in the in-memory LRU tier.
+        :param ttl: Seconds an entry stays valid.
+        :param store: Optional disk tier shared across restarts and processes.
+        """
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.store = store
+        self._entries: OrderedDict[str, tuple[float, dict, float]] = OrderedDict()
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.saved_seconds = 0.0
+        self.saved_tokens = 0
+
+    async def get(self, payload: dict[str, Any]) -> dict | None:
+        """
+        Return the cached response for a payload, or None on a miss.
+
+        :param payload: A chat completion request payload.
+        """
+        key = cache_key(payload)
+        entry = self._entries.get(key)
+        if entry is not None:
+            expires, response, latency = entry
+            if expires > time.monotonic():
+                self._entries.move_to_end(key)
+                self.memory_hits += 1
+                self._record_saving(response, latency)
+                return response
+            del self._entries[key]
+
+        if self.store is not None:
+            found = await asyncio.to_thread(self.store.get, key, self.ttl)
+            if found is not None:
+                response, latency = found
+                self._remember(key, response, latency)
+                self.disk_hits += 1
+                logger.debug("response cache disk hit", model_id=payload.get("model"))
+                self._record_saving(response, latency)
+                return response
+
+        self.misses += 1
+        return None
+
+    async def set(
+        self, payload: dict[str, Any], response: dict, latency: float = 0.0
+    ) -> None:
+        """
+        Cache a response.
+
+        :param payload: The request payload that produced the response.
+        :param response: The JSON response.
+        :param latency: Seconds the upstream request took, reported as saved
+            time on later hits.
+        """
+        key = cache_key(payload)
+        self._remember(key, response, latency)
+        if self.store is not None:
+            await asyncio.to_thread(self.store.set, key, response, latency, self.ttl)
+
+    def _remember(self, key: str, response: dict, latency: float) -> None:
+        self._entries[key] = (time.monotonic() + self.ttl, response, latency)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def _record_saving(self, response: dict, latency: float) -> None:
+        self.saved_seconds += latency
+        self.saved_tokens += int((response.get("usage") or {}).get("total_tokens", 0))
+
+    def stats(self) -> dict[str, float | int]:
+        """Return hit/miss counts, the hit ratio and the latency/tokens saved."""
+        hits = self.memory_hits + self.disk_hits
+        lookups = hits + self.misses
+        return {
+            "memory_hits": self.memory_hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "hit_ratio": hits / lookups if lookups else 0.0,
+            "entries": len(self._entries),
+            "saved_seconds": round(self.saved_seconds, 3),
+            "saved_tokens": self.saved_tokens,
+        }
+
+
+_default_cache: ResponseCache | None = None
+
+
+def get_response_cache() -> ResponseCache:
+    """Return the process-wide response cache configured from settings."""
+    global _default_cache  # noqa: PLW0603
+    if _default_cache is None:
+        store = (
+            SQLiteResponseStore(
+                settings.response_cache_path, settings.response_cache_max_disk_entries
+            )
+            if settings.response_cache_path
+            else None
+        )
+        _default_cache = ResponseCache(
+            max_entries=settings.response_cache_max_entries,
+            ttl=settings.response_cache_ttl,
+            store=store,
+        )
+    return _default_cache
+
+
+def _render_cache_metrics() -> list[str]:
+    """Response cache lookups and the latency hits saved, when enabled."""
+    if not settings.response_cache_enabled:
+        return []
+    stats = get_response_cache().stats()
+    lines = metric_header(
+        "response_cache_lookups_total", "counter", "Response cache lookups."
+    )
+    for result in ("memory_hits", "disk_hits", "misses"):
+        labels = metric_labels(result=result)
+        lines.append(f"response_cache_lookups_total{labels} {stats[result]}")
+    lines += metric_header(
+        "response_cache_saved_seconds_total", "counter", "Latency saved by hits."
+    )
+    lines.append(f"response_cache_saved_seconds_total {stats['saved_seconds']}")
+    return lines
+
+
+register_collector("response_cache", _render_cache_metrics)
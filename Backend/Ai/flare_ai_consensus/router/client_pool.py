@@ -0,0 +1,216 @@
+"""
+Process-wide registry of pooled HTTP clients.
+
+Every event loop gets one ``ClientPool`` holding long-lived ``httpx.AsyncClient``
+instances (one per origin, so connection limits apply per host) for the routers
+and a single ``aiohttp.ClientSession`` for the auxiliary data fetchers. Reusing
+these clients across appraisals avoids paying DNS resolution and TLS handshakes
+on every request.
+"""
+
+import asyncio
+import weakref
+from typing import TYPE_CHECKING
+from urllib.parse import urlsplit
+
+import httpx
+import structlog
+
+from flare_ai_consensus.settings import settings
+
+if TYPE_CHECKING:
+    import aiohttp
+
+logger = structlog.get_logger(__name__)
+
+# HTTP/2 needs the optional `h2` package (httpx[http2]).
+try:
+    import h2  # noqa: F401  # pyright: ignore [reportUnusedImport]
+
+    http2_available = True
+except ImportError:
+    http2_available = False
+
+
+def _origin(url: str) -> str:
+    """Reduce a URL to its scheme://host[:port] origin."""
+    parts = urlsplit(url)
+    return f"{parts.scheme}://{parts.netloc}"
+
+
+class ClientPool:
+    """Long-lived HTTP clients bound to a single event loop."""
+
+    def __init__(
+        self,
+        http2: bool = True,  # noqa: FBT001, FBT002
+        max_connections_per_host: int = 20,
+        max_keepalive_connections: int = 10,
+        keepalive_expiry: float = 120.0,
+        timeout: float = 30.0,
+    ) -> None:
+        """
+        :param http2: Negotiate HTTP/2 when the `h2` package is installed.
+        :param max_connections_per_host: Upper bound on open connections per origin.
+        :param max_keepalive_connections: Idle connections kept alive per origin.
+        :param keepalive_expiry: Seconds an idle connection is kept open.
+        :param timeout: Default request timeout in seconds.
+        """
+        self.http2 = http2 and http2_available
+        self.max_connections_per_host = max_connections_per_host
+        self.max_keepalive_connections = max_keepalive_connections
+        self.keepalive_expiry = keepalive_expiry
+        self.timeout = timeout
+        self._http_clients: dict[str, httpx.AsyncClient] = {}
+        self._aiohttp_session: "aiohttp.ClientSession | None" = None
+
+    def http_client(self, url: str) -> httpx.AsyncClient:
+        """
+        Return the pooled httpx client for the origin of `url`.
+
+        :param url: Any URL on the target host.
+        :return: A shared ``httpx.AsyncClient``.
+        """
+        origin = _origin(url)
+        client = self._http_clients.get(origin)
+        if client is None or client.is_closed:
+            client = httpx.AsyncClient(
+                http2=self.http2,
+                timeout=httpx.Timeout(self.timeout, connect=10.0),
+                limits=httpx.Limits(
+                    max_connections=self.max_connections_per_host,
+                    max_keepalive_connections=self.max_keepalive_connections,
+                    keepalive_expiry=self.keepalive_expiry,
+                ),
+            )
+            self._http_clients[origin] = client
+            logger.debug("created pooled http client", origin=origin, http2=self.http2)
+        return client
+
+    def aiohttp_session(self) -> "aiohttp.ClientSession":
+        """
+        Return the pooled aiohttp session used by the metadata/price fetchers.
+
+        :return: A shared ``aiohttp.ClientSession``.
+        """
+        import aiohttp
+
+        if self._aiohttp_session is None or self._aiohttp_session.closed:
+            connector = aiohttp.TCPConnector(
+                limit_per_host=self.max_connections_per_host,
+                keepalive_timeout=self.keepalive_expiry,
+                ttl_dns_cache=300,
+            )
+            self._aiohttp_session = aiohttp.ClientSession(
+                connector=connector,
+                timeout=aiohttp.ClientTimeout(total=self.timeout),
+            )
+            logger.debug("created pooled aiohttp session")
+        return self._aiohttp_session
+
+    async def prewarm(
+        self, urls: list[str], session_urls: list[str] | None = None
+    ) -> None:
+        """
+        Open connections ahead of the first real request.
+
+        A lightweight HEAD request is sent to each URL so that DNS, TCP and TLS
+        setup happen at startup. Each host is warmed through the client that
+        later calls it, since connections are not shared between the httpx
+        clients and the aiohttp session. Failures are logged and ignored.
+
+        :param urls: URLs whose hosts are called through the httpx clients.
+        :param session_urls: URLs whose hosts are called through the aiohttp
+            session.
+        """
+        import aiohttp
+
+        async def _warm(url: str) -> None:
+            try:
+                await self.http_client(url).head(url)
+            except httpx.HTTPError as e:
+                logger.warning("connection prewarm failed", url=url, error=str(e))
+            else:
+                logger.info("connection prewarmed", url=url)
+
+        async def _warm_session(url: str) -> None:
+            try:
+                async with self.aiohttp_session().head(url):
+                    pass
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                logger.warning("connection prewarm failed", url=url, error=str(e))
+            else:
+                logger.info("connection prewarmed", url=url, client="aiohttp")
+
+        await asyncio.gather(
+            *(_warm(url) for url in urls),
+            *(_warm_session(url) for url in session_urls or []),
+        )
+
+    async def aclose(self) -> None:
+        """Close every client held by the pool."""
+        clients = list(self._http_clients.values())
+        self._http_clients.clear()
+        for client in clients:
+            await client.aclose()
+        if self._aiohttp_session is not None:
+            await self._aiohttp_session.close()
+            self._aiohttp_session = None
+
+
+_pools: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, ClientPool]" = (
+    weakref.WeakKeyDictionary()
+)
+
+
+def get_client_pool() -> ClientPool:
+    """
+    Return the client pool for the running event loop, creating it on first use.
+
+    Clients cannot be shared across event loops, so each loop gets its own pool.
+    """
+    loop = asyncio.get_running_loop()
+    pool = _pools.get(loop)
+    if pool is None:
+        pool = ClientPool(
+            http2=settings.http2_enabled,
+            max_connections_per_host=settings.http_max_connections_per_host,
+            max_keepalive_connections=settings.http_max_keepalive_connections,
+            keepalive_expiry=settings.http_keepalive_expiry,
+        )
+        _pools[loop] = pool
+    return pool
+
+
+def get_http_client(url: str) -> httpx.AsyncClient:
+    """Shortcut for ``get_client_pool().http_client(url)``."""
+    return get_client_pool().http_client(url)
+
+
+def get_aiohttp_session() -> "aiohttp.ClientSession":
+    """Shortcut for ``get_client_pool().aiohttp_session()``."""
+    return get_client_pool().aiohttp_session()
+
+
+async def prewarm_connections(
+    urls: list[str] | None = None, session_urls: list[str] | None = None
+) -> None:
+    """
+    Pre-open pooled connections, typically at server start.
+
+    :param urls: URLs to warm up through the httpx clients. Defaults to
+        ``settings.http_prewarm_urls``.
+    :param session_urls: URLs to warm up through the aiohttp session. Defaults
+        to ``settings.aiohttp_prewarm_urls``.
+    """
+    await get_client_pool().prewarm(
+        urls if urls is not None else settings.http_prewarm_urls,
+        session_urls if session_urls is not None else settings.aiohttp_prewarm_urls,
+    )
+
+
+async def close_client_pool() -> None:
+    """Close and forget the client pool of the running event loop."""
+    pool = _pools.pop(asyncio.get_running_loop(), None)
+    if pool is not None:
+        await pool.aclose()
@@ -0,0 +1,84 @@
+"""
+Rolling request latencies per model, shared by every router in the process.
+
+Hedging and adaptive timeouts need a handful of samples per model before
+they act. Routers are usually built per appraisal, so the samples are kept
+in one process-wide tracker rather than per router, where each appraisal
+would start from nothing.
+"""
+
+import threading
+from collections import deque
+
+import numpy as np
+
+
+class LatencyTracker:
+    """Rolling window of successful request latencies per model."""
+
+    def __init__(self, window: int = 50, min_samples: int = 5) -> None:
+        """
+        :param window: Number of most recent samples kept per model.
+        :param min_samples: Samples required before percentiles are reported.
+        """
+        self.window = window
+        self.min_samples = min_samples
+        self._samples: dict[str, deque[float]] = {}
+        self._lock = threading.Lock()
+
+    def record(self, model_id: str, seconds: float) -> None:
+        """
+        Record the latency of a successful request.
+
+        :param model_id: The model that served the request.
+        :param seconds: Wall-clock latency in seconds.
+        """
+        with self._lock:
+            samples = self._samples.get(model_id)
+            if samples is None:
+                samples = self._samples[model_id] = deque(maxlen=self.window)
+            samples.append(seconds)
+
+    def percentile(self, model_id: str, q: float) -> float | None:
+        """
+        Return the q-th percentile latency for a model.
+
+        :param model_id: The model to query.
+        :param q: Percentile in the range [0, 100].
+        :return: The latency in seconds, or None if there are too few samples.
+        """
+        with self._lock:
+            samples = list(self._samples.get(model_id) or ())
+        if len(samples) < self.min_samples:
+            return None
+        return float(np.percentile(samples, q))
+
+    def p50(self, model_id: str) -> float | None:
+        """Median latency for a model."""
+        return self.percentile(model_id, 50)
+
+    def p95(self, model_id: str) -> float | None:
+        """95th percentile latency for a model."""
+        return self.percentile(model_id, 95)
+
+    def snapshot(self) -> dict[str, dict[str, float | int | None]]:
+        """Return p50/p95 and sample counts for every tracked model."""
+        return {
+            model_id: {
+                "samples": len(samples),
+                "p50": self.p50(model_id),
+                "p95": self.p95(model_id),
+            }
+            for model_id, samples in list(self._samples.items())
+        }
+
+
+_default_tracker: LatencyTracker | None = None
+
+
+def get_latency_tracker() -> LatencyTracker:
+    """Return the process-wide latency tracker."""
+    global _default_tracker  # noqa: PLW0603
+    if _default_tracker is None:
+        _default_tracker = LatencyTracker()
+    return _default_tracker
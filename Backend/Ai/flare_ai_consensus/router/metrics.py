@@ -0,0 +1,292 @@
+"""
+Built-in instrumentation for the async routers.
+
+Every HTTP call made by an `AsyncBaseRouter` is recorded here: latency
+histograms and status counts per model, retries and hedges, prompt /
+completion / cached tokens from the OpenRouter `usage` block and the
+estimated cost from the per-token pricing in `data/models.json`. Calls
+abandoned mid-flight are counted with the status "cancelled". The totals are
+rendered in the Prometheus text format by the `/metrics` endpoints, followed
+by the families of every collector registered with `register_collector`, so
+that other packages export their statistics without the router importing
+them.
+"""
+
+import bisect
+import json
+import threading
+from collections import Counter
+from collections.abc import Callable
+from pathlib import Path
+
+import structlog
+
+from flare_ai_consensus.settings import settings
+
+logger = structlog.get_logger(__name__)
+
+LATENCY_BUCKETS = (0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 20.0, 30.0, 60.0, 120.0)
+
+# Returns the exposition lines of one or more metric families
+MetricsCollector = Callable[[], list[str]]
+
+
+class Histogram:
+    """Cumulative-bucket histogram in the Prometheus style."""
+
+    def __init__(self, buckets: tuple[float, ...] = LATENCY_BUCKETS) -> None:
+        """
+        :param buckets: Upper bounds of the buckets, in increasing order.
+        """
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        """Add one observation."""
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def cumulative(self) -> list[tuple[str, int]]:
+        """Return (upper bound, cumulative count) pairs including +Inf."""
+        pairs = []
+        running = 0
+        for bound, count in zip((*self.buckets, "+Inf"), self.counts, strict=True):
+            running += count
+            pairs.append((str(bound), running))
+        return pairs
+
+
+class RouterMetrics:
+    """Thread-safe per-model call statistics shared by all routers."""
+
+    def __init__(self, pricing: dict[str, tuple[float, float]] | None = None) -> None:
+        """
+        :param pricing: USD per prompt token and per completion token, keyed
+            by model ID.
+        """
+        self.pricing = pricing or {}
+        self._lock = threading.Lock()
+        self.latency: dict[str, Histogram] = {}
+        self.requests: Counter[tuple[str, str]] = Counter()
+        self.retries: Counter[str] = Counter()
+        self.hedges: Counter[tuple[str, str]] = Counter()
+        self.tokens: Counter[tuple[str, str]] = Counter()
+        self.cost: Counter[str] = Counter()
+
+    @classmethod
+    def from_models_json(cls, path: Path) -> "RouterMetrics":
+        """Load per-token pricing from an OpenRouter `/models` dump."""
+        pricing = {}
+        try:
+            with path.open() as f:
+                models = json.load(f).get("data", [])
+        except (OSError, ValueError) as e:
+            logger.warning("could not load model pricing", path=str(path), error=str(e))
+            models = []
+        for model in models:
+            price = model.get("pricing") or {}
+            try:
+                pricing[model["id"]] = (
+                    float(price.get("prompt", 0)),
+                    float(price.get("completion", 0)),
+                )
+            except (TypeError, ValueError):
+                continue
+        return cls(pricing)
+
+    def record_call(self, model_id: str, status: int | str, latency: float) -> None:
+        """
+        Record one HTTP attempt.
+
+        :param model_id: The model called.
+        :param status: HTTP status code, or an error name for transport failures.
+        :param latency: Wall-clock seconds the attempt took.
+        """
+        with self._lock:
+            histogram = self.latency.get(model_id)
+            if histogram is None:
+                histogram = self.latency[model_id] = Histogram()
+            histogram.observe(latency)
+            self.requests[model_id, str(status)] += 1
+
+    def record_retry(self, model_id: str) -> None:
+        """Record a retried request."""
+        with self._lock:
+            self.retries[model_id] += 1
+
+    def record_hedge(self, model_id: str, outcome: str) -> None:
+        """Record a hedged request; `outcome` is "fired" or "won"."""
+        with self._lock:
+            self.hedges[model_id, outcome] += 1
+
+    def record_usage(self, model_id: str, usage: dict | None) -> float:
+        """
+        Record the token counts of a completed call.
+
+        :param model_id: The model called.
+        :param usage: The `usage` block of the response.
+        :return: The estimated cost of the call in USD.
+        """
+        if not usage:
+            return 0.0
+        prompt = int(usage.get("prompt_tokens") or 0)
+        completion = int(usage.get("completion_tokens") or 0)
+        details = usage.get("prompt_tokens_details") or {}
+        cached = int(details.get("cached_tokens") or 0)
+        cost = self.cost_for(model_id, prompt, completion)
+        with self._lock:
+            self.tokens[model_id, "prompt"] += prompt
+            self.tokens[model_id, "completion"] += completion
+            self.tokens[model_id, "cached"] += cached
+            self.cost[model_id] += cost
+        return cost
+
+    def cost_for(
+        self, model_id: str, prompt_tokens: int, completion_tokens: int
+    ) -> float:
+        """Estimate the USD cost of a call from the model's token pricing."""
+        prompt_price, completion_price = self.pricing.get(model_id, (0.0, 0.0))
+        return prompt_tokens * prompt_price + completion_tokens * completion_price
+
+    def snapshot(self) -> dict[str, dict]:
+        """Return the statistics per model as plain data."""
+        with self._lock:
+            models = {m for m, _ in self.requests} | set(self.retries)
+            return {
+                model_id: {
+                    "requests": {
+                        status: count
+                        for (m, status), count in self.requests.items()
+                        if m == model_id
+                    },
+                    "latency_sum_seconds": self.latency[model_id].sum
+                    if model_id in self.latency
+                    else 0.0,
+                    "retries": self.retries[model_id],
+                    "hedges_fired": self.hedges[model_id, "fired"],
+                    "hedges_won": self.hedges[model_id, "won"],
+                    "prompt_tokens": self.tokens[model_id, "prompt"],
+                    "completion_tokens": self.tokens[model_id, "completion"],
+                    "cached_tokens": self.tokens[model_id, "cached"],
+                    "cost_usd": self.cost[model_id],
+                }
+                for model_id in sorted(models)
+            }
+
+    def render_prometheus(self) -> str:
+        """Render all statistics in the Prometheus text exposition format."""
+        lines: list[str] = []
+        with self._lock:
+            lines += metric_header(
+                "router_request_duration_seconds",
+                "histogram",
+                "Latency of HTTP calls to the model API.",
+            )
+            for model_id, histogram in sorted(self.latency.items()):
+                name = "router_request_duration_seconds"
+                for bound, count in histogram.cumulative():
+                    labels = metric_labels(model=model_id, le=bound)
+                    lines.append(f"{name}_bucket{labels} {count}")
+                labels = metric_labels(model=model_id)
+                lines.append(f"{name}_sum{labels} {histogram.sum}")
+                lines.append(f"{name}_count{labels} {histogram.count}")
+
+            lines += metric_header(
+                "router_requests_total", "counter", "HTTP calls by status."
+            )
+            for (model_id, status), count in sorted(self.requests.items()):
+                labels = metric_labels(model=model_id, status=status)
+                lines.append(f"router_requests_total{labels} {count}")
+
+            lines += metric_header(
+                "router_retries_total", "counter", "Retried requests."
+            )
+            for model_id, count in sorted(self.retries.items()):
+                labels = metric_labels(model=model_id)
+                lines.append(f"router_retries_total{labels} {count}")
+
+            lines += metric_header("router_hedges_total", "counter", "Hedged requests.")
+            for (model_id, outcome), count in sorted(self.hedges.items()):
+                labels = metric_labels(model=model_id, outcome=outcome)
+                lines.append(f"router_hedges_total{labels} {count}")
+
+            lines += metric_header("router_tokens_total", "counter", "Tokens by kind.")
+            for (model_id, kind), count in sorted(self.tokens.items()):
+                labels = metric_labels(model=model_id, kind=kind)
+                lines.append(f"router_tokens_total{labels} {count}")
+
+            lines += metric_header(
+                "router_cost_usd_total", "counter", "Estimated spend."
+            )
+            for model_id, cost in sorted(self.cost.items()):
+                labels = metric_labels(model=model_id)
+                lines.append(f"router_cost_usd_total{labels} {cost}")
+        return "\n".join(lines) + "\n"
+
+
+def metric_header(name: str, kind: str, help_text: str) -> list[str]:
+    """Return the HELP and TYPE lines of a metric family."""
+    return [f"# HELP {name} {help_text}", f"# TYPE {name} {kind}"]
+
+
+def metric_labels(**labels: str) -> str:
+    """Format a label set, e.g. `{model="x",status="200"}`."""
+    pairs = (f'{key}="{_escape(value)}"' for key, value in labels.items())
+    return "{" + ",".join(pairs) + "}"
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+_default_metrics: RouterMetrics | None = None
+
+
+def get_router_metrics() -> RouterMetrics:
+    """Return the process-wide metrics registry, priced from `models.json`."""
+    global _default_metrics  # noqa: PLW0603
+    if _default_metrics is None:
+        _default_metrics = RouterMetrics.from_models_json(
+            settings.data_path / "models.json"
+        )
+    return _default_metrics
+
+
+_collectors: dict[str, MetricsCollector] = {}
+_collectors_lock = threading.Lock()
+
+
+def register_collector(name: str, collector: MetricsCollector) -> None:
+    """
+    Add metric families to the `/metrics` body.
+
+    :param name: Name of the collector; registering a name again replaces
+        the previous collector.
+    :param collector: Returns the exposition lines to append, built with
+        `metric_header` and `metric_labels`.
+    """
+    with _collectors_lock:
+        _collectors[name] = collector
+
+
+def render_metrics() -> str:
+    """
+    Render the router metrics followed by those of every registered collector.
+
+    This is the body served by the `/metrics` endpoints.
+    """
+    body = get_router_metrics().render_prometheus()
+    with _collectors_lock:
+        collectors = list(_collectors.items())
+    for name, collector in collectors:
+        try:
+            lines = collector()
+        except Exception as e:  # noqa: BLE001
+            logger.warning("metrics collector failed", collector=name, error=str(e))
+            continue
+        if lines:
+            body += "\n".join(lines) + "\n"
+    return body
@@ -1,9 +1,31 @@
+import time
+from collections import Counter
+from collections.abc import AsyncIterator
+from contextlib import AbstractAsyncContextManager, nullcontext
+from typing import Any
+
+import structlog
+
 from flare_ai_consensus.router.base_router import (
     AsyncBaseRouter,
     BaseRouter,
     ChatRequest,
     CompletionRequest,
 )
+from flare_ai_consensus.router.cache import ResponseCache, get_response_cache
+from flare_ai_consensus.router.rate_limiter import (
+    RateLimiter,
+    estimate_tokens,
+    get_rate_limiter,
+)
+from flare_ai_consensus.router.response import ModelResponse
+from flare_ai_consensus.settings import settings
+
+# Anthropic-style breakpoint passed through by OpenRouter; providers that
+# cache prefixes automatically (e.g. OpenAI, DeepSeek) ignore it.
+CACHE_CONTROL = {"type": "ephemeral"}
+
+logger = structlog.get_logger(__name__)
 
 
 class OpenRouterProvider(BaseRouter):
@@ -81,15 +103,98 @@ class AsyncOpenRouterProvider(AsyncBaseRouter):
     """Asynchronous provider to interact with the OpenRouter API."""
 
     def __init__(
-        self, api_key: str | None = None, base_url: str = "https://openrouter.ai/api/v1"
+        self,
+        api_key: str | None = None,
+        base_url: str = "https://openrouter.ai/api/v1",
+        shared_client: bool = True,  # noqa: FBT001, FBT002
+        rate_limiter: RateLimiter | None = None,
+        cache: ResponseCache | None = None,
     ) -> None:
         """
         Initialize the AsyncOpenRouterProvider.
 
         :param api_key: Optional API key for authentication.
         :param base_url: Optional custom base URL.
+        :param shared_client: Use the pooled per-event-loop HTTP client.
+        :param rate_limiter: Per-model concurrency and rate limiter. Defaults to
+            the process-wide limiter unless `settings.rate_limit_enabled` is off.
+        :param cache: Response cache consulted before chat completions. Defaults
+            to the process-wide cache when `settings.response_cache_enabled`.
         """
-        super().__init__(base_url, api_key)
+        super().__init__(base_url, api_key, shared_client)
+        if rate_limiter is None and settings.rate_limit_enabled:
+            rate_limiter = get_rate_limiter()
+        self.rate_limiter = rate_limiter
+        if cache is None and settings.response_cache_enabled:
+            cache = get_response_cache()
+        self.cache = cache
+        self.prompt_tokens: Counter[str] = Counter()
+        self.cached_prompt_tokens: Counter[str] = Counter()
+
+    def prompt_cache_stats(self) -> dict[str, dict[str, int | float]]:
+        """Return prompt tokens, cached prompt tokens and the cached share."""
+        return {
+            model_id: {
+                "prompt_tokens": total,
+                "cached_tokens": self.cached_prompt_tokens[model_id],
+                "cached_ratio": self.cached_prompt_tokens[model_id] / total
+                if total
+                else 0.0,
+            }
+            for model_id, total in self.prompt_tokens.items()
+        }
+
+    def _record_prompt_usage(self, model_id: str, usage: dict | None) -> None:
+        """Accumulate prompt and cached-prompt token counts from a usage block."""
+        if not usage:
+            return
+        details = usage.get("prompt_tokens_details") or {}
+        cached = int(details.get("cached_tokens") or 0)
+        self.prompt_tokens[model_id] += int(usage.get("prompt_tokens") or 0)
+        self.cached_prompt_tokens[model_id] += cached
+        if cached:
+            logger.debug("prompt cache hit", model_id=model_id, cached_tokens=cached)
+
+    @staticmethod
+    def _with_prompt_cache(payload: ChatRequest) -> dict[str, Any]:
+        """
+        Turn the `cache_prefix` hint into a cache_control breakpoint.
+
+        The last message of the stable prefix is sent as a content part with
+        `cache_control`, and usage accounting is requested so that cached
+        token counts come back in the response.
+        """
+        body: dict[str, Any] = {k: v for k, v in payload.items() if k != "cache_prefix"}
+        prefix = payload.get("cache_prefix")
+        if not prefix or not settings.prompt_cache_enabled:
+            return body
+        messages: list[dict[str, Any]] = [dict(m) for m in payload["messages"]]
+        breakpoint_message = messages[prefix - 1]
+        breakpoint_message["content"] = [
+            {
+                "type": "text",
+                "text": breakpoint_message["content"],
+                "cache_control": CACHE_CONTROL,
+            }
+        ]
+        body["messages"] = messages
+        body["usage"] = {"include": True}
+        return body
+
+    def _attempt_slot(
+        self, json_payload: CompletionRequest | ChatRequest | dict[str, Any]
+    ) -> AbstractAsyncContextManager[None]:
+        """
+        Wait for capacity on the payload's model (no-op without a limiter).
+
+        Entered by every attempt, so retries and hedged copies count against
+        the model's concurrency and rate budgets like the first request.
+        """
+        if self.rate_limiter is None:
+            return nullcontext()
+        return self.rate_limiter.acquire(
+            json_payload["model"], estimate_tokens(dict(json_payload))
+        )
 
     async def send_completion(self, payload: CompletionRequest) -> dict:
         """
@@ -101,12 +206,77 @@ class AsyncOpenRouterProvider(AsyncBaseRouter):
         endpoint = "/completions"
         return await self._post(endpoint, payload)
 
-    async def send_chat_completion(self, payload: ChatRequest) -> dict:
+    async def send_chat_completion(
+        self,
+        payload: ChatRequest,
+        bypass_cache: bool = False,  # noqa: FBT001, FBT002
+    ) -> dict:
         """
         Send a prompt to the chat completions endpoint.
 
+        Identical requests are answered from the response cache, if one is
+        configured.
+
         :param payload: The JSON payload.
+        :param bypass_cache: Always query the API; the fresh response still
+            replaces the cached one.
         :return: The JSON response from the API.
         """
+        if self.cache is None:
+            return await self._fetch_chat_completion(payload)
+
+        if not bypass_cache:
+            cached = await self.cache.get(dict(payload))
+            if cached is not None:
+                return cached
+        start = time.perf_counter()
+        response = await self._fetch_chat_completion(payload)
+        if response.get("choices"):
+            await self.cache.set(
+                dict(payload), response, time.perf_counter() - start
+            )
+        return response
+
+    async def send_chat(
+        self,
+        payload: ChatRequest,
+        bypass_cache: bool = False,  # noqa: FBT001, FBT002
+    ) -> ModelResponse:
+        """
+        Send a chat completion and parse the answer once.
+
+        :param payload: The JSON payload.
+        :param bypass_cache: Always query the API.
+        :return: The response text with its price, explanation, latency and
+            token usage.
+        """
+        start = time.perf_counter()
+        response = await self.send_chat_completion(payload, bypass_cache)
+        return ModelResponse.from_completion(
+            payload["model"], response, time.perf_counter() - start
+        )
+
+    async def _fetch_chat_completion(self, payload: ChatRequest) -> dict:
+        """Query the chat completions endpoint, recording prompt-cache usage."""
+        endpoint = "/chat/completions"
+        response = await self._post(endpoint, self._with_prompt_cache(payload))
+        self._record_prompt_usage(payload["model"], response.get("usage"))
+        return response
+
+    async def stream_chat_completion(
+        self, payload: ChatRequest
+    ) -> AsyncIterator[dict]:
+        """
+        Stream a chat completion as it is generated.
+
+        Each yielded chunk carries a `choices[0].delta` with the next piece of
+        text; the final chunk carries the `usage` statistics. Use
+        `parse_stream_delta` to extract the text.
+
+        :param payload: The JSON payload.
+        :return: An async iterator over the completion chunks.
+        """
         endpoint = "/chat/completions"
-        return await self._post(endpoint, payload)
+        async for chunk in self._stream(endpoint, self._with_prompt_cache(payload)):
+            self._record_prompt_usage(payload["model"], chunk.get("usage"))
+            yield chunk
@@ -0,0 +1,368 @@
+"""
+Per-model concurrency and rate limiting for chat completion requests.
+
+Each model gets a cap on in-flight requests plus requests-per-minute and
+tokens-per-minute token buckets. Requests that exceed a budget are queued
+(the caller sleeps until capacity frees up) rather than rejected. Buckets can
+optionally live in a SQLite file so several worker processes on one host
+share a single budget.
+"""
+
+import asyncio
+import json
+import re
+import sqlite3
+import time
+import weakref
+from collections.abc import AsyncIterator
+from contextlib import asynccontextmanager
+from pathlib import Path
+from typing import Any
+
+import structlog
+from pydantic import BaseModel
+
+from flare_ai_consensus.settings import settings
+
+logger = structlog.get_logger(__name__)
+
+# OpenRouter documents a 20 requests/minute cap for ":free" model variants.
+FREE_MODEL_REQUESTS_PER_MINUTE = 20.0
+CHARS_PER_TOKEN = 4
+
+# Rate limit intervals as OpenRouter reports them, e.g. "10s" or "1m"
+_INTERVAL = re.compile(r"^\s*(\d+(?:\.\d+)?)\s*(ms|s|m|h)?\s*$")
+_INTERVAL_SECONDS = {"ms": 0.001, "s": 1.0, "m": 60.0, "h": 3600.0}
+
+
+class ModelRateLimits(BaseModel):
+    """Concurrency and throughput budget for one model"""
+
+    max_concurrency: int = 4
+    requests_per_minute: float | None = None
+    tokens_per_minute: float | None = None
+
+
+class TokenBucket:
+    """In-process token bucket that hands out reservations."""
+
+    def __init__(self, capacity: float, refill_per_second: float) -> None:
+        """
+        :param capacity: Maximum number of tokens held by the bucket.
+        :param refill_per_second: Tokens added per second.
+        """
+        self.capacity = capacity
+        self.refill_per_second = refill_per_second
+        self.tokens = capacity
+        self.updated = time.monotonic()
+
+    def reserve(self, amount: float) -> float:
+        """
+        Take `amount` tokens, going into debt if necessary.
+
+        :param amount: Tokens to take.
+        :return: Seconds the caller must wait before the reservation is valid.
+        """
+        self._refill()
+        self.tokens -= min(amount, self.capacity)
+        if self.tokens >= 0:
+            return 0.0
+        return -self.tokens / self.refill_per_second
+
+    def refund(self, amount: float) -> None:
+        """
+        Give back a reservation whose request was never sent.
+
+        :param amount: Tokens taken by `reserve`.
+        """
+        self._refill()
+        self.tokens = min(self.capacity, self.tokens + min(amount, self.capacity))
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        refill = (now - self.updated) * self.refill_per_second
+        self.tokens = min(self.capacity, self.tokens + refill)
+        self.updated = now
+
+
+class SQLiteBucketStore:
+    """
+    Token buckets persisted in a SQLite file shared between processes.
+
+    Every reservation runs in an IMMEDIATE transaction, so concurrent
+    workers serialize on the database lock and see a consistent balance.
+    """
+
+    def __init__(self, path: Path) -> None:
+        """
+        :param path: Location of the SQLite database file.
+        """
+        self.path = path
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with self._connect() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS buckets ("
+                "key TEXT PRIMARY KEY, tokens REAL NOT NULL, updated REAL NOT NULL)"
+            )
+
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(self.path, timeout=30.0, isolation_level=None)
+
+    def reserve(
+        self, key: str, amount: float, capacity: float, refill_per_second: float
+    ) -> float:
+        """
+        Take `amount` tokens from the shared bucket `key`.
+
+        :return: Seconds the caller must wait before the reservation is valid.
+        """
+        tokens = self._update(key, min(amount, capacity), capacity, refill_per_second)
+        if tokens >= 0:
+            return 0.0
+        return -tokens / refill_per_second
+
+    def refund(
+        self, key: str, amount: float, capacity: float, refill_per_second: float
+    ) -> None:
+        """Give back `amount` tokens reserved from the shared bucket `key`."""
+        self._update(key, -min(amount, capacity), capacity, refill_per_second)
+
+    def _update(
+        self, key: str, change: float, capacity: float, refill_per_second: float
+    ) -> float:
+        """Refill the bucket, take `change` tokens and return the balance."""
+        now = time.time()
+        conn = self._connect()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+        except BaseException:
+            conn.close()
+            raise
+        try:
+            row = conn.execute(
+                "SELECT tokens, updated FROM buckets WHERE key = ?", (key,)
+            ).fetchone()
+            tokens, updated = row if row else (capacity, now)
+            tokens = min(capacity, tokens + (now - updated) * refill_per_second)
+            tokens = min(capacity, tokens - change)
+            conn.execute(
+                "INSERT OR REPLACE INTO buckets (key, tokens, updated) "
+                "VALUES (?, ?, ?)",
+                (key, tokens, now),
+            )
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        finally:
+            conn.close()
+        return tokens
+
+
+class RateLimiter:
+    """Queues chat completion requests so they respect per-model budgets."""
+
+    def __init__(
+        self,
+        default_limits: ModelRateLimits | None = None,
+        model_limits: dict[str, ModelRateLimits] | None = None,
+        store: SQLiteBucketStore | None = None,
+    ) -> None:
+        """
+        :param default_limits: Budget for models without an explicit entry.
+        :param model_limits: Per-model budgets keyed by model ID.
+        :param store: Optional shared store for cross-process buckets.
+        """
+        self.default_limits = default_limits or ModelRateLimits()
+        self.model_limits = model_limits or {}
+        self.store = store
+        self._buckets: dict[str, TokenBucket] = {}
+        self._semaphores: weakref.WeakKeyDictionary[
+            asyncio.AbstractEventLoop, dict[str, asyncio.Semaphore]
+        ] = weakref.WeakKeyDictionary()
+
+    @classmethod
+    def from_models_json(
+        cls,
+        path: Path,
+        default_limits: ModelRateLimits | None = None,
+        store: SQLiteBucketStore | None = None,
+        overrides: dict[str, dict[str, Any]] | None = None,
+    ) -> "RateLimiter":
+        """
+        Build per-model limits from an OpenRouter `/models` dump and overrides.
+
+        The dump carries no rate limits, only model IDs: ":free" variants get
+        OpenRouter's documented 20 requests/minute. Other limits come from
+        `overrides`, keyed by model ID, whose entries either set
+        `ModelRateLimits` fields or give OpenRouter's rate_limit format
+        ({"requests": n, "interval": "10s"}).
+        """
+        default_limits = default_limits or ModelRateLimits()
+        model_limits: dict[str, ModelRateLimits] = {}
+        try:
+            with path.open() as f:
+                models = json.load(f).get("data", [])
+        except (OSError, ValueError) as e:
+            logger.warning(
+                "could not load model rate metadata", path=str(path), error=str(e)
+            )
+            models = []
+
+        for model in models:
+            if model["id"].endswith(":free"):
+                model_limits[model["id"]] = default_limits.model_copy(
+                    update={"requests_per_minute": FREE_MODEL_REQUESTS_PER_MINUTE}
+                )
+        for model_id, override in (overrides or {}).items():
+            fields = {
+                key: value
+                for key, value in override.items()
+                if key in ModelRateLimits.model_fields
+            }
+            if "requests" in override:
+                rpm = _requests_per_minute(override)
+                if rpm is not None:
+                    fields["requests_per_minute"] = rpm
+            base = model_limits.get(model_id, default_limits)
+            model_limits[model_id] = ModelRateLimits.model_validate(
+                {**base.model_dump(), **fields}
+            )
+        return cls(default_limits, model_limits, store)
+
+    def limits_for(self, model_id: str) -> ModelRateLimits:
+        """Return the budget applying to a model."""
+        return self.model_limits.get(model_id, self.default_limits)
+
+    def _semaphore(self, model_id: str) -> asyncio.Semaphore:
+        per_loop = self._semaphores.setdefault(asyncio.get_running_loop(), {})
+        semaphore = per_loop.get(model_id)
+        if semaphore is None:
+            semaphore = asyncio.Semaphore(self.limits_for(model_id).max_concurrency)
+            per_loop[model_id] = semaphore
+        return semaphore
+
+    async def _reserve(self, key: str, amount: float, per_minute: float) -> float:
+        if self.store is not None:
+            return await asyncio.to_thread(
+                self.store.reserve, key, amount, per_minute, per_minute / 60
+            )
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            bucket = self._buckets[key] = TokenBucket(per_minute, per_minute / 60)
+        return bucket.reserve(amount)
+
+    async def _refund(self, key: str, amount: float, per_minute: float) -> None:
+        if self.store is not None:
+            await asyncio.to_thread(
+                self.store.refund, key, amount, per_minute, per_minute / 60
+            )
+        elif key in self._buckets:
+            self._buckets[key].refund(amount)
+
+    @asynccontextmanager
+    async def acquire(self, model_id: str, tokens: int = 0) -> AsyncIterator[None]:
+        """
+        Wait until a request for `model_id` fits in its budget.
+
+        The rate budgets are waited for before a concurrency slot is taken,
+        so throttled requests do not hold slots other requests could use. A
+        caller cancelled before its request is sent gets its reservations
+        back.
+
+        :param model_id: The model being called.
+        :param tokens: Estimated prompt + completion tokens of the request.
+        """
+        limits = self.limits_for(model_id)
+        budgets: list[tuple[str, float, float]] = []
+        if limits.requests_per_minute:
+            budgets.append((f"{model_id}:requests", 1, limits.requests_per_minute))
+        if limits.tokens_per_minute and tokens:
+            budgets.append((f"{model_id}:tokens", tokens, limits.tokens_per_minute))
+
+        semaphore = self._semaphore(model_id)
+        reserved: list[tuple[str, float, float]] = []
+        try:
+            wait = 0.0
+            for key, amount, per_minute in budgets:
+                wait = max(wait, await self._reserve(key, amount, per_minute))
+                reserved.append((key, amount, per_minute))
+            if wait > 0:
+                logger.info("rate limited, queueing", model_id=model_id, wait=wait)
+                await asyncio.sleep(wait)
+            await semaphore.acquire()
+        except asyncio.CancelledError:
+            for key, amount, per_minute in reserved:
+                await self._refund(key, amount, per_minute)
+            raise
+        try:
+            yield
+        finally:
+            semaphore.release()
+
+
+def _requests_per_minute(rate_limit: dict | None) -> float | None:
+    """
+    Convert an OpenRouter rate_limit entry to requests per minute.
+
+    Entries with a missing request count or an unknown interval are logged
+    and ignored.
+    """
+    if not rate_limit:
+        return None
+    interval = str(rate_limit.get("interval", "60s"))
+    match = _INTERVAL.match(interval)
+    try:
+        requests = float(rate_limit["requests"])
+    except (KeyError, TypeError, ValueError):
+        requests = None
+    if match is None or requests is None:
+        logger.warning("ignoring unparsable rate limit", rate_limit=rate_limit)
+        return None
+    seconds = float(match[1]) * _INTERVAL_SECONDS[match[2] or "s"]
+    if seconds <= 0:
+        logger.warning("ignoring unparsable rate limit", rate_limit=rate_limit)
+        return None
+    return requests * 60 / seconds
+
+
+def _content_chars(content: Any) -> int:
+    """Count the text of a message, including content-part lists."""
+    if isinstance(content, list):
+        return sum(
+            len(str(part.get("text", ""))) for part in content if isinstance(part, dict)
+        )
+    return len(str(content or ""))
+
+
+def estimate_tokens(payload: dict) -> int:
+    """Rough prompt + completion token estimate for a chat payload."""
+    messages = payload.get("messages", [])
+    prompt_chars = sum(_content_chars(m.get("content")) for m in messages)
+    prompt_chars += _content_chars(payload.get("prompt"))
+    return prompt_chars // CHARS_PER_TOKEN + int(payload.get("max_tokens", 0))
+
+
+_default_limiter: RateLimiter | None = None
+
+
+def get_rate_limiter() -> RateLimiter:
+    """Return the process-wide limiter built from settings and `models.json`."""
+    global _default_limiter  # noqa: PLW0603
+    if _default_limiter is None:
+        store = (
+            SQLiteBucketStore(settings.rate_limit_store_path)
+            if settings.rate_limit_store_path
+            else None
+        )
+        _default_limiter = RateLimiter.from_models_json(
+            settings.data_path / "models.json",
+            ModelRateLimits(
+                max_concurrency=settings.rate_limit_max_concurrency,
+                requests_per_minute=settings.rate_limit_requests_per_minute,
+                tokens_per_minute=settings.rate_limit_tokens_per_minute,
+            ),
+            store,
+            settings.rate_limit_models,
+        )
+    return _default_limiter
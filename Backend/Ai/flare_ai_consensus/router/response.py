@@ -0,0 +1,96 @@
+from typing import Any
+
+from flare_ai_consensus.utils.parser_utils import (
+    parse_chat_response,
+    parse_price_and_explanation,
+)
+
+
+class ModelResponse:
+    """
+    A model's answer, parsed once when it leaves the router.
+
+    The price and explanation are extracted on construction so that rounds,
+    aggregation and event streams can read them without parsing the text
+    again. `str()` gives the raw text, and an empty answer is falsy.
+    """
+
+    __slots__ = (
+        "explanation",
+        "latency",
+        "logprobs",
+        "model_id",
+        "price",
+        "text",
+        "usage",
+    )
+
+    def __init__(
+        self,
+        model_id: str,
+        text: str,
+        latency: float = 0.0,
+        usage: dict[str, Any] | None = None,
+        logprobs: list[dict[str, Any]] | None = None,
+    ) -> None:
+        """
+        Parse a response text.
+
+        :param model_id: The model that produced the text.
+        :param text: The response text.
+        :param latency: Seconds the request took, including retries.
+        :param usage: The OpenRouter `usage` block, if returned.
+        :param logprobs: The `choices[0].logprobs.content` entries, if
+            requested.
+        """
+        self.model_id = model_id
+        self.text = text
+        self.latency = latency
+        self.usage = usage
+        self.logprobs = logprobs
+        self.price, self.explanation = parse_price_and_explanation(text)
+
+    @classmethod
+    def from_completion(
+        cls, model_id: str, response: dict[str, Any], latency: float = 0.0
+    ) -> "ModelResponse":
+        """
+        Build the response from a chat completions JSON body.
+
+        :param model_id: The requested model.
+        :param response: The JSON response of the chat completions endpoint.
+        :param latency: Seconds the request took.
+        :return: The parsed response.
+        """
+        choices = response.get("choices") or []
+        logprobs = (choices[0].get("logprobs") or {}).get("content") if choices else None
+        return cls(
+            model_id,
+            parse_chat_response(response),
+            latency,
+            response.get("usage"),
+            logprobs,
+        )
+
+    def __str__(self) -> str:
+        return self.text
+
+    def __repr__(self) -> str:
+        return (
+            f"ModelResponse(model_id={self.model_id!r}, price={self.price!r}, "
+            f"latency={self.latency:.3f}, text={self.text[:40]!r})"
+        )
+
+    def __bool__(self) -> bool:
+        return bool(self.text)
+
+    def to_dict(self) -> dict[str, Any]:
+        """Return the response as event / result JSON."""
+        return {
+            "model_id": self.model_id,
+            "response": self.text,
+            "price": self.price,
+            "explanation": self.explanation,
+            "latency": round(self.latency, 3),
+            "usage": self.usage,
+        }
@@ -1,5 +1,5 @@
 from pathlib import Path
-from typing import Literal, TypedDict
+from typing import Any, Literal, TypedDict
 
 import structlog
 from pydantic import BaseModel
@@ -27,6 +27,25 @@ class ModelConfig(BaseModel):
     max_tokens: int = 50
     temperature: float = 0.7
 
+    # Request policy
+    timeout: float = 30.0
+    adaptive_timeout: bool = False
+    max_retries: int = 2
+    hedge: bool = False
+
+    @classmethod
+    def from_json(cls, json_data: dict) -> "ModelConfig":
+        """Create ModelConfig from a model entry of the consensus JSON"""
+        return cls(
+            model_id=json_data["id"],
+            max_tokens=json_data["max_tokens"],
+            temperature=json_data["temperature"],
+            timeout=json_data.get("timeout", 30.0),
+            adaptive_timeout=json_data.get("adaptive_timeout", False),
+            max_retries=json_data.get("max_retries", 2),
+            hedge=json_data.get("hedge", False),
+        )
+
 
 class AggregatorConfig(BaseModel):
     """Configuration for the aggregator"""
@@ -36,6 +55,18 @@ class AggregatorConfig(BaseModel):
     context: list[Message]
     prompt: list[Message]
 
+    # Adaptive aggregation by price dispersion (coefficient of variation):
+    # at or below `local_threshold` prices are combined locally without an
+    # LLM call, at or below `fast_threshold` the cheaper `fast_model`
+    # aggregates, and anything above goes to `model`.
+    fast_model: ModelConfig | None = None
+    local_threshold: float | None = None
+    fast_threshold: float | None = None
+
+    # How the confidence aggregator weights models: normalized confidence
+    # scores, or Shapley values of each model's contribution to agreement
+    weighting: Literal["confidence", "shapley"] = "confidence"
+
 
 class ConsensusConfig(BaseModel):
     """Configuration for the consensus mechanism"""
@@ -46,33 +77,50 @@ class ConsensusConfig(BaseModel):
     iterations: int
     aggregated_prompt_type: Literal["user", "assistant", "system"]
 
+    # Quorum policy: close a round once `min_responses` models have answered
+    # or `round_deadline` seconds have passed. None waits for every model.
+    min_responses: int | None = None
+    round_deadline: float | None = None
+
+    # Early exit: skip the remaining improvement rounds once the price
+    # dispersion of a round drops to `convergence_threshold`. None disables it.
+    convergence_threshold: float | None = None
+    convergence_metric: Literal["cv", "spread"] = "cv"
+
+    # Confidence consensus: dispatch every challenge round at once instead of
+    # one after another, with at most `challenge_concurrency` challenge
+    # requests in flight. None leaves concurrency to the rate limiter.
+    parallel_challenges: bool = False
+    challenge_concurrency: int | None = None
+
+    # "logprobs" scores confidence from the token distribution of each
+    # model's initial price and only challenges models returning no logprobs.
+    confidence_mode: Literal["challenge", "logprobs"] = "challenge"
+
     @classmethod
     def from_json(cls, json_data: dict) -> "ConsensusConfig":
         """Create ConsensusConfig from JSON data"""
         # Parse the list of models
-        models = [
-            ModelConfig(
-                model_id=m["id"],
-                max_tokens=m["max_tokens"],
-                temperature=m["temperature"],
-            )
-            for m in json_data.get("models", [])
-        ]
+        models = [ModelConfig.from_json(m) for m in json_data.get("models", [])]
 
         # Parse the aggregator configuration
         aggr_data = json_data.get("aggregator", [])[0]
         aggr_model_data = aggr_data.get("model", {})
-        aggregator_model = ModelConfig(
-            model_id=aggr_model_data["id"],
-            max_tokens=aggr_model_data["max_tokens"],
-            temperature=aggr_model_data["temperature"],
-        )
+        aggregator_model = ModelConfig.from_json(aggr_model_data)
 
         aggregator_config = AggregatorConfig(
             model=aggregator_model,
             approach=aggr_data.get("approach", ""),
             context=aggr_data.get("aggregator_context", []),
             prompt=aggr_data.get("aggregator_prompt", []),
+            fast_model=(
+                ModelConfig.from_json(aggr_data["fast_model"])
+                if "fast_model" in aggr_data
+                else None
+            ),
+            local_threshold=aggr_data.get("local_threshold"),
+            fast_threshold=aggr_data.get("fast_threshold"),
+            weighting=aggr_data.get("weighting", "confidence"),
         )
 
         return cls(
@@ -81,6 +129,13 @@ class ConsensusConfig(BaseModel):
             improvement_prompt=json_data.get("improvement_prompt", ""),
             iterations=json_data.get("iterations", 1),
             aggregated_prompt_type=json_data.get("aggregated_prompt_type", "system"),
+            min_responses=json_data.get("min_responses"),
+            round_deadline=json_data.get("round_deadline"),
+            convergence_threshold=json_data.get("convergence_threshold"),
+            convergence_metric=json_data.get("convergence_metric", "cv"),
+            parallel_challenges=json_data.get("parallel_challenges", False),
+            challenge_concurrency=json_data.get("challenge_concurrency"),
+            confidence_mode=json_data.get("confidence_mode", "challenge"),
         )
 
 
@@ -94,6 +149,93 @@ class Settings(BaseSettings):
     open_router_base_url: str = "https://openrouter.ai/api/v1"
     open_router_api_key: str = ""
 
+    # HTTP Connection Pool Settings
+    http2_enabled: bool = True
+    http_max_connections_per_host: int = 20
+    http_max_keepalive_connections: int = 10
+    http_keepalive_expiry: float = 120.0
+    # Hosts called by the routers through httpx
+    http_prewarm_urls: list[str] = ["https://openrouter.ai/api/v1/models"]
+    # Hosts called by the metadata and price fetchers through aiohttp
+    aiohttp_prewarm_urls: list[str] = [
+        "https://get-nft-data-dkwdhhyv7q-uc.a.run.app",
+        "https://api.coingecko.com/api/v3/ping",
+    ]
+
+    # Rate Limiter Settings
+    rate_limit_enabled: bool = True
+    rate_limit_max_concurrency: int = 4
+    rate_limit_requests_per_minute: float | None = None
+    rate_limit_tokens_per_minute: float | None = None
+    # Per-model limits by model ID, given as ModelRateLimits fields or in
+    # OpenRouter's format, e.g. {"<model>": {"requests": 10, "interval": "10s"}}
+    rate_limit_models: dict[str, dict[str, Any]] = {}
+    # SQLite file shared by worker processes; per-process buckets if unset
+    rate_limit_store_path: Path | None = None
+
+    # Response Cache Settings
+    response_cache_enabled: bool = False
+    response_cache_ttl: float = 86_400.0
+    response_cache_max_entries: int = 512
+    # SQLite file for the disk tier; memory-only if unset
+    response_cache_path: Path | None = None
+    response_cache_max_disk_entries: int = 10_000
+
+    # Prompt Cache Settings
+    # Mark stable message prefixes with cache_control breakpoints
+    prompt_cache_enabled: bool = True
+
+    # Embedding Backend Settings
+    # "local" uses the offline hashed TF-IDF backend even when Gemini is set up
+    embedding_backend: Literal["gemini", "local"] = "gemini"
+    local_embedding_dim: int = 1024
+    # .npz file keeping the local backend's IDF statistics across restarts
+    local_embedding_idf_path: Path | None = None
+
+    # Embedding Cache Settings
+    embedding_cache_max_entries: int = 2048
+    # Keep embeddings in a SQLite file across restarts; defaults to
+    # data/embedding_cache.sqlite when no path is given
+    embedding_cache_persist: bool = False
+    embedding_cache_path: Path | None = None
+    embedding_cache_ttl: float = 30 * 86_400.0
+    embedding_cache_max_disk_entries: int = 50_000
+
+    # Similarity Cascade Settings
+    # Settle equal and near-duplicate text pairs (MinHash Jaccard estimate at
+    # or above high) without embeddings; every other pair is embedded
+    similarity_cascade_enabled: bool = True
+    similarity_cascade_high: float = 0.9
+
+    # Event Channel Settings
+    # Events kept per streaming job for replay; "compact" evicts token deltas
+    # and log lines before other events once a channel is full
+    event_channel_max_events: int = 512
+    event_channel_policy: Literal["drop_oldest", "compact"] = "compact"
+    # Seconds a finished job's events stay available to reconnecting clients
+    event_channel_retention: float = 300.0
+    event_channel_max_channels: int = 1000
+    # Seconds an unfinished job's channel is kept with nobody subscribed,
+    # e.g. after a client disconnected before its stream opened
+    event_channel_idle_ttl: float | None = 900.0
+    # Seconds between keepalive comments on idle streams, from one shared timer
+    sse_heartbeat_interval: float = 15.0
+    # Cancel a streamed appraisal once its last subscriber has been gone for
+    # the grace period; jobs with other subscribers attached keep running
+    stream_cancel_on_disconnect: bool = True
+    stream_cancel_grace: float = 5.0
+
+    # Job Scheduler Settings
+    # Appraisals run at once; up to job_queue_size more wait for a worker,
+    # beyond which submissions are refused with 503 and Retry-After
+    job_concurrency: int = 4
+    job_queue_size: int = 64
+    # Seconds before a running appraisal is failed; unlimited if unset
+    job_timeout: float | None = 900.0
+    # Seconds a finished job's result stays available for polling
+    job_retention: float = 3600.0
+    job_max_jobs: int = 10000
+
     # Path Settings
     data_path: Path = create_path("data")
     input_path: Path = create_path("flare_ai_consensus")
@@ -0,0 +1,32 @@
+from .cancellation import cancel_job, cancel_when_abandoned
+from .channels import (
+    TRANSIENT_EVENT_TYPES,
+    ChannelEvent,
+    ChannelRegistry,
+    EventChannel,
+    current_channel,
+    format_sse,
+    get_channel_registry,
+    parse_event_id,
+    publish_event,
+    run_job,
+)
+from .heartbeat import Heartbeat, close_heartbeat, get_heartbeat
+
+__all__ = [
+    "TRANSIENT_EVENT_TYPES",
+    "ChannelEvent",
+    "ChannelRegistry",
+    "EventChannel",
+    "Heartbeat",
+    "cancel_job",
+    "cancel_when_abandoned",
+    "close_heartbeat",
+    "current_channel",
+    "format_sse",
+    "get_channel_registry",
+    "get_heartbeat",
+    "parse_event_id",
+    "publish_event",
+    "run_job",
+]
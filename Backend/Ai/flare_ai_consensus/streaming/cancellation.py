@@ -0,0 +1,126 @@
+"""
+Cancel streamed appraisals nobody is listening to anymore.
+
+A streamed appraisal keeps issuing model, challenge and aggregator calls
+after its browser tab is closed. Once the last subscriber of a job's channel
+has been gone for a grace period, which leaves room for an EventSource to
+reconnect and resume, the job is cancelled: the cancellation propagates into
+every outstanding router call, whose HTTP requests and streams are closed,
+and is counted by reason on `/metrics`. Jobs with other subscribers attached
+keep running.
+"""
+
+import asyncio
+import concurrent.futures
+import threading
+from collections import Counter
+from collections.abc import Callable
+
+import structlog
+
+from flare_ai_consensus.router import (
+    metric_header,
+    metric_labels,
+    register_collector,
+)
+from flare_ai_consensus.settings import settings
+from flare_ai_consensus.streaming.channels import EventChannel
+
+logger = structlog.get_logger(__name__)
+
+Job = asyncio.Task | concurrent.futures.Future
+
+# Cancelled appraisals by reason, e.g. "client_disconnect" or "shutdown"
+_cancellations: Counter[str] = Counter()
+_cancellations_lock = threading.Lock()
+
+
+def cancel_job(channel: EventChannel, job: Job, reason: str) -> bool:
+    """
+    Cancel a job and tell any late subscriber why its stream ends.
+
+    :param channel: The job's channel.
+    :param job: The job's task, or the future of a task submitted from another
+        thread; cancelling the future cancels the task.
+    :param reason: Cancellation reason recorded in the metrics.
+    :return: Whether the job was still running.
+    """
+    if job.done():
+        return False
+    channel.publish("cancelled", {"reason": reason})
+    job.cancel()
+    with _cancellations_lock:
+        _cancellations[reason] += 1
+    logger.info("appraisal cancelled", job_id=channel.job_id, reason=reason)
+    return True
+
+
+def cancel_when_abandoned(
+    channel: EventChannel,
+    job: Job,
+    loop: asyncio.AbstractEventLoop | None = None,
+    grace: float | None = None,
+) -> None:
+    """
+    Cancel `job` once its channel has had no subscribers for `grace` seconds.
+
+    The grace period starts when the channel is opened, so a job whose client
+    disconnects before attaching is cancelled too, and again whenever the
+    last subscriber leaves; an attaching subscriber stops it. Does nothing
+    when `settings.stream_cancel_on_disconnect` is off.
+
+    :param channel: The job's channel.
+    :param job: The job's task or future.
+    :param loop: The loop running the job. Defaults to the running loop.
+    :param grace: Seconds to wait for a subscriber to come back. Defaults to
+        `settings.stream_cancel_grace`.
+    """
+    if not settings.stream_cancel_on_disconnect:
+        return
+    loop = loop or asyncio.get_running_loop()
+    delay = settings.stream_cancel_grace if grace is None else grace
+    # Pending grace timer; only touched on the loop's thread
+    timers: list[asyncio.TimerHandle] = []
+
+    def check() -> None:
+        timers.clear()
+        if channel.subscribers == 0 and not channel.closed:
+            cancel_job(channel, job, "client_disconnect")
+
+    def stop() -> None:
+        while timers:
+            timers.pop().cancel()
+
+    def start() -> None:
+        stop()
+        timers.append(loop.call_later(delay, check))
+
+    def from_any_thread(callback: Callable[[], None]) -> Callable[[], None]:
+        def schedule() -> None:
+            if not loop.is_closed():
+                loop.call_soon_threadsafe(callback)
+
+        return schedule
+
+    channel.on_idle(from_any_thread(start))
+    channel.on_attach(from_any_thread(stop))
+    if channel.subscribers == 0:
+        from_any_thread(start)()
+
+
+def _render_cancellation_metrics() -> list[str]:
+    """Appraisals cancelled before finishing, by reason."""
+    with _cancellations_lock:
+        counts = sorted(_cancellations.items())
+    lines = metric_header(
+        "appraisal_cancellations_total",
+        "counter",
+        "Appraisals cancelled before finishing, by reason.",
+    )
+    for reason, count in counts:
+        labels = metric_labels(reason=reason)
+        lines.append(f"appraisal_cancellations_total{labels} {count}")
+    return lines
+
+
+register_collector("appraisal_cancellations", _render_cancellation_metrics)
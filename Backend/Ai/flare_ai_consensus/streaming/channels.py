@@ -0,0 +1,541 @@
+"""
+Per-job event channels for the streaming endpoints.
+
+Every appraisal publishes its progress into its own `EventChannel`, a bounded
+ring buffer of numbered events. Subscribers read a channel by cursor rather
+than consuming it, so any number of them can follow the same job without
+stealing or wiping each other's events, and a client that reconnects resumes
+after the `Last-Event-ID` it last received.
+
+When a channel is full, the `compact` policy first evicts transient events
+(token deltas, log lines) whose content is repeated by later events, and the
+`drop_oldest` policy evicts strictly in order. Subscribers that fall behind
+are told how many events they missed.
+"""
+
+import asyncio
+import json
+import threading
+import time
+import uuid
+from collections import deque
+from collections.abc import AsyncIterator, Callable, Coroutine, Iterable, Iterator
+from contextvars import ContextVar
+from dataclasses import dataclass
+from datetime import datetime
+from typing import TYPE_CHECKING, Any, Literal, TypeVar
+
+import structlog
+
+from flare_ai_consensus.settings import settings
+
+if TYPE_CHECKING:
+    from flare_ai_consensus.streaming.heartbeat import Heartbeat
+
+logger = structlog.get_logger(__name__)
+
+T = TypeVar("T")
+
+ChannelPolicy = Literal["drop_oldest", "compact"]
+
+# Partial model output and log lines; the model responses and stage events
+# that follow carry the same information
+TRANSIENT_EVENT_TYPES = frozenset({"model_delta", "log"})
+
+
+@dataclass(frozen=True, slots=True)
+class ChannelEvent:
+    """One numbered event of a job's channel."""
+
+    job_id: str
+    seq: int
+    type: str
+    data: Any
+    timestamp: str
+
+    @property
+    def id(self) -> str:
+        """The SSE event id, `<job id>:<sequence number>`."""
+        return f"{self.job_id}:{self.seq}"
+
+    def payload(self) -> dict[str, Any]:
+        """Return the event as sent in the SSE `data` field."""
+        return {"type": self.type, "data": self.data, "timestamp": self.timestamp}
+
+    def to_sse(self) -> str:
+        """Format the event as a server-sent event."""
+        return format_sse(self.type, self.payload(), self.id)
+
+
+def format_sse(event_type: str, payload: Any, event_id: str | None = None) -> str:
+    """
+    Format a server-sent event.
+
+    :param event_type: The SSE `event` name.
+    :param payload: JSON-serializable event data.
+    :param event_id: Optional SSE `id`, echoed back by reconnecting clients in
+        the `Last-Event-ID` header.
+    :return: The encoded event, terminated by a blank line.
+    """
+    id_line = f"id: {event_id}\n" if event_id is not None else ""
+    return f"{id_line}event: {event_type}\ndata: {json.dumps(payload)}\n\n"
+
+
+def parse_event_id(event_id: str | None) -> tuple[str, int] | None:
+    """
+    Split an SSE event id into job id and sequence number.
+
+    :param event_id: A `Last-Event-ID` value.
+    :return: (job id, sequence number), or None if the id is malformed.
+    """
+    if not event_id:
+        return None
+    job_id, _, seq = event_id.rpartition(":")
+    if not job_id or not seq.isdigit():
+        return None
+    return job_id, int(seq)
+
+
+def _resolve(waiter: "asyncio.Future[None]") -> None:
+    if not waiter.done():
+        waiter.set_result(None)
+
+
+def wake(waiter: "asyncio.Future[None]") -> None:
+    """
+    Resolve a waiter future from any thread.
+
+    :param waiter: A future created by a subscriber on its event loop.
+    """
+    loop = waiter.get_loop()
+    try:
+        running = asyncio.get_running_loop()
+    except RuntimeError:
+        running = None
+    if running is loop:
+        _resolve(waiter)
+    elif not loop.is_closed():
+        loop.call_soon_threadsafe(_resolve, waiter)
+
+
+def _dropped_notice(count: int) -> str:
+    return format_sse(
+        "events_dropped", {"type": "events_dropped", "data": {"count": count}}
+    )
+
+
+def _close_event() -> str:
+    return format_sse(
+        "close",
+        {
+            "type": "close",
+            "data": {
+                "message": "Stream complete",
+                "timestamp": datetime.now().isoformat(),
+            },
+        },
+    )
+
+
+class EventChannel:
+    """Bounded, replayable event log of a single job."""
+
+    def __init__(
+        self,
+        job_id: str,
+        max_events: int = 512,
+        policy: ChannelPolicy = "compact",
+        transient_types: Iterable[str] = TRANSIENT_EVENT_TYPES,
+    ) -> None:
+        """
+        :param job_id: Identifier of the job publishing into the channel.
+        :param max_events: Events retained for replay.
+        :param policy: Eviction policy once `max_events` is reached.
+        :param transient_types: Event types the `compact` policy evicts first.
+        """
+        self.job_id = job_id
+        self.max_events = max_events
+        self.policy = policy
+        self.transient_types = frozenset(transient_types)
+        self.created_at = time.monotonic()
+        self.closed_at: float | None = None
+        # When the channel last had no subscribers; None while one is attached
+        self.idle_since: float | None = self.created_at
+        self.dropped = 0
+        self.subscribers = 0
+        self._events: deque[ChannelEvent] = deque()
+        self._last_seq = 0
+        self._condition = threading.Condition()
+        # Futures of subscribers awaiting the next event on an event loop
+        self._waiters: set[asyncio.Future[None]] = set()
+        self._idle_callbacks: list[Callable[[], None]] = []
+        self._attach_callbacks: list[Callable[[], None]] = []
+
+    @property
+    def closed(self) -> bool:
+        """Whether the job has finished publishing."""
+        return self.closed_at is not None
+
+    @property
+    def last_seq(self) -> int:
+        """Sequence number of the most recent event, 0 if none."""
+        return self._last_seq
+
+    def publish(self, event_type: str, data: Any) -> ChannelEvent | None:
+        """
+        Append an event and wake waiting subscribers.
+
+        :param event_type: The event name.
+        :param data: JSON-serializable event data.
+        :return: The event, or None if the channel is already closed.
+        """
+        with self._condition:
+            if self.closed:
+                return None
+            self._last_seq += 1
+            event = ChannelEvent(
+                self.job_id,
+                self._last_seq,
+                event_type,
+                data,
+                datetime.now().isoformat(),
+            )
+            if len(self._events) >= self.max_events:
+                self._evict()
+            self._events.append(event)
+            self._notify()
+        return event
+
+    def _notify(self) -> None:
+        """Wake blocked and awaiting subscribers; call with the lock held."""
+        self._condition.notify_all()
+        waiters, self._waiters = self._waiters, set()
+        for waiter in waiters:
+            wake(waiter)
+
+    def _evict(self) -> None:
+        """Make room for one event according to the policy."""
+        if self.policy == "compact":
+            for i, event in enumerate(self._events):
+                if event.type in self.transient_types:
+                    del self._events[i]
+                    break
+            else:
+                self._events.popleft()
+        else:
+            self._events.popleft()
+        self.dropped += 1
+
+    def events_after(self, seq: int) -> tuple[list[ChannelEvent], int]:
+        """
+        Return the retained events newer than `seq`.
+
+        :param seq: Sequence number of the last event the subscriber has.
+        :return: The events in order, and how many newer events were evicted
+            before the subscriber could read them.
+        """
+        with self._condition:
+            newer: list[ChannelEvent] = []
+            for event in reversed(self._events):
+                if event.seq <= seq:
+                    break
+                newer.append(event)
+            newer.reverse()
+            missed = max(self._last_seq - max(seq, 0), 0) - len(newer)
+        return newer, missed
+
+    def wait(
+        self, seq: int, timeout: float | None = None
+    ) -> tuple[list[ChannelEvent], int]:
+        """
+        Block until there are events newer than `seq` or the channel closes.
+
+        :param seq: Sequence number of the last event the subscriber has.
+        :param timeout: Seconds to wait at most.
+        :return: As for `events_after`; empty if the wait timed out.
+        """
+        with self._condition:
+            self._condition.wait_for(
+                lambda: self.closed or self._last_seq > seq, timeout
+            )
+        return self.events_after(seq)
+
+    async def wait_async(
+        self, seq: int, heartbeat: "Heartbeat | None" = None
+    ) -> tuple[list[ChannelEvent], int]:
+        """
+        Await events newer than `seq` without holding a thread.
+
+        :param seq: Sequence number of the last event the subscriber has.
+        :param heartbeat: Shared timer that also ends the wait on its ticks.
+        :return: As for `events_after`; empty if woken by the heartbeat.
+        """
+        with self._condition:
+            if self.closed or self._last_seq > seq:
+                waiter = None
+            else:
+                waiter = asyncio.get_running_loop().create_future()
+                self._waiters.add(waiter)
+        if waiter is not None:
+            if heartbeat is not None:
+                heartbeat.register(waiter)
+            try:
+                await waiter
+            finally:
+                with self._condition:
+                    self._waiters.discard(waiter)
+                if heartbeat is not None:
+                    heartbeat.discard(waiter)
+        return self.events_after(seq)
+
+    def close(self) -> None:
+        """Mark the job finished; subscribers end after draining the channel."""
+        with self._condition:
+            if self.closed_at is None:
+                self.closed_at = time.monotonic()
+            self._notify()
+
+    def attach(self) -> None:
+        """Count a new subscriber, running attach callbacks for the first one."""
+        with self._condition:
+            self.subscribers += 1
+            self.idle_since = None
+            first = self.subscribers == 1
+            callbacks = list(self._attach_callbacks) if first else []
+        for callback in callbacks:
+            callback()
+
+    def detach(self) -> None:
+        """Count a subscriber leaving, running idle callbacks for the last one."""
+        with self._condition:
+            self.subscribers = max(self.subscribers - 1, 0)
+            if self.subscribers == 0:
+                self.idle_since = time.monotonic()
+            idle = self.subscribers == 0 and not self.closed
+            callbacks = list(self._idle_callbacks) if idle else []
+        for callback in callbacks:
+            callback()
+
+    def on_idle(self, callback: Callable[[], None]) -> None:
+        """
+        Call `callback` whenever the last subscriber of the open channel leaves.
+
+        :param callback: Called without arguments from the detaching thread.
+        """
+        with self._condition:
+            self._idle_callbacks.append(callback)
+
+    def on_attach(self, callback: Callable[[], None]) -> None:
+        """
+        Call `callback` whenever a subscriber attaches to a channel without any.
+
+        :param callback: Called without arguments from the attaching thread.
+        """
+        with self._condition:
+            self._attach_callbacks.append(callback)
+
+    def stream(self, after: int = 0, keepalive: float = 1.0) -> Iterator[str]:
+        """
+        Yield the channel as server-sent events until the job has finished.
+
+        A `events_dropped` notice precedes events that follow a gap, a
+        keepalive comment is sent whenever nothing arrived for `keepalive`
+        seconds, and a `close` event ends the stream. Blocks the calling
+        thread between events; see `astream` for event loops.
+
+        :param after: Sequence number to resume after.
+        :param keepalive: Seconds between keepalive comments.
+        """
+        self.attach()
+        try:
+            cursor = min(after, self.last_seq)
+            while True:
+                events, missed = self.wait(cursor, keepalive)
+                if missed:
+                    yield _dropped_notice(missed)
+                for event in events:
+                    yield event.to_sse()
+                    cursor = event.seq
+                if events or missed:
+                    continue
+                if self.closed:
+                    break
+                yield ": keepalive\n\n"
+            yield _close_event()
+        finally:
+            self.detach()
+
+    async def astream(
+        self, after: int = 0, heartbeat: "Heartbeat | None" = None
+    ) -> AsyncIterator[str]:
+        """
+        Asynchronous `stream`: awaits events instead of blocking a thread.
+
+        Keepalive comments are sent on the ticks of a shared `heartbeat`
+        rather than from a timer per subscriber.
+
+        :param after: Sequence number to resume after.
+        :param heartbeat: Shared keepalive timer; none are sent without it.
+        """
+        self.attach()
+        try:
+            cursor = min(after, self.last_seq)
+            while True:
+                events, missed = await self.wait_async(cursor, heartbeat)
+                if missed:
+                    yield _dropped_notice(missed)
+                for event in events:
+                    yield event.to_sse()
+                    cursor = event.seq
+                if events or missed:
+                    continue
+                if self.closed:
+                    break
+                yield ": keepalive\n\n"
+            yield _close_event()
+        finally:
+            self.detach()
+
+
+class ChannelRegistry:
+    """Event channels of running and recently finished jobs, by job id."""
+
+    def __init__(
+        self,
+        max_events: int = 512,
+        policy: ChannelPolicy = "compact",
+        retention: float = 300.0,
+        max_channels: int = 1000,
+        idle_ttl: float | None = None,
+    ) -> None:
+        """
+        :param max_events: Events retained per channel.
+        :param policy: Eviction policy of each channel.
+        :param retention: Seconds a closed channel stays available for replay.
+        :param max_channels: Channels kept before closed ones are discarded
+            early, oldest first.
+        :param idle_ttl: Seconds an open channel is kept without subscribers
+            before it is closed and discarded; open channels are kept until
+            their job finishes if None.
+        """
+        self.max_events = max_events
+        self.policy = policy
+        self.retention = retention
+        self.max_channels = max_channels
+        self.idle_ttl = idle_ttl
+        self._channels: dict[str, EventChannel] = {}
+        self._lock = threading.Lock()
+
+    def create(self, job_id: str | None = None) -> EventChannel:
+        """
+        Open a channel for a new job.
+
+        :param job_id: The job id; a random one is generated by default.
+        :return: The channel.
+        """
+        channel = EventChannel(
+            job_id or uuid.uuid4().hex, self.max_events, self.policy
+        )
+        with self._lock:
+            self._prune(reserve=1)
+            self._channels[channel.job_id] = channel
+        return channel
+
+    def get(self, job_id: str) -> EventChannel | None:
+        """Return the channel of a job, or None if unknown or expired."""
+        with self._lock:
+            self._prune()
+            return self._channels.get(job_id)
+
+    def _prune(self, reserve: int = 0) -> None:
+        """Discard expired channels, and the oldest closed ones when full."""
+        now = time.monotonic()
+        if self.idle_ttl is not None:
+            self._expire_idle(now - self.idle_ttl)
+        closed = [
+            job_id
+            for job_id, channel in self._channels.items()
+            if channel.closed_at is not None
+        ]
+        excess = len(self._channels) + reserve - self.max_channels
+        for job_id in closed:
+            closed_at = self._channels[job_id].closed_at or now
+            if excess > 0 or now - closed_at > self.retention:
+                del self._channels[job_id]
+                excess -= 1
+
+    def _expire_idle(self, cutoff: float) -> None:
+        """Close and discard open channels without subscribers since `cutoff`."""
+        for job_id, channel in list(self._channels.items()):
+            idle_since = channel.idle_since
+            if channel.closed or idle_since is None or idle_since > cutoff:
+                continue
+            channel.close()
+            del self._channels[job_id]
+            logger.info("idle event channel expired", job_id=job_id)
+
+    def stats(self) -> dict[str, int]:
+        """Return the number of open and closed channels and events dropped."""
+        with self._lock:
+            channels = list(self._channels.values())
+        return {
+            "open": sum(not channel.closed for channel in channels),
+            "closed": sum(channel.closed for channel in channels),
+            "events_dropped": sum(channel.dropped for channel in channels),
+        }
+
+
+# Channel of the job running in the current task; inherited by the tasks
+# and threads it starts, so deep call sites can publish without plumbing
+current_channel: ContextVar[EventChannel | None] = ContextVar(
+    "current_channel", default=None
+)
+
+
+def publish_event(event_type: str, data: Any) -> ChannelEvent | None:
+    """
+    Publish an event to the current job's channel.
+
+    :param event_type: The event name.
+    :param data: JSON-serializable event data.
+    :return: The event, or None outside of a job.
+    """
+    channel = current_channel.get()
+    if channel is None:
+        return None
+    return channel.publish(event_type, data)
+
+
+async def run_job(channel: EventChannel, coro: Coroutine[Any, Any, T]) -> T:
+    """
+    Run a job's coroutine with `channel` as its current channel.
+
+    The channel is closed when the coroutine finishes, however it finishes.
+
+    :param channel: The job's channel.
+    :param coro: The job.
+    :return: The coroutine's result.
+    """
+    token = current_channel.set(channel)
+    try:
+        return await coro
+    finally:
+        current_channel.reset(token)
+        channel.close()
+
+
+_default_registry: ChannelRegistry | None = None
+
+
+def get_channel_registry() -> ChannelRegistry:
+    """Return the process-wide channel registry configured from settings."""
+    global _default_registry  # noqa: PLW0603
+    if _default_registry is None:
+        _default_registry = ChannelRegistry(
+            max_events=settings.event_channel_max_events,
+            policy=settings.event_channel_policy,
+            retention=settings.event_channel_retention,
+            max_channels=settings.event_channel_max_channels,
+            idle_ttl=settings.event_channel_idle_ttl,
+        )
+    return _default_registry
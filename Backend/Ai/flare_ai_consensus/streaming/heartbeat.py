@@ -0,0 +1,106 @@
+"""
+One keepalive timer shared by every idle stream on an event loop.
+
+Waking each open stream from its own timer costs a timer handle and a
+wake-up per stream per interval. Instead, idle subscribers register the
+future they are awaiting with the loop's `Heartbeat`, and a single task
+resolves all registered futures on each tick, after which each subscriber
+writes a keepalive comment.
+"""
+
+import asyncio
+import weakref
+
+import structlog
+
+from flare_ai_consensus.settings import settings
+from flare_ai_consensus.streaming.channels import wake
+
+logger = structlog.get_logger(__name__)
+
+
+class Heartbeat:
+    """Periodic wake-up of the subscribers waiting on one event loop."""
+
+    def __init__(self, interval: float = 15.0) -> None:
+        """
+        :param interval: Seconds between ticks.
+        """
+        self.interval = interval
+        self.ticks = 0
+        self._waiters: set[asyncio.Future[None]] = set()
+        self._task: asyncio.Task[None] | None = None
+
+    @property
+    def waiting(self) -> int:
+        """Number of subscribers waiting for the next tick."""
+        return len(self._waiters)
+
+    def start(self) -> None:
+        """Start ticking on the running event loop, if not already started."""
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(
+                self._run(), name="sse-heartbeat"
+            )
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.interval)
+            self.ticks += 1
+            waiters, self._waiters = self._waiters, set()
+            for waiter in waiters:
+                wake(waiter)
+
+    def register(self, waiter: "asyncio.Future[None]") -> None:
+        """
+        Resolve `waiter` on the next tick.
+
+        :param waiter: The future a subscriber is awaiting.
+        """
+        self._waiters.add(waiter)
+
+    def discard(self, waiter: "asyncio.Future[None]") -> None:
+        """Forget a waiter that was woken by something else."""
+        self._waiters.discard(waiter)
+
+    async def stop(self) -> None:
+        """Stop ticking and release the waiting subscribers."""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        waiters, self._waiters = self._waiters, set()
+        for waiter in waiters:
+            wake(waiter)
+
+
+_heartbeats: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Heartbeat]" = (
+    weakref.WeakKeyDictionary()
+)
+
+
+def get_heartbeat() -> Heartbeat:
+    """
+    Return the running event loop's heartbeat, started on first use.
+
+    Like pooled HTTP clients, timers cannot be shared across event loops,
+    so each loop gets its own.
+    """
+    loop = asyncio.get_running_loop()
+    heartbeat = _heartbeats.get(loop)
+    if heartbeat is None:
+        heartbeat = Heartbeat(settings.sse_heartbeat_interval)
+        _heartbeats[loop] = heartbeat
+        logger.debug("started sse heartbeat", interval=heartbeat.interval)
+    heartbeat.start()
+    return heartbeat
+
+
+async def close_heartbeat() -> None:
+    """Stop and forget the heartbeat of the running event loop."""
+    heartbeat = _heartbeats.pop(asyncio.get_running_loop(), None)
+    if heartbeat is not None:
+        await heartbeat.stop()
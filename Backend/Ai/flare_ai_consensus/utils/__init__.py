@@ -1,10 +1,22 @@
+from .async_utils import BackgroundEventLoop, background_loop
 from .file_utils import load_json, load_txt, save_json
-from .parser_utils import extract_author, parse_chat_response
+from .parser_utils import (
+    extract_author,
+    extract_price,
+    parse_chat_response,
+    parse_price_and_explanation,
+    parse_stream_delta,
+)
 
 __all__ = [
+    "BackgroundEventLoop",
+    "background_loop",
     "extract_author",
+    "extract_price",
     "load_json",
     "load_txt",
     "parse_chat_response",
+    "parse_price_and_explanation",
+    "parse_stream_delta",
     "save_json",
 ]
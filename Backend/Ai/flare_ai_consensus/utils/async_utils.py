@@ -0,0 +1,79 @@
+import asyncio
+import threading
+from collections.abc import Coroutine
+from concurrent.futures import Future
+from typing import Any, TypeVar
+
+import structlog
+
+from flare_ai_consensus.router.client_pool import close_client_pool
+
+logger = structlog.get_logger(__name__)
+
+T = TypeVar("T")
+
+
+class BackgroundEventLoop:
+    """
+    A single long-lived event loop running in a daemon thread.
+
+    Synchronous (e.g. Flask) request handlers submit coroutines to this loop
+    instead of calling `asyncio.run` per request, so the pooled HTTP clients
+    bound to the loop survive across requests.
+    """
+
+    def __init__(self) -> None:
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._thread: threading.Thread | None = None
+        self._lock = threading.Lock()
+
+    @property
+    def loop(self) -> asyncio.AbstractEventLoop:
+        """The background loop, started on first access."""
+        with self._lock:
+            if self._loop is None or self._loop.is_closed():
+                self._loop = asyncio.new_event_loop()
+                self._thread = threading.Thread(
+                    target=self._loop.run_forever,
+                    name="background-event-loop",
+                    daemon=True,
+                )
+                self._thread.start()
+                logger.debug("started background event loop")
+            return self._loop
+
+    def submit(self, coro: Coroutine[Any, Any, T]) -> "Future[T]":
+        """
+        Schedule a coroutine on the background loop without waiting for it.
+
+        :param coro: The coroutine to run.
+        :return: A thread-safe future resolving to the coroutine's result.
+        """
+        return asyncio.run_coroutine_threadsafe(coro, self.loop)
+
+    def run(self, coro: Coroutine[Any, Any, T], timeout: float | None = None) -> T:
+        """
+        Run a coroutine on the background loop and block until it finishes.
+
+        :param coro: The coroutine to run.
+        :param timeout: Optional number of seconds to wait for the result.
+        :return: The coroutine's result.
+        """
+        return self.submit(coro).result(timeout)
+
+    def stop(self) -> None:
+        """Close the loop's pooled HTTP clients and stop the loop."""
+        with self._lock:
+            loop, thread = self._loop, self._thread
+            self._loop = self._thread = None
+        if loop is None:
+            return
+        asyncio.run_coroutine_threadsafe(close_client_pool(), loop).result()
+        loop.call_soon_threadsafe(loop.stop)
+        if thread is not None:
+            thread.join()
+        loop.close()
+
+
+# Shared instance for the serving scripts
+background_loop = BackgroundEventLoop()
@@ -1,15 +1,99 @@
+import json
+import re
+
+PRICE_KEYS = ("price", "predicted_price", "predicted_price_USD")
+# A USD amount such as 1,200 or 0.85
+_AMOUNT = r"([0-9,]+\.?[0-9]*)"
+# An amount opening the response, e.g. "$1,200. The collection ..."
+_LEADING_PRICE = re.compile(r"\$?" + _AMOUNT)
+# Where a price is looked for in a response that is not JSON, in order
+_PRICE_PATTERNS = (
+    re.compile(r'"(?:' + "|".join(PRICE_KEYS) + r')"\s*:\s*"?\$?' + _AMOUNT),
+    re.compile(r"\$" + _AMOUNT),
+    re.compile(_AMOUNT + r"\s*(?:USD|dollars)\b", re.IGNORECASE),
+    re.compile(r"^" + _LEADING_PRICE.pattern),
+)
+_EMBEDDED_OBJECT = re.compile(r'{[^{}]*"price"[^{}]*}')
+
+
 def parse_chat_response(response: dict) -> str:
     """Parse response from chat completion endpoint"""
     choices = response.get("choices", [])
     if not choices:
         # Log the full response to help with debugging
-        import json
         print(f"Warning: Received empty choices list. Full response: {json.dumps(response, indent=2)}")
         return ""  # Return empty string instead of raising an exception
         
     return choices[0].get("message", {}).get("content", "")
 
 
+def parse_stream_delta(chunk: dict) -> str:
+    """Parse the text delta from a streamed chat completion chunk"""
+    choices = chunk.get("choices", [])
+    if not choices:
+        return ""
+    return choices[0].get("delta", {}).get("content") or ""
+
+
+def extract_price(text: str) -> float | None:
+    """
+    Extract the USD price estimate from a model response.
+
+    JSON responses (optionally wrapped in ```json fences) are read from their
+    price field; otherwise the first price field, dollar amount or amount in
+    USD in the text is used, or else an amount the response opens with.
+
+    :param text: The model response.
+    :return: The price, or None if the response contains none.
+    """
+    return parse_price_and_explanation(text)[0]
+
+
+def parse_price_and_explanation(text: str) -> tuple[float | None, str]:
+    """
+    Extract the USD price estimate and its explanation from a model response.
+
+    The price is found as in `extract_price`. The explanation is the
+    `explanation` field of a JSON response (or of a JSON object embedded in
+    prose), or else the text without a leading price.
+
+    :param text: The model response.
+    :return: The price (None if the response contains none) and explanation.
+    """
+    cleaned = re.sub(r"```(?:json)?\s*|\s*```", "", text).strip()
+    explanation = cleaned
+    try:
+        data = json.loads(cleaned)
+    except ValueError:
+        embedded = _EMBEDDED_OBJECT.search(cleaned)
+        try:
+            data = json.loads(embedded.group()) if embedded else None
+        except ValueError:
+            data = None
+    if isinstance(data, dict):
+        explanation = str(data.get("explanation", ""))
+        for key in PRICE_KEYS:
+            try:
+                return float(str(data[key]).replace(",", "").lstrip("$")), explanation
+            except (KeyError, ValueError):
+                continue
+
+    for pattern in _PRICE_PATTERNS:
+        match = pattern.search(cleaned)
+        if match is None:
+            continue
+        try:
+            price = float(match.group(1).replace(",", ""))
+        except ValueError:
+            continue
+        # Drop the price if the response opens with it, e.g. "$1,200. The ..."
+        leading = _LEADING_PRICE.match(explanation)
+        if leading and leading.group(1) == match.group(1):
+            return price, explanation[leading.end() :].strip()
+        return price, explanation
+    return None, explanation
+
+
 def extract_author(model_id: str) -> tuple[str, str]:
     """
     Extract the author and slug from a model_id.
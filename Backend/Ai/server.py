@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+"""
+Single ASGI server for all appraisal strategies.
+
+Replaces running cloud_index.py, cloud_confidence_index.py,
+cloud_single.py, stream-index.py and stream-confidence.py as separate Flask
+apps: the same routes are served by one uvicorn process whose event loop
+lives as long as the server, so appraisals share pooled connections and
+caches, and streams await their events instead of holding a thread each.
+
+Appraisals can also be submitted with POST /appraisals and polled at
+GET /appraisals/{job_id}; at most JOB_CONCURRENCY of them run at once, and
+submissions beyond a queue of JOB_QUEUE_SIZE get 503 with Retry-After.
+
+Usage:
+    python server.py [port]
+"""
+import importlib
+import os
+import sys
+from pathlib import Path
+
+import uvicorn
+from dotenv import load_dotenv
+
+# The strategy scripts live next to this file and import flare_ai_consensus,
+# each other and sample.py as top-level modules, whatever the working directory
+SCRIPT_DIR = Path(__file__).resolve().parent
+if str(SCRIPT_DIR) not in sys.path:
+    sys.path.insert(0, str(SCRIPT_DIR))
+
+from flare_ai_consensus.main import create_app  # noqa: E402
+from flare_ai_consensus.settings import ConsensusConfig  # noqa: E402
+from flare_ai_consensus.streaming import publish_event  # noqa: E402
+from flare_ai_consensus.utils import load_json  # noqa: E402
+
+from cloud_index import process_nft_appraisal as centralized_appraisal  # noqa: E402
+from cloud_single import process_nft_appraisal as single_llm_appraisal  # noqa: E402
+from cloud_confidence_index import run_confidence_consensus  # noqa: E402
+
+stream_index = importlib.import_module("stream-index")
+
+load_dotenv()
+
+
+async def confidence_appraisal(contract_address, token_id):
+    return await run_confidence_consensus(contract_address=contract_address, token_id=token_id)
+
+
+async def confidence_appraisal_stream(contract_address, token_id):
+    return await run_confidence_consensus(
+        contract_address=contract_address, token_id=token_id, on_event=publish_event
+    )
+
+
+STRATEGIES = {
+    "/centralized_appraise": centralized_appraisal,
+    "/appraise": centralized_appraisal,
+    "/confidence_appraise": confidence_appraisal,
+    "/single_llm_appraisal": single_llm_appraisal,
+}
+
+STREAMS = {
+    "/appraise/stream": stream_index.process_nft_appraisal,
+    "/confidence_appraise/stream": confidence_appraisal_stream,
+}
+
+app = create_app(
+    strategies=STRATEGIES,
+    streams=STREAMS,
+    consensus_config=ConsensusConfig.from_json(
+        load_json(SCRIPT_DIR / "config" / "consensus_config.json")
+    ),
+)
+
+
+if __name__ == "__main__":
+    port = int(sys.argv[1]) if len(sys.argv) > 1 else int(os.environ.get("PORT", 8080))
+    # A single worker keeps every appraisal on one long-lived event loop
+    uvicorn.run(app, host="0.0.0.0", port=port)
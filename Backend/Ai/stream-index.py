@@ -8,17 +8,33 @@ import statistics
 import time
 from pathlib import Path
 import textwrap
-import aiohttp
 from flask import Flask, request, jsonify, Response, stream_with_context
 from flask_cors import CORS
-import queue
-import threading
 
-from flare_ai_consensus.router import AsyncOpenRouterProvider
+from flare_ai_consensus.router import (
+    AsyncOpenRouterProvider,
+    get_aiohttp_session,
+    prewarm_connections,
+    render_metrics,
+)
 from flare_ai_consensus.consensus import send_round
+from flare_ai_consensus.consensus.convergence import has_converged
 from flare_ai_consensus.consensus.aggregator import async_centralized_llm_aggregator
 from flare_ai_consensus.settings import Settings, Message
-from flare_ai_consensus.utils import load_json, parse_chat_response
+from flare_ai_consensus.streaming import (
+    cancel_when_abandoned,
+    format_sse,
+    get_channel_registry,
+    parse_event_id,
+    publish_event,
+    run_job,
+)
+from flare_ai_consensus.utils import (
+    background_loop,
+    extract_price,
+    load_json,
+    parse_chat_response,
+)
 from datetime import datetime
 
 from dotenv import load_dotenv
@@ -29,18 +45,14 @@ CORS(app)  # Enable CORS for all routes
 
 load_dotenv()
 
-# Global event queue for streaming updates
-event_queue = queue.Queue()
-
 def send_event(event_type, data):
-    """Add an event to the queue for streaming"""
-    event_data = {
-        "type": event_type,
-        "data": data,
-        "timestamp": datetime.now().isoformat()
-    }
-    event_queue.put(event_data)
-    return event_data
+    """Publish an event to the stream of the appraisal running in this task"""
+    event = publish_event(event_type, data)
+    return event.payload() if event is not None else None
+
+def send_model_delta(model_id, delta):
+    """Forward a partial model response to the stream as it is generated"""
+    send_event("model_delta", {"model": model_id, "delta": delta})
 
 # Parse data to compare accuracy
 def accuracy_preparation(json_data):
@@ -82,6 +94,7 @@ def format_and_print_responses(responses, title="Model Responses"):
     print_colored(f"{separator}\n", "cyan")
     
     formatted_responses = {}
+    parsed_responses = {}
     
     for model_id, response in responses.items():
         print_colored(f"Model: {model_id}", "yellow")
@@ -94,59 +107,16 @@ def format_and_print_responses(responses, title="Model Responses"):
         
         # Store formatted response for streaming
         formatted_responses[model_id] = str(response)
+        parsed_responses[model_id] = response.to_dict()
     
     # Send detailed model responses as a stream event
     send_event("model_responses", {
         "title": title,
-        "responses": formatted_responses
+        "responses": formatted_responses,
+        "parsed": parsed_responses
     })
 
 
-def extract_price_from_text(text):
-    """Extract the price from a response text or JSON string"""
-    if not isinstance(text, str):
-        if isinstance(text, dict) and "price" in text:
-            return float(text["price"])
-        elif isinstance(text, dict) and "predicted_price" in text:
-            return float(text["predicted_price"])
-        text = str(text)
-        
-    # First try to parse as JSON
-    try:
-        # Remove JSON code block markers if present
-        if text.strip().startswith("```json"):
-            text = re.sub(r'```json\s*|\s*```', '', text)
-        
-        # Try parsing the text as JSON
-        data = json.loads(text)
-        if isinstance(data, dict):
-            if "price" in data:
-                return float(data["price"])
-            elif "predicted_price" in data:
-                return float(data["predicted_price"])
-            elif "predicted_price_USD" in data:
-                return float(data["predicted_price_USD"])
-    except (json.JSONDecodeError, ValueError, TypeError):
-        pass
-    
-    # If JSON parsing fails, try regular expression pattern matching
-    try:
-        # Look for "price": 1234.56 or "predicted_price": 1234.56
-        price_match = re.search(r'"(?:price|predicted_price|predicted_price_USD)"\s*:\s*([0-9,]+\.?[0-9]*)', text)
-        if price_match:
-            return float(price_match.group(1).replace(',', ''))
-        
-        # Also try looking for dollar amounts
-        dollar_match = re.search(r'\$([0-9,]+\.?[0-9]*)', text)
-        if dollar_match:
-            return float(dollar_match.group(1).replace(',', ''))
-    except (ValueError, AttributeError):
-        pass
-    
-    # Return None if no price was found
-    return None
-
-
 def calculate_confidence(std_dev, prices):
     """Calculate a confidence score based on standard deviation relative to mean"""
     if not prices or len(prices) < 2:
@@ -165,39 +135,11 @@ def calculate_confidence(std_dev, prices):
     return max(0.1, min(0.9, confidence))
 
 
-async def patch_provider_for_logging(provider):
-    """Patch the provider's _post method to log request/response details"""
-    original_post = provider._post
-    
-    async def logged_post(endpoint, json_payload):
-        message = f"Request to {endpoint}: max_tokens={json_payload.get('max_tokens')}"
-        print_colored(message, "blue")
-        
-        # Send model request event
-        send_event("model_request", {
-            "endpoint": endpoint,
-            "max_tokens": json_payload.get('max_tokens'),
-            "model": json_payload.get('model', 'unknown')
-        })
-        
-        # Track start time for latency reporting
-        start_time = time.time()
-        response = await original_post(endpoint, json_payload)
-        end_time = time.time()
-        
-        # Calculate latency in seconds
-        latency = end_time - start_time
-        
-        # Send model response received event with latency
-        send_event("model_response_received", {
-            "model": json_payload.get('model', 'unknown'),
-            "latency_seconds": latency
-        })
-        
-        return response
-    
-    provider._post = logged_post
-    return provider
+def log_router_event(event_type, data):
+    """Print model requests and forward router events to the stream"""
+    if event_type == "model_request":
+        print_colored(f"Request to {data['endpoint']}: max_tokens={data['max_tokens']}", "blue")
+    send_event(event_type, data)
 
 
 async def run_consensus_with_data(
@@ -220,22 +162,29 @@ async def run_consensus_with_data(
     # Dictionary to store all responses and aggregations
     response_data = {}
     response_data["initial_conversation"] = initial_conversation
+    aggregation = None
 
     # Step 1: Initial round
     print_colored("Running initial round of consensus...", "blue")
     send_event("stage", {"name": "initial_round", "description": "Querying models for initial predictions"})
     
     responses = await send_round(
-        provider, consensus_config, response_data["initial_conversation"]
+        provider,
+        consensus_config,
+        response_data["initial_conversation"],
+        on_delta=send_model_delta,
     )
+    if responses.dropped:
+        send_event("models_dropped", {"round": 0, "models": responses.dropped})
     
     try:
         # Report to the stream that we're aggregating results
         send_event("stage", {"name": "aggregation", "description": "Aggregating initial model responses", "round": 0})
         
-        aggregated_response = await async_centralized_llm_aggregator(
+        aggregation = await async_centralized_llm_aggregator(
             provider, consensus_config.aggregator_config, responses
         )
+        aggregated_response = aggregation.text
         print_colored("Initial aggregation complete", "blue")
         
         # Send the aggregation result
@@ -257,19 +206,11 @@ async def run_consensus_with_data(
         prices = []
         explanations = []
         for model_id, response in responses.items():
-            price = extract_price_from_text(response)
-            if price is not None:
-                prices.append(price)
-            
-            # Try to extract explanation
-            try:
-                if isinstance(response, str) and response.strip().startswith("```json"):
-                    cleaned = re.sub(r'```json\s*|\s*```', '', response)
-                    data = json.loads(cleaned)
-                    if "explanation" in data:
-                        explanations.append(data["explanation"])
-            except:
-                pass
+            # Prices and explanations were parsed when the responses arrived
+            if response.price is not None:
+                prices.append(response.price)
+            if response.explanation:
+                explanations.append(response.explanation)
         
         # Calculate average price if any prices were found
         avg_price = statistics.mean(prices) if prices else 0
@@ -294,8 +235,17 @@ async def run_consensus_with_data(
     response_data["iteration_0"] = responses
     response_data["aggregate_0"] = aggregated_response
 
-    # Step 2: Improvement rounds
+    # Step 2: Improvement rounds, until the model prices converge
+    rounds_run = 0
     for i in range(consensus_config.iterations):
+        if has_converged(responses, consensus_config):
+            print_colored(f"Model prices converged, skipping remaining {consensus_config.iterations - i} round(s)", "green")
+            send_event("converged", {
+                "after_round": i,
+                "rounds_saved": consensus_config.iterations - i
+            })
+            break
+        rounds_run += 1
         print_colored(f"Running improvement round {i+1}...", "blue")
         
         # Send improvement round start event
@@ -306,8 +256,14 @@ async def run_consensus_with_data(
         })
         
         responses = await send_round(
-            provider, consensus_config, initial_conversation, aggregated_response
+            provider,
+            consensus_config,
+            initial_conversation,
+            aggregated_response,
+            on_delta=send_model_delta,
         )
+        if responses.dropped:
+            send_event("models_dropped", {"round": i+1, "models": responses.dropped})
         
         try:
             # Report aggregation stage
@@ -317,9 +273,10 @@ async def run_consensus_with_data(
                 "description": f"Aggregating responses from improvement round {i+1}"
             })
             
-            aggregated_response = await async_centralized_llm_aggregator(
+            aggregation = await async_centralized_llm_aggregator(
                 provider, consensus_config.aggregator_config, responses
             )
+            aggregated_response = aggregation.text
             print_colored(f"Improvement round {i+1} complete", "blue")
             
             # Send aggregation result
@@ -347,6 +304,10 @@ async def run_consensus_with_data(
         response_data[f"iteration_{i + 1}"] = responses
         response_data[f"aggregate_{i + 1}"] = aggregated_response
 
+    response_data["rounds_run"] = rounds_run
+    response_data["rounds_saved"] = consensus_config.iterations - rounds_run
+    response_data["aggregation"] = aggregation.report() if aggregation else None
+
     # Return both the final consensus and all response data
     return aggregated_response, response_data
 
@@ -362,17 +323,17 @@ async def fetch_nft_data(contract_address: str, token_id: str):
     print_colored(f"Fetching NFT data from API: {url}", "blue")
     send_event("stage", {"name": "fetch_metadata", "description": "Fetching NFT metadata from API"})
     
-    async with aiohttp.ClientSession() as session:
-        async with session.get(url, params=params) as response:
-            if response.status != 200:
-                error_msg = f"API request failed with status {response.status}"
-                print_colored(error_msg, "red")
-                send_event("error", {"stage": "fetch_metadata", "message": error_msg})
-                raise Exception(error_msg)
-            
-            data = await response.json()
-            send_event("metadata_received", {"metadata": data})
-            return data
+    session = get_aiohttp_session()
+    async with session.get(url, params=params) as response:
+        if response.status != 200:
+            error_msg = f"API request failed with status {response.status}"
+            print_colored(error_msg, "red")
+            send_event("error", {"stage": "fetch_metadata", "message": error_msg})
+            raise Exception(error_msg)
+        
+        data = await response.json()
+        send_event("metadata_received", {"metadata": data})
+        return data
 
 
 async def fetch_ethereum_price():
@@ -386,18 +347,18 @@ async def fetch_ethereum_price():
     print_colored("Fetching Ethereum price from CoinGecko", "blue")
     send_event("stage", {"name": "fetch_eth_price", "description": "Fetching current Ethereum price in USD"})
     
-    async with aiohttp.ClientSession() as session:
-        async with session.get(url, params=params) as response:
-            if response.status != 200:
-                error_msg = f"CoinGecko API request failed with status {response.status}"
-                print_colored(error_msg, "red")
-                send_event("error", {"stage": "fetch_eth_price", "message": error_msg})
-                raise Exception(error_msg)
-            
-            data = await response.json()
-            eth_price = data["ethereum"]["usd"]
-            send_event("eth_price", {"price_usd": eth_price})
-            return eth_price
+    session = get_aiohttp_session()
+    async with session.get(url, params=params) as response:
+        if response.status != 200:
+            error_msg = f"CoinGecko API request failed with status {response.status}"
+            print_colored(error_msg, "red")
+            send_event("error", {"stage": "fetch_eth_price", "message": error_msg})
+            raise Exception(error_msg)
+        
+        data = await response.json()
+        eth_price = data["ethereum"]["usd"]
+        send_event("eth_price", {"price_usd": eth_price})
+        return eth_price
 
 
 async def process_nft_appraisal(contract_address: str, token_id: str):
@@ -434,7 +395,7 @@ async def process_nft_appraisal(contract_address: str, token_id: str):
         settings = Settings()
         
         # Create paths for configuration and data
-        config_path = Path("config")
+        config_path = Path(__file__).parent / "config"
         config_path.mkdir(exist_ok=True)
         
         # Load or create the consensus configuration
@@ -457,8 +418,14 @@ async def process_nft_appraisal(contract_address: str, token_id: str):
             base_url=settings.open_router_base_url
         )
         
-        # Patch the provider for better logging
-        provider = await patch_provider_for_logging(provider)
+        # Register per-model timeout, retry and hedging policies
+        provider.configure_models([
+            *settings.consensus_config.models,
+            settings.consensus_config.aggregator_config.model,
+        ])
+        
+        # Log every model request and response made by the router
+        provider.add_observer(log_router_event)
         
         content_prompt = """You are an expert at conducting NFT appraisals, and your goal is to output the price in USD value of the NFT at this specific date, which is $$$$$$. You will be given pricing history and other metadata about the NFT and will have to extrapolate and analyze the trends from the data. Your response MUST be in JSON format starting with a single value of price in USD, followed by a detailed explanation of your reasoning.
 
@@ -552,7 +519,7 @@ async def process_nft_appraisal(contract_address: str, token_id: str):
             # Extract price estimates from individual responses
             initial_prices = {}
             for model_id, response in individual_responses.items():
-                price = extract_price_from_text(response)
+                price = response.price
                 if price is not None:
                     initial_prices[model_id] = price
                     print_colored(f"Extracted price from {model_id}: ${price:.2f}", "green")
@@ -602,10 +569,10 @@ async def process_nft_appraisal(contract_address: str, token_id: str):
             send_event("consensus_result", {"result": consensus_result})
             
             # Extract final price from consensus result
-            final_consensus_price = extract_price_from_text(consensus_result)
+            final_consensus_price = extract_price(consensus_result)
             
             # Get final model responses from the last iteration of consensus
-            final_iteration = settings.consensus_config.iterations
+            final_iteration = all_responses_data.get("rounds_run", settings.consensus_config.iterations)
             if final_iteration > 0 and f"iteration_{final_iteration}" in all_responses_data:
                 final_responses = all_responses_data[f"iteration_{final_iteration}"]
                 print_colored(f"\nUsing responses from iteration {final_iteration} for statistics", "magenta")
@@ -623,7 +590,7 @@ async def process_nft_appraisal(contract_address: str, token_id: str):
             final_prices = {}
             for model_id, response in final_responses.items():
                 if response:  # Only process non-empty responses
-                    price = extract_price_from_text(response)
+                    price = response.price
                     if price is not None:
                         final_prices[model_id] = price
                         print_colored(f"Extracted final price from {model_id}: ${price:.2f}", "green")
@@ -700,6 +667,9 @@ async def process_nft_appraisal(contract_address: str, token_id: str):
                 "standard_deviation": final_std_dev,
                 "total_confidence": final_confidence_score,
                 "ethereum_price_usd":  final_consensus_price / eth_price if eth_price > 0 else 0,
+                "rounds_saved": all_responses_data.get("rounds_saved", 0),
+                "prompt_cache": provider.prompt_cache_stats(),
+                "aggregation": all_responses_data.get("aggregation"),
             }
             
             error_accuracy = abs(final_output["price"] - ACTUAL_VALUE) / ACTUAL_VALUE 
@@ -774,58 +744,59 @@ async def process_nft_appraisal(contract_address: str, token_id: str):
 
 
 
-# Generator function for SSE streaming
-def generate_sse_events():
-    """Generate Server-Sent Events for streaming"""
-    # Send initial connection event
-    yield f"event: connect\ndata: {json.dumps({'connected': True, 'timestamp': datetime.now().isoformat()})}\n\n"
-    
-    # Continue sending events from the queue
-    while True:
-        try:
-            # Try to get an event from the queue with a timeout
-            event = event_queue.get(timeout=1)
-            event_type = event["type"]
-            event_data = json.dumps(event)
-            
-            # Format as SSE
-            yield f"event: {event_type}\ndata: {event_data}\n\n"
-            
-            # If this is the final stage event with "complete" status, close the connection
-            if event_type == "stage" and event.get("data", {}).get("name") == "complete":
-                # Send a final closing event
-                final_event = {
-                    "type": "close",
-                    "data": {"message": "Stream complete", "timestamp": datetime.now().isoformat()}
-                }
-                yield f"event: close\ndata: {json.dumps(final_event)}\n\n"
-                break
-                
-        except queue.Empty:
-            # Send a keepalive comment every second if queue is empty
-            yield ": keepalive\n\n"
-        except Exception as e:
-            # If any error occurs, send it as an event and continue
-            error_data = json.dumps({"type": "error", "message": str(e)})
-            yield f"event: error\ndata: {error_data}\n\n"
+def stream_job(channel, after=0):
+    """Stream a job's events as Server-Sent Events, replaying those after `after`"""
+    def generate():
+        yield format_sse("connect", {
+            "connected": True,
+            "job_id": channel.job_id,
+            "timestamp": datetime.now().isoformat()
+        })
+        yield from channel.stream(after)
+
+    return Response(
+        stream_with_context(generate()),
+        mimetype='text/event-stream',
+        headers={
+            'Cache-Control': 'no-cache',
+            'X-Accel-Buffering': 'no',  # Disable nginx buffering
+            'Connection': 'keep-alive',
+            'X-Job-Id': channel.job_id
+        }
+    )
+
+
+
+# Router latency, token and cost metrics in the Prometheus text format
+@app.route('/metrics', methods=['GET'])
+def metrics():
+    return Response(render_metrics(), mimetype="text/plain; version=0.0.4")
 
 
 # Flask route for streaming API
 @app.route('/appraise/stream', methods=['GET'])
 def appraise_nft_stream_api():
     """Streaming API endpoint to appraise an NFT with real-time updates"""
-    # Clear the event queue for a fresh start
-    while not event_queue.empty():
-        event_queue.get()
+    # Attach to a running job: by `job_id`, or by the Last-Event-ID a
+    # reconnecting EventSource sends, in which case replay what it missed
+    job_id = request.args.get('job_id')
+    resume = parse_event_id(request.headers.get('Last-Event-ID') or request.args.get('last_event_id'))
+    if resume and job_id in (None, resume[0]):
+        channel = get_channel_registry().get(resume[0])
+        if channel is not None:
+            return stream_job(channel, after=resume[1])
+    if job_id:
+        channel = get_channel_registry().get(job_id)
+        if channel is None:
+            return jsonify({"error": f"Unknown or expired job: {job_id}"}), 404
+        return stream_job(channel)
     
     # Get parameters from the request
     contract_address = request.args.get('contract_address')
     token_id = request.args.get('token_id')
     
     if not contract_address or not token_id:
-        # Send error event and return error response
         error_msg = "Missing contract_address or token_id parameter"
-        send_event("error", {"message": error_msg})
         return jsonify({
             "error": error_msg,
             "price": 0,
@@ -834,24 +805,14 @@ def appraise_nft_stream_api():
             "total_confidence": 0
         }), 400
     
-    # Start the processing in a background thread
-    def run_processing():
-        asyncio.run(process_nft_appraisal(contract_address, token_id))
+    # Start the processing on the shared background event loop, publishing
+    # into a channel of its own
+    channel = get_channel_registry().create()
+    job = background_loop.submit(run_job(channel, process_nft_appraisal(contract_address, token_id)))
+    # Stop the appraisal if every client disconnects
+    cancel_when_abandoned(channel, job, background_loop.loop)
     
-    processing_thread = threading.Thread(target=run_processing)
-    processing_thread.daemon = True
-    processing_thread.start()
-    
-    # Return streaming response
-    return Response(
-        stream_with_context(generate_sse_events()),
-        mimetype='text/event-stream',
-        headers={
-            'Cache-Control': 'no-cache',
-            'X-Accel-Buffering': 'no',  # Disable nginx buffering
-            'Connection': 'keep-alive'
-        }
-    )
+    return stream_job(channel)
 
 
 # Flask route for the standard API (non-streaming)
@@ -872,8 +833,8 @@ def appraise_nft_api():
                 "total_confidence": 0
             }), 400
         
-        # Run the async processing in a new event loop
-        result_json = asyncio.run(process_nft_appraisal(contract_address, token_id))
+        # Run the async processing on the shared background event loop
+        result_json = background_loop.run(process_nft_appraisal(contract_address, token_id))
         
         # Parse the result back to a dictionary
         result = json.loads(result_json)
@@ -901,12 +862,16 @@ if __name__ == "__main__":
         # Run as API server
         port = int(sys.argv[2]) if len(sys.argv) > 2 else 8080
         print_colored(f"Starting API server on port {port}...", "green")
+        background_loop.run(prewarm_connections())
         app.run(host='0.0.0.0', port=port, threaded=True)
     elif len(sys.argv) == 3:
         # Run as CLI
         contract_address = sys.argv[1]
         token_id = sys.argv[2]
-        result = asyncio.run(process_nft_appraisal(contract_address, token_id))
+        try:
+            result = background_loop.run(process_nft_appraisal(contract_address, token_id))
+        finally:
+            background_loop.stop()
         print_colored("\nProgram completed.", "green")
     else:
         print("Usage:")
@@ -0,0 +1,69 @@
+import asyncio
+import json
+
+from flare_ai_consensus.consensus import async_centralized_llm_aggregator
+from flare_ai_consensus.consensus.adaptive import local_aggregate, select_tier
+from flare_ai_consensus.router import ModelResponse
+from flare_ai_consensus.settings import AggregatorConfig, ModelConfig
+
+
+def make_config(
+    local: float | None = 0.02, fast: float | None = 0.1, with_fast: bool = True
+) -> AggregatorConfig:
+    return AggregatorConfig(
+        model=ModelConfig(model_id="main/model"),
+        approach="",
+        context=[],
+        prompt=[],
+        fast_model=ModelConfig(model_id="fast/model") if with_fast else None,
+        local_threshold=local,
+        fast_threshold=fast,
+    )
+
+
+def responses(**texts: str) -> dict[str, ModelResponse]:
+    return {model_id: ModelResponse(model_id, text) for model_id, text in texts.items()}
+
+
+def test_select_tier_by_dispersion() -> None:
+    config = make_config()
+    assert select_tier(None, config) == "main"
+    assert select_tier(0.01, config) == "local"
+    assert select_tier(0.05, config) == "fast"
+    assert select_tier(0.5, config) == "main"
+
+
+def test_select_tier_without_thresholds_or_fast_model() -> None:
+    assert select_tier(0.0, make_config(local=None)) == "fast"
+    assert select_tier(0.05, make_config(with_fast=False)) == "main"
+    assert select_tier(0.0, make_config(local=None, fast=None)) == "main"
+
+
+def test_local_aggregate_trims_outliers_without_weights() -> None:
+    parsed = responses(a="$100", b="$101", c="$102", d="$103", e="$1000")
+    prices = {model_id: response.price for model_id, response in parsed.items()}
+    result = json.loads(local_aggregate(parsed, prices))
+    assert result["price"] == 102.0
+
+
+def test_local_aggregate_uses_weighted_median_and_closest_explanation() -> None:
+    parsed = {
+        "a": ModelResponse("a", '{"price": 100, "explanation": "Floor is 100."}'),
+        "b": ModelResponse("b", '{"price": 110, "explanation": "Rare traits."}'),
+        "c": ModelResponse("c", '{"price": 120, "explanation": "Hype."}'),
+    }
+    prices = {"a": 100.0, "b": 110.0, "c": 120.0}
+    weights = {"a": 0.1, "b": 0.2, "c": 0.7}
+    result = json.loads(local_aggregate(parsed, prices, weights))
+    assert result["price"] == 120.0
+    assert result["explanation"].endswith("Hype.")
+
+
+def test_aggregator_returns_text_with_its_tier() -> None:
+    parsed = responses(a="$100", b="$100.5")
+    # A local aggregate never reaches the provider
+    coro = async_centralized_llm_aggregator(None, make_config(), parsed)  # type: ignore
+    result = asyncio.run(coro)
+    assert result.tier == "local"
+    assert json.loads(result.text)["price"] == 100.25
+    assert result.report()["dispersion"] == result.dispersion
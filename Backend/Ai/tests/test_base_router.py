@@ -0,0 +1,163 @@
+import asyncio
+from collections.abc import AsyncIterator, Awaitable, Callable
+from contextlib import asynccontextmanager
+
+import httpx
+import pytest
+
+from flare_ai_consensus.router import LatencyTracker, RouterHTTPError, RouterMetrics
+from flare_ai_consensus.router.base_router import AsyncBaseRouter
+from flare_ai_consensus.settings import ModelConfig
+
+MODEL = "test/model"
+PAYLOAD = {"model": MODEL, "messages": [], "max_tokens": 10, "temperature": 0.0}
+
+Handler = Callable[[httpx.Request], Awaitable[httpx.Response]]
+
+
+def completion(text: str) -> dict:
+    return {"choices": [{"message": {"content": text}}]}
+
+
+def make_router(
+    handler: Handler,
+    latency: LatencyTracker | None = None,
+    router_class: type[AsyncBaseRouter] = AsyncBaseRouter,
+    **policy: object,
+) -> AsyncBaseRouter:
+    """A router answering from `handler`, with its own metrics and latencies."""
+    router = router_class(
+        "https://api.test",
+        shared_client=False,
+        metrics=RouterMetrics(),
+        latency=latency or LatencyTracker(min_samples=1),
+    )
+    router._client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    router.configure_models([ModelConfig(model_id=MODEL, **policy)])
+    return router
+
+
+async def answer(request: httpx.Request) -> httpx.Response:
+    return httpx.Response(200, json=completion("$1"))
+
+
+@pytest.fixture
+def no_backoff(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(AsyncBaseRouter, "_backoff", staticmethod(lambda *_: 0.0))
+
+
+@pytest.mark.usefixtures("no_backoff")
+def test_retries_retryable_statuses() -> None:
+    statuses = iter([503, 429, 200])
+
+    async def handler(request: httpx.Request) -> httpx.Response:
+        status = next(statuses)
+        return httpx.Response(status, json=completion("$1") if status == 200 else {})
+
+    router = make_router(handler, max_retries=2)
+    assert asyncio.run(router._post("/chat", PAYLOAD)) == completion("$1")
+    assert router.retries[MODEL] == 2
+
+
+@pytest.mark.usefixtures("no_backoff")
+def test_does_not_retry_client_errors() -> None:
+    calls = []
+
+    async def handler(request: httpx.Request) -> httpx.Response:
+        calls.append(request)
+        return httpx.Response(400, text="bad request")
+
+    router = make_router(handler, max_retries=2)
+    with pytest.raises(RouterHTTPError) as error:
+        asyncio.run(router._post("/chat", PAYLOAD))
+    assert error.value.status_code == 400
+    assert len(calls) == 1
+
+
+@pytest.mark.usefixtures("no_backoff")
+def test_gives_up_after_max_retries() -> None:
+    calls = []
+
+    async def handler(request: httpx.Request) -> httpx.Response:
+        calls.append(request)
+        raise httpx.ConnectError("refused", request=request)
+
+    router = make_router(handler, max_retries=2)
+    with pytest.raises(httpx.ConnectError):
+        asyncio.run(router._post("/chat", PAYLOAD))
+    assert len(calls) == 3
+
+
+def test_backoff_honours_retry_after() -> None:
+    assert AsyncBaseRouter._backoff(0, retry_after=4.0) >= 4.0
+    assert AsyncBaseRouter._backoff(10) <= 30.0
+
+
+def test_adaptive_timeout_follows_p95() -> None:
+    latency = LatencyTracker(min_samples=3)
+    router = make_router(answer, latency)
+    adaptive = ModelConfig(model_id=MODEL, timeout=30.0, adaptive_timeout=True)
+    fixed = ModelConfig(model_id=MODEL, timeout=30.0)
+
+    # Too few samples to trust the p95 yet
+    assert router._timeout_for(adaptive) == 30.0
+    for seconds in (2.0, 2.0, 3.0):
+        latency.record(MODEL, seconds)
+    assert router._timeout_for(adaptive) == pytest.approx(3 * latency.p95(MODEL))
+    assert router._timeout_for(fixed) == 30.0
+
+    # Never tighter than the floor, however fast the model has been
+    router.latency = LatencyTracker(min_samples=1)
+    router.latency.record(MODEL, 0.1)
+    assert router._timeout_for(adaptive) == 5.0
+
+
+def test_hedge_wins_when_primary_is_slow() -> None:
+    calls = []
+
+    async def handler(request: httpx.Request) -> httpx.Response:
+        calls.append(request)
+        if len(calls) == 1:
+            await asyncio.sleep(10)
+        return httpx.Response(200, json=completion(f"copy {len(calls)}"))
+
+    latency = LatencyTracker(min_samples=1)
+    latency.record(MODEL, 0.01)
+    router = make_router(handler, latency, hedge=True)
+    assert asyncio.run(router._post("/chat", PAYLOAD)) == completion("copy 2")
+    assert router.hedge_stats() == {MODEL: {"fired": 1, "won": 1}}
+
+
+def test_no_hedge_when_primary_answers_in_time() -> None:
+    latency = LatencyTracker(min_samples=1)
+    latency.record(MODEL, 5.0)
+    router = make_router(answer, latency, hedge=True)
+    assert asyncio.run(router._post("/chat", PAYLOAD)) == completion("$1")
+    assert router.hedge_stats() == {}
+
+
+def test_no_hedge_without_latency_samples() -> None:
+    calls = []
+
+    async def handler(request: httpx.Request) -> httpx.Response:
+        calls.append(request)
+        await asyncio.sleep(0.05)
+        return httpx.Response(200, json=completion("$1"))
+
+    router = make_router(handler, LatencyTracker(min_samples=5), hedge=True)
+    asyncio.run(router._post("/chat", PAYLOAD))
+    assert len(calls) == 1
+
+
+def test_hedge_delay_excludes_time_waiting_for_a_slot() -> None:
+    class QueueingRouter(AsyncBaseRouter):
+        @asynccontextmanager
+        async def _attempt_slot(self, json_payload: dict) -> AsyncIterator[None]:
+            await asyncio.sleep(0.1)
+            yield
+
+    latency = LatencyTracker(min_samples=1)
+    latency.record(MODEL, 0.02)
+    router = make_router(answer, latency, QueueingRouter, hedge=True)
+    assert asyncio.run(router._post("/chat", PAYLOAD)) == completion("$1")
+    assert router.hedge_stats() == {}
@@ -0,0 +1,75 @@
+import asyncio
+
+from flare_ai_consensus.router.cache import ResponseCache, cache_key
+
+PAYLOAD = {
+    "model": "openai/gpt-4o-mini",
+    "messages": [{"role": "user", "content": "Appraise this NFT"}],
+    "temperature": 0.7,
+    "max_tokens": 200,
+}
+
+
+def response(text: str) -> dict:
+    return {"choices": [{"message": {"content": text}}]}
+
+
+def test_key_ignores_fields_not_affecting_the_response() -> None:
+    assert cache_key(PAYLOAD) == cache_key({**PAYLOAD, "stream": False})
+    assert cache_key(PAYLOAD) == cache_key(dict(reversed(PAYLOAD.items())))
+
+
+def test_key_changes_with_sampling_parameters() -> None:
+    assert cache_key(PAYLOAD) != cache_key({**PAYLOAD, "temperature": 0.2})
+    assert cache_key(PAYLOAD) != cache_key({**PAYLOAD, "max_tokens": 100})
+    assert cache_key(PAYLOAD) != cache_key({**PAYLOAD, "model": "other/model"})
+
+
+def test_key_includes_logprob_options_only_when_set() -> None:
+    assert cache_key(PAYLOAD) == cache_key({**PAYLOAD, "logprobs": None})
+    with_logprobs = {**PAYLOAD, "logprobs": True, "top_logprobs": 5}
+    assert cache_key(PAYLOAD) != cache_key(with_logprobs)
+    assert cache_key(with_logprobs) != cache_key({**with_logprobs, "top_logprobs": 3})
+
+
+def test_hit_returns_stored_response() -> None:
+    async def run() -> None:
+        cache = ResponseCache(max_entries=4)
+        assert await cache.get(PAYLOAD) is None
+        await cache.set(PAYLOAD, response("$1,200"), latency=2.5)
+        assert await cache.get(dict(PAYLOAD)) == response("$1,200")
+        stats = cache.stats()
+        assert (stats["memory_hits"], stats["misses"]) == (1, 1)
+        assert stats["saved_seconds"] == 2.5
+
+    asyncio.run(run())
+
+
+def test_evicts_least_recently_used_entry() -> None:
+    async def run() -> None:
+        cache = ResponseCache(max_entries=2)
+        first, second, third = (
+            {**PAYLOAD, "messages": [{"role": "user", "content": text}]}
+            for text in ("a", "b", "c")
+        )
+        await cache.set(first, response("a"))
+        await cache.set(second, response("b"))
+        # Reading `first` makes `second` the least recently used entry
+        assert await cache.get(first) is not None
+        await cache.set(third, response("c"))
+        assert await cache.get(second) is None
+        assert await cache.get(first) == response("a")
+        assert await cache.get(third) == response("c")
+        assert cache.stats()["entries"] == 2
+
+    asyncio.run(run())
+
+
+def test_expired_entry_is_a_miss() -> None:
+    async def run() -> None:
+        cache = ResponseCache(ttl=0.0)
+        await cache.set(PAYLOAD, response("a"))
+        assert await cache.get(PAYLOAD) is None
+        assert cache.stats()["entries"] == 0
+
+    asyncio.run(run())
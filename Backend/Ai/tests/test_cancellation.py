@@ -0,0 +1,44 @@
+import asyncio
+
+from flare_ai_consensus.streaming import EventChannel, cancel_when_abandoned
+
+
+def test_job_is_cancelled_when_no_client_ever_attaches() -> None:
+    async def run() -> tuple[bool, bool]:
+        abandoned = EventChannel("abandoned")
+        followed = EventChannel("followed")
+        jobs = [asyncio.create_task(asyncio.sleep(10)) for _ in range(2)]
+        cancel_when_abandoned(abandoned, jobs[0], grace=0.01)
+        cancel_when_abandoned(followed, jobs[1], grace=0.01)
+        followed.attach()
+        await asyncio.sleep(0.05)
+        cancelled = [job.cancelled() or job.cancelling() > 0 for job in jobs]
+        jobs[1].cancel()
+        await asyncio.gather(*jobs, return_exceptions=True)
+        return cancelled[0], cancelled[1]
+
+    assert asyncio.run(run()) == (True, False)
+
+
+def test_job_survives_a_reconnect_but_not_a_final_disconnect() -> None:
+    async def run() -> tuple[bool, bool, list[str]]:
+        channel = EventChannel("job")
+        job = asyncio.create_task(asyncio.sleep(10))
+        cancel_when_abandoned(channel, job, grace=0.05)
+        channel.attach()
+        channel.detach()
+        await asyncio.sleep(0.01)
+        channel.attach()
+        await asyncio.sleep(0.1)
+        survived = not job.done()
+
+        channel.detach()
+        await asyncio.sleep(0.1)
+        await asyncio.gather(job, return_exceptions=True)
+        events, _ = channel.events_after(0)
+        return survived, job.cancelled(), [event.type for event in events]
+
+    survived, cancelled, events = asyncio.run(run())
+    assert survived
+    assert cancelled
+    assert events == ["cancelled"]
@@ -0,0 +1,97 @@
+import asyncio
+
+from flare_ai_consensus.streaming import (
+    ChannelRegistry,
+    EventChannel,
+    parse_event_id,
+)
+
+
+def test_replays_events_after_a_cursor() -> None:
+    channel = EventChannel("job", max_events=10)
+    for i in range(5):
+        channel.publish("stage", {"i": i})
+    events, missed = channel.events_after(2)
+    assert [event.seq for event in events] == [3, 4, 5]
+    assert missed == 0
+    assert parse_event_id(events[0].id) == ("job", 3)
+
+
+def test_subscribers_read_independently() -> None:
+    channel = EventChannel("job", max_events=10)
+    channel.publish("stage", 1)
+    channel.publish("stage", 2)
+    first, _ = channel.events_after(0)
+    second, _ = channel.events_after(0)
+    assert [e.data for e in first] == [e.data for e in second] == [1, 2]
+
+
+def test_drop_oldest_reports_missed_events() -> None:
+    channel = EventChannel("job", max_events=3, policy="drop_oldest")
+    for i in range(5):
+        channel.publish("stage", i)
+    events, missed = channel.events_after(0)
+    assert [event.data for event in events] == [2, 3, 4]
+    assert missed == 2
+    assert channel.dropped == 2
+    # A subscriber that already read past the evicted events missed nothing
+    assert channel.events_after(3) == (events[1:], 0)
+
+
+def test_compact_evicts_transient_events_first() -> None:
+    channel = EventChannel("job", max_events=3, policy="compact")
+    channel.publish("model_response", "a")
+    channel.publish("model_delta", "b")
+    channel.publish("log", "c")
+    channel.publish("model_response", "d")
+    channel.publish("final_consensus", "e")
+    events, missed = channel.events_after(0)
+    assert [event.type for event in events] == [
+        "model_response",
+        "model_response",
+        "final_consensus",
+    ]
+    assert missed == 2
+
+
+def test_closed_channel_refuses_events() -> None:
+    channel = EventChannel("job")
+    channel.publish("stage", 1)
+    channel.close()
+    assert channel.publish("stage", 2) is None
+    assert channel.last_seq == 1
+
+
+def test_stream_resumes_after_cursor_and_closes() -> None:
+    async def run() -> list[str]:
+        channel = EventChannel("job", max_events=10)
+        for i in range(3):
+            channel.publish("stage", i)
+        channel.close()
+        return [chunk async for chunk in channel.astream(after=1)]
+
+    chunks = asyncio.run(run())
+    assert chunks[0].startswith("id: job:2\nevent: stage\n")
+    assert chunks[1].startswith("id: job:3\n")
+    assert chunks[2].startswith("event: close\n")
+
+
+def test_registry_discards_oldest_closed_channel_when_full() -> None:
+    registry = ChannelRegistry(max_channels=2)
+    old = registry.create("old")
+    old.close()
+    running = registry.create("running")
+    registry.create("new")
+    assert registry.get("old") is None
+    assert registry.get("running") is running
+
+
+def test_registry_expires_channels_without_subscribers() -> None:
+    registry = ChannelRegistry(idle_ttl=0.0)
+    followed = registry.create("followed")
+    followed.attach()
+    abandoned = registry.create("abandoned")
+    assert registry.get("abandoned") is None
+    assert abandoned.closed
+    assert registry.get("followed") is followed
+
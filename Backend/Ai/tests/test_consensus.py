@@ -0,0 +1,97 @@
+import asyncio
+from collections import Counter
+from typing import Any
+
+from flare_ai_consensus.consensus import ConsensusResult, run_consensus
+from flare_ai_consensus.consensus.convergence import has_converged
+from flare_ai_consensus.router import ModelResponse
+from flare_ai_consensus.settings import AggregatorConfig, ConsensusConfig, ModelConfig
+
+MODELS = ["a/model", "b/model"]
+
+
+def make_config(
+    threshold: float | None, metric: str = "cv", iterations: int = 3
+) -> ConsensusConfig:
+    return ConsensusConfig(
+        models=[ModelConfig(model_id=m) for m in MODELS],
+        aggregator_config=AggregatorConfig(
+            model=ModelConfig(model_id="aggregator/model"),
+            approach="",
+            context=[],
+            prompt=[],
+            # Aggregate locally so that only model rounds reach the provider
+            local_threshold=10.0,
+        ),
+        improvement_prompt="Improve your estimate.",
+        iterations=iterations,
+        aggregated_prompt_type="system",
+        convergence_threshold=threshold,
+        convergence_metric=metric,
+    )
+
+
+def round_of(*prices: float) -> dict[str, ModelResponse]:
+    return {
+        model_id: ModelResponse(model_id, f"${price}")
+        for model_id, price in zip(MODELS, prices, strict=True)
+    }
+
+
+class ScriptedProvider:
+    """Answers each model with the next price of its script."""
+
+    def __init__(self, rounds: list[tuple[float, ...]]) -> None:
+        self.rounds = rounds
+        self.calls: Counter[str] = Counter()
+
+    def configure_models(self, models: Any) -> None:
+        pass
+
+    async def send_chat(self, payload: dict) -> ModelResponse:
+        model_id = payload["model"]
+        prices = self.rounds[min(self.calls[model_id], len(self.rounds) - 1)]
+        self.calls[model_id] += 1
+        return ModelResponse(model_id, f"${prices[MODELS.index(model_id)]}")
+
+
+def consensus(provider: ScriptedProvider, config: ConsensusConfig) -> ConsensusResult:
+    conversation = [{"role": "user", "content": "Appraise"}]
+    coro = run_consensus(provider, config, conversation)  # type: ignore[arg-type]
+    return asyncio.run(coro)
+
+
+def test_has_converged_compares_dispersion_to_threshold() -> None:
+    assert has_converged(round_of(100, 102), make_config(0.05))
+    assert not has_converged(round_of(100, 200), make_config(0.05))
+    assert has_converged(round_of(100, 110), make_config(0.1, "spread"))
+    assert not has_converged(round_of(100, 120), make_config(0.1, "spread"))
+
+
+def test_has_converged_needs_a_threshold_and_two_prices() -> None:
+    assert not has_converged(round_of(100, 100), make_config(None))
+    responses = {"a/model": ModelResponse("a/model", "$100")}
+    assert not has_converged(responses, make_config(0.05))
+
+
+def test_converged_initial_round_skips_every_improvement_round() -> None:
+    provider = ScriptedProvider([(100, 101)])
+    result = consensus(provider, make_config(0.05))
+    assert (result.rounds_run, result.rounds_saved) == (0, 3)
+    assert provider.calls == {"a/model": 1, "b/model": 1}
+    assert result.response_data["rounds_saved"] == 3
+    assert "iteration_1" not in result.response_data
+
+
+def test_stops_at_the_first_converged_round() -> None:
+    provider = ScriptedProvider([(100, 300), (100, 101)])
+    result = consensus(provider, make_config(0.05))
+    assert (result.rounds_run, result.rounds_saved) == (1, 2)
+    assert '"price": 100.5' in result.text
+
+
+def test_runs_every_round_without_a_threshold() -> None:
+    provider = ScriptedProvider([(100, 100)])
+    result = consensus(provider, make_config(None))
+    assert (result.rounds_run, result.rounds_saved) == (3, 0)
+    assert provider.calls == {"a/model": 4, "b/model": 4}
@@ -0,0 +1,49 @@
+from pathlib import Path
+
+import numpy as np
+
+from flare_ai_consensus.consensus.confidence.embedding_cache import (
+    EmbeddingCache,
+    SQLiteEmbeddingStore,
+)
+
+MODEL = "test-embedding"
+
+
+def test_memory_tier_evicts_least_recently_used() -> None:
+    cache = EmbeddingCache(max_entries=2)
+    for text in ("a", "b"):
+        cache.set(MODEL, text, np.ones(3))
+    assert cache.get(MODEL, "a") is not None
+    cache.set(MODEL, "c", np.ones(3))
+    assert cache.get(MODEL, "b") is None
+    stats = cache.stats()
+    assert (stats["memory_hits"], stats["misses"], stats["entries"]) == (1, 1, 2)
+
+
+def test_disk_tier_survives_a_restart(tmp_path: Path) -> None:
+    store = SQLiteEmbeddingStore(tmp_path / "embeddings.sqlite")
+    EmbeddingCache(store=store).set(MODEL, "a", np.arange(3.0))
+
+    restarted = EmbeddingCache(store=SQLiteEmbeddingStore(store.path))
+    np.testing.assert_array_equal(restarted.get(MODEL, "a"), np.arange(3.0))
+    assert restarted.get("other-model", "a") is None
+    assert restarted.stats()["disk_hits"] == 1
+
+
+def test_disk_tier_drops_expired_vectors(tmp_path: Path) -> None:
+    store = SQLiteEmbeddingStore(tmp_path / "embeddings.sqlite")
+    EmbeddingCache(store=store, ttl=0.0).set(MODEL, "a", np.ones(3))
+    assert EmbeddingCache(store=store, ttl=0.0).get(MODEL, "a") is None
+
+
+def test_disk_tier_keeps_the_most_recently_used_vectors(tmp_path: Path) -> None:
+    store = SQLiteEmbeddingStore(tmp_path / "embeddings.sqlite", max_entries=2)
+    cache = EmbeddingCache(store=store)
+    for text in ("a", "b", "c"):
+        cache.set(MODEL, text, np.ones(3))
+
+    restarted = EmbeddingCache(store=store)
+    assert restarted.get(MODEL, "a") is None
+    assert restarted.get(MODEL, "b") is not None
+    assert restarted.get(MODEL, "c") is not None
@@ -0,0 +1,76 @@
+import asyncio
+import threading
+from pathlib import Path
+from types import SimpleNamespace
+
+import numpy as np
+
+from flare_ai_consensus.consensus.confidence.embedding_cache import (
+    EmbeddingCache,
+    SQLiteEmbeddingStore,
+)
+from flare_ai_consensus.consensus.confidence.embedding_service import (
+    AsyncEmbeddingService,
+)
+
+MODEL = "test-embedding"
+
+
+class FakeClient:
+    """Embeds each text as [len(text)] and records every batch."""
+
+    def __init__(self) -> None:
+        self.batches: list[list[str]] = []
+        self.aio = SimpleNamespace(models=SimpleNamespace(embed_content=self.embed))
+
+    async def embed(self, model: str, contents: list[str]) -> SimpleNamespace:
+        self.batches.append(contents)
+        embeddings = [SimpleNamespace(values=[float(len(t))]) for t in contents]
+        return SimpleNamespace(embeddings=embeddings)
+
+
+class RecordingStore(SQLiteEmbeddingStore):
+    """Records the threads that read the store."""
+
+    def __init__(self, path: Path) -> None:
+        super().__init__(path)
+        self.reads: list[tuple[int, int]] = []
+
+    def get_many(self, keys: list[str], ttl: float) -> list[np.ndarray | None]:
+        self.reads.append((threading.get_ident(), len(keys)))
+        return super().get_many(keys, ttl)
+
+
+def test_batches_texts_missing_from_the_cache() -> None:
+    client = FakeClient()
+    cache = EmbeddingCache()
+    cache.set(MODEL, "cached", np.array([-1.0]))
+    service = AsyncEmbeddingService(client, MODEL, cache=cache)
+
+    vectors = asyncio.run(service.embed_many(["cached", "ab", "abc", "ab"]))
+    assert [v.tolist() for v in vectors] == [[-1.0], [2.0], [3.0], [2.0]]
+    assert client.batches == [["ab", "abc"]]
+
+
+def test_reads_the_disk_tier_once_off_the_event_loop(tmp_path: Path) -> None:
+    store = RecordingStore(tmp_path / "embeddings.sqlite")
+    EmbeddingCache(store=store).set(MODEL, "on disk", np.array([-1.0]))
+    store.reads.clear()
+    client = FakeClient()
+    cache = EmbeddingCache(store=store)
+    cache.set(MODEL, "in memory", np.array([-2.0]))
+    service = AsyncEmbeddingService(client, MODEL, cache=cache)
+
+    async def run() -> tuple[list[np.ndarray], int]:
+        vectors = await service.embed_many(["in memory", "on disk", "new"])
+        return vectors, threading.get_ident()
+
+    vectors, loop_thread = asyncio.run(run())
+    assert [v.tolist() for v in vectors] == [[-2.0], [-1.0], [3.0]]
+    assert client.batches == [["new"]]
+    # Both texts missing from memory are looked up in a single worker call
+    [(read_thread, keys)] = store.reads
+    assert read_thread != loop_thread
+    assert keys == 2
+    stats = cache.stats()
+    assert (stats["memory_hits"], stats["disk_hits"], stats["misses"]) == (1, 1, 1)
@@ -0,0 +1,70 @@
+import math
+
+import pytest
+
+from flare_ai_consensus.consensus.confidence.logprob_confidence import (
+    logprob_confidence,
+    price_token_confidence,
+)
+from flare_ai_consensus.router import ModelResponse
+
+
+def token(text: str, p: float = 1.0, **alternatives: float) -> dict:
+    """A logprobs entry for `text` chosen with probability `p`."""
+    return {
+        "token": text,
+        "logprob": math.log(p),
+        "top_logprobs": [
+            {"token": alt, "logprob": math.log(p_alt)}
+            for alt, p_alt in alternatives.items()
+        ],
+    }
+
+
+def price_field(*digits: dict) -> list[dict]:
+    return [token('{"price": '), *digits, token(', "explanation": "x"}')]
+
+
+def test_certain_price_has_full_confidence() -> None:
+    assert price_token_confidence(price_field(token("12"), token("00"))) == 1.0
+
+
+def test_numeric_alternatives_cost_their_difference_at_place_value() -> None:
+    # "13" instead of "12" moves 1200 by 100 with probability 0.1
+    content = price_field(token("12", 0.9, **{"13": 0.1}), token("00"))
+    assert price_token_confidence(content) == pytest.approx(1 - 10 / 1200)
+
+
+def test_leading_digits_weigh_more_than_trailing_ones() -> None:
+    leading = price_field(token("12", 0.9, **{"22": 0.1}), token("00"))
+    trailing = price_field(token("12"), token("00", 0.9, **{"10": 0.1}))
+    assert price_token_confidence(leading) < price_token_confidence(trailing)
+
+
+def test_non_numeric_mass_costs_the_token_magnitude() -> None:
+    # Half the mass on anything else could change the whole price
+    assert price_token_confidence(price_field(token("5", 0.5))) == 0.0
+    content = price_field(token("12", 0.9), token("00"))
+    assert price_token_confidence(content) == pytest.approx(1 - 0.1 * 10_000 / 1200)
+
+
+def test_thousands_separators_and_quoted_prices() -> None:
+    content = [
+        token('{"predicted_price": "$'),
+        token("1"),
+        token(","),
+        token("200", 0.5, **{"300": 0.5}),
+        token('"}'),
+    ]
+    assert price_token_confidence(content) == pytest.approx(1 - 50 / 1200)
+
+
+def test_no_positive_price_gives_no_confidence() -> None:
+    assert price_token_confidence([token('{"explanation": "unsure"}')]) is None
+    assert price_token_confidence(price_field(token("0"))) is None
+
+
+def test_response_without_logprobs_has_no_confidence() -> None:
+    assert logprob_confidence(ModelResponse("m", '{"price": 1}')) is None
+    response = ModelResponse("m", '{"price": 1}', logprobs=price_field(token("1")))
+    assert logprob_confidence(response) == 1.0
@@ -0,0 +1,42 @@
+import pytest
+
+from flare_ai_consensus.utils import extract_price, parse_price_and_explanation
+
+
+@pytest.mark.parametrize(
+    ("text", "price", "explanation"),
+    [
+        ('{"price": 1200, "explanation": "Was $900."}', 1200.0, "Was $900."),
+        ('```json\n{"price": "$1,500.50", "explanation": "x"}\n```', 1500.5, "x"),
+        ('{"predicted_price_USD": 700}', 700.0, ""),
+        ('Here it is: {"price": 5, "explanation": "Cheap."} Thanks!', 5.0, "Cheap."),
+    ],
+)
+def test_json_price_fields_come_first(
+    text: str, price: float, explanation: str
+) -> None:
+    assert parse_price_and_explanation(text) == (price, explanation)
+
+
+@pytest.mark.parametrize(
+    ("text", "price"),
+    [
+        ('Worth "price": 700, though $900 is possible', 700.0),
+        ("About 800 USD, maybe $900", 900.0),
+        ("About 1,000 dollars at most", 1000.0),
+        ("1200 is fair given 3 recent sales", 1200.0),
+        ("No estimate is possible.", None),
+    ],
+)
+def test_prose_prices_in_order_of_precedence(text: str, price: float | None) -> None:
+    assert extract_price(text) == price
+
+
+def test_leading_price_is_stripped_from_the_explanation() -> None:
+    assert parse_price_and_explanation("$1,200. The floor is rising.") == (
+        1200.0,
+        "The floor is rising.",
+    )
+    text = "The floor is $1,200 and rising."
+    assert parse_price_and_explanation(text) == (1200.0, text)
+    assert parse_price_and_explanation("  No estimate. ") == (None, "No estimate.")
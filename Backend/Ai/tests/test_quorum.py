@@ -0,0 +1,79 @@
+import asyncio
+
+import pytest
+
+from flare_ai_consensus.consensus.quorum import RoundResponses, gather_quorum
+from flare_ai_consensus.router import ModelResponse
+
+
+async def answer(model_id: str, text: str, delay: float = 0.0) -> ModelResponse:
+    await asyncio.sleep(delay)
+    return ModelResponse(model_id, text)
+
+
+async def fail(message: str, delay: float = 0.0) -> ModelResponse:
+    await asyncio.sleep(delay)
+    raise RuntimeError(message)
+
+
+def gather(*args, **kwargs) -> RoundResponses:
+    return asyncio.run(gather_quorum(*args, **kwargs))
+
+
+def test_waits_for_every_model_by_default() -> None:
+    result = gather({f"m{i}": answer(f"m{i}", f"${i}", i * 0.01) for i in range(3)})
+    assert sorted(result) == ["m0", "m1", "m2"]
+    assert result.dropped == {}
+
+
+def test_closes_once_quorum_is_reached() -> None:
+    async def run() -> tuple[RoundResponses, asyncio.Task]:
+        slow = asyncio.ensure_future(answer("slow", "$3", 10))
+        result = await gather_quorum(
+            {
+                "a": answer("a", "$1"),
+                "b": answer("b", "$2", 0.01),
+                "slow": slow,
+            },
+            min_responses=2,
+        )
+        return result, slow
+
+    result, slow = asyncio.run(run())
+    assert sorted(result) == ["a", "b"]
+    assert result.dropped == {"slow": "quorum reached"}
+    assert slow.cancelled()
+
+
+def test_closes_at_the_deadline() -> None:
+    result = gather(
+        {"fast": answer("fast", "$1"), "slow": answer("slow", "$2", 10)},
+        deadline=0.05,
+    )
+    assert list(result) == ["fast"]
+    assert result.dropped == {"slow": "deadline"}
+
+
+def test_drops_failing_and_empty_responses() -> None:
+    result = gather(
+        {
+            "ok": answer("ok", "$1", 0.01),
+            "broken": fail("boom"),
+            "empty": answer("empty", ""),
+        }
+    )
+    assert list(result) == ["ok"]
+    assert result.dropped == {"broken": "error: boom", "empty": "empty response"}
+
+
+def test_failing_model_does_not_count_towards_quorum() -> None:
+    result = gather(
+        {"broken": fail("boom"), "ok": answer("ok", "$1", 0.01)},
+        min_responses=1,
+    )
+    assert list(result) == ["ok"]
+
+
+def test_raises_when_no_model_answers() -> None:
+    with pytest.raises(RuntimeError, match="first"):
+        gather({"a": fail("first"), "b": fail("second", 0.01)})
@@ -0,0 +1,112 @@
+import asyncio
+from pathlib import Path
+
+import pytest
+
+from flare_ai_consensus.router import rate_limiter
+from flare_ai_consensus.router.rate_limiter import (
+    ModelRateLimits,
+    RateLimiter,
+    SQLiteBucketStore,
+    TokenBucket,
+)
+
+
+@pytest.fixture
+def clock(monkeypatch: pytest.MonkeyPatch) -> list[float]:
+    """A monotonic clock advanced by assigning to `clock[0]`."""
+    now = [1000.0]
+    monkeypatch.setattr(rate_limiter.time, "monotonic", lambda: now[0])
+    return now
+
+
+def test_reserve_within_capacity_does_not_wait(clock: list[float]) -> None:
+    bucket = TokenBucket(capacity=3, refill_per_second=1)
+    assert [bucket.reserve(1) for _ in range(3)] == [0.0, 0.0, 0.0]
+    assert bucket.tokens == 0
+
+
+def test_reserve_beyond_capacity_waits_for_refill(clock: list[float]) -> None:
+    bucket = TokenBucket(capacity=2, refill_per_second=0.5)
+    bucket.reserve(2)
+    assert bucket.reserve(1) == pytest.approx(2.0)
+    # Reservations queue up behind the debt of earlier ones
+    assert bucket.reserve(1) == pytest.approx(4.0)
+
+
+def test_refill_is_capped_at_capacity(clock: list[float]) -> None:
+    bucket = TokenBucket(capacity=2, refill_per_second=1)
+    bucket.reserve(2)
+    clock[0] += 1
+    assert bucket.reserve(1) == 0.0
+    clock[0] += 60
+    assert bucket.reserve(2) == 0.0
+    assert bucket.reserve(1) == pytest.approx(1.0)
+
+
+def test_oversized_reservation_costs_at_most_capacity(clock: list[float]) -> None:
+    bucket = TokenBucket(capacity=10, refill_per_second=1)
+    assert bucket.reserve(50) == 0.0
+    assert bucket.reserve(5) == pytest.approx(5.0)
+
+
+def test_refund_returns_an_unused_reservation(clock: list[float]) -> None:
+    bucket = TokenBucket(capacity=2, refill_per_second=1)
+    bucket.reserve(2)
+    assert bucket.reserve(1) == pytest.approx(1.0)
+    bucket.refund(1)
+    assert bucket.reserve(1) == pytest.approx(1.0)
+    # Never refilled beyond capacity
+    bucket.refund(1)
+    bucket.refund(5)
+    assert bucket.tokens == 2
+
+
+def test_shared_store_refunds_reservations(tmp_path: Path) -> None:
+    store = SQLiteBucketStore(tmp_path / "buckets.sqlite")
+    budget = ("model:requests", 5.0, 0.001)
+    assert store.reserve(budget[0], 5, *budget[1:]) == 0.0
+    wait = store.reserve(budget[0], 1, *budget[1:])
+    assert wait == pytest.approx(1000, rel=0.01)
+    store.refund(budget[0], 1, *budget[1:])
+    assert store.reserve(budget[0], 1, *budget[1:]) == pytest.approx(wait, rel=0.01)
+
+
+def test_throttled_request_leaves_its_concurrency_slot_free() -> None:
+    limiter = RateLimiter(ModelRateLimits(max_concurrency=1, tokens_per_minute=600))
+
+    async def send(tokens: int, entered: list[int]) -> None:
+        async with limiter.acquire("model", tokens):
+            entered.append(tokens)
+
+    async def run() -> list[int]:
+        entered: list[int] = []
+        await send(600, entered)
+        # Sleeps about a minute for the token budget
+        throttled = asyncio.create_task(send(600, entered))
+        await asyncio.sleep(0)
+        await asyncio.wait_for(send(0, entered), timeout=1)
+        throttled.cancel()
+        await asyncio.gather(throttled, return_exceptions=True)
+        return entered
+
+    assert asyncio.run(run()) == [600, 0]
+
+
+def test_cancelled_waiter_gets_its_reservation_back() -> None:
+    limiter = RateLimiter(ModelRateLimits(requests_per_minute=1))
+
+    async def send() -> None:
+        async with limiter.acquire("model"):
+            pass
+
+    async def run() -> float:
+        await send()
+        waiter = asyncio.create_task(send())
+        await asyncio.sleep(0)
+        waiter.cancel()
+        await asyncio.gather(waiter, return_exceptions=True)
+        return limiter._buckets["model:requests"].tokens
+
+    # Only the request that was sent is charged
+    assert asyncio.run(run()) == pytest.approx(0.0, abs=0.01)
@@ -0,0 +1,120 @@
+import asyncio
+import json
+from collections.abc import Awaitable, Callable
+
+import httpx
+import pytest
+
+from flare_ai_consensus.router import LatencyTracker, RouterHTTPError, RouterMetrics
+from flare_ai_consensus.router.base_router import AsyncBaseRouter, _iter_sse_chunks
+from flare_ai_consensus.settings import ModelConfig
+
+MODEL = "test/model"
+PAYLOAD = {"model": MODEL, "messages": [], "max_tokens": 10, "temperature": 0.0}
+
+
+def delta(text: str) -> str:
+    return "data: " + json.dumps({"choices": [{"delta": {"content": text}}]})
+
+
+def sse(*lines: str) -> bytes:
+    return "\n".join(lines).encode() + b"\n"
+
+
+def decode(body: bytes) -> list[dict]:
+    async def run() -> list[dict]:
+        response = httpx.Response(200, content=body)
+        return [chunk async for chunk in _iter_sse_chunks(response)]
+
+    return asyncio.run(run())
+
+
+def texts(chunks: list[dict]) -> list[str]:
+    return [chunk["choices"][0]["delta"]["content"] for chunk in chunks]
+
+
+def test_decodes_data_lines_until_done() -> None:
+    body = sse(delta("a"), "", delta("b"), "", "data: [DONE]", "", delta("late"))
+    assert texts(decode(body)) == ["a", "b"]
+
+
+def test_skips_comments_and_empty_data() -> None:
+    body = sse(": OPENROUTER PROCESSING", "", "data:", "", delta("a"), "event: x")
+    assert texts(decode(body)) == ["a"]
+
+
+def test_skips_malformed_and_non_object_chunks() -> None:
+    body = sse(delta("a"), 'data: {"choices": [', "data: [1, 2]", delta("b"))
+    assert texts(decode(body)) == ["a", "b"]
+
+
+def test_raises_errors_reported_in_the_stream() -> None:
+    body = sse(
+        delta("a"),
+        'data: {"error": {"code": 429, "message": "Rate limit exceeded"}}',
+    )
+    with pytest.raises(RouterHTTPError) as error:
+        decode(body)
+    assert error.value.status_code == 429
+    assert error.value.retryable
+
+
+def test_stream_error_without_numeric_code_is_a_server_error() -> None:
+    with pytest.raises(RouterHTTPError) as error:
+        decode(sse('data: {"error": {"code": "overloaded", "message": "busy"}}'))
+    assert error.value.status_code == 500
+
+
+def stream_router(
+    handler: Callable[[httpx.Request], Awaitable[httpx.Response]],
+) -> AsyncBaseRouter:
+    router = AsyncBaseRouter(
+        "https://api.test",
+        shared_client=False,
+        metrics=RouterMetrics(),
+        latency=LatencyTracker(),
+    )
+    router._client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    router.configure_models([ModelConfig(model_id=MODEL, max_retries=1)])
+    return router
+
+
+def collect(router: AsyncBaseRouter) -> list[str]:
+    async def run() -> list[dict]:
+        return [chunk async for chunk in router._stream("/chat", PAYLOAD)]
+
+    return texts(asyncio.run(run()))
+
+
+def test_stream_retries_before_the_first_chunk(
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    monkeypatch.setattr(AsyncBaseRouter, "_backoff", staticmethod(lambda *_: 0.0))
+    bodies = []
+
+    async def handler(request: httpx.Request) -> httpx.Response:
+        bodies.append(json.loads(request.content))
+        if len(bodies) == 1:
+            return httpx.Response(503, text="unavailable")
+        return httpx.Response(200, content=sse(delta("a"), "data: [DONE]"))
+
+    router = stream_router(handler)
+    assert collect(router) == ["a"]
+    assert router.retries[MODEL] == 1
+    assert bodies[-1]["stream"] is True
+
+
+def test_stream_is_not_restarted_after_output(
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    monkeypatch.setattr(AsyncBaseRouter, "_backoff", staticmethod(lambda *_: 0.0))
+    calls = []
+
+    async def handler(request: httpx.Request) -> httpx.Response:
+        calls.append(request)
+        body = sse(delta("a"), 'data: {"error": {"code": 502, "message": "x"}}')
+        return httpx.Response(200, content=body)
+
+    with pytest.raises(RouterHTTPError):
+        collect(stream_router(handler))
+    assert len(calls) == 1
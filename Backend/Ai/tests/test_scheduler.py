@@ -0,0 +1,89 @@
+import asyncio
+import time
+from typing import Any
+
+import pytest
+from fastapi.testclient import TestClient
+
+from flare_ai_consensus.jobs import JobScheduler, SchedulerSaturated
+from flare_ai_consensus.main import create_app
+from flare_ai_consensus.settings import settings
+
+
+async def succeed(contract_address: str, token_id: str) -> str:
+    return '{"price": 1200.0}'
+
+
+async def report_error(contract_address: str, token_id: str) -> dict[str, Any]:
+    return {"error": "API key not set"}
+
+
+async def hang(contract_address: str, token_id: str) -> dict[str, Any]:
+    await asyncio.Event().wait()
+    return {}
+
+
+def test_jobs_finish_with_their_outcome() -> None:
+    async def run() -> list[dict[str, Any]]:
+        scheduler = JobScheduler(concurrency=2)
+        jobs = [
+            scheduler.submit("test", appraise, "0xabc", "1")
+            for appraise in (succeed, report_error)
+        ]
+        await asyncio.gather(*(job.done.wait() for job in jobs))
+        await scheduler.stop()
+        return [job.to_dict() for job in jobs]
+
+    succeeded, failed = asyncio.run(run())
+    assert succeeded["status"] == "succeeded"
+    assert succeeded["result"] == {"price": 1200.0}
+    assert failed["status"] == "failed"
+    assert failed["error"] == "API key not set"
+
+
+def test_full_queue_refuses_submissions() -> None:
+    async def run() -> tuple[SchedulerSaturated, list[int | None]]:
+        scheduler = JobScheduler(concurrency=1, max_queue=2, timeout=30.0)
+        running = scheduler.submit("test", hang, "0xabc", "1")
+        await asyncio.sleep(0)
+        queued = [scheduler.submit("test", hang, "0xabc", "1") for _ in range(2)]
+        with pytest.raises(SchedulerSaturated) as refused:
+            scheduler.submit("test", hang, "0xabc", "1")
+        positions = [scheduler.position(job) for job in (running, *queued)]
+        await scheduler.stop()
+        return refused.value, positions
+
+    refused, positions = asyncio.run(run())
+    assert positions == [None, 0, 1]
+    # Three jobs ahead of a retry, one at a time, each up to the timeout
+    assert refused.retry_after == 90
+
+
+def test_api_answers_503_with_retry_after_when_saturated(
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    monkeypatch.setattr(settings, "http_prewarm_urls", [])
+    monkeypatch.setattr(settings, "aiohttp_prewarm_urls", [])
+    monkeypatch.setattr(settings, "job_concurrency", 1)
+    monkeypatch.setattr(settings, "job_queue_size", 1)
+    monkeypatch.setattr(settings, "job_timeout", 20.0)
+    app = create_app(strategies={"/hang": hang})
+    body = {"contract_address": "0xabc", "token_id": "1"}
+
+    with TestClient(app) as client:
+        running = client.post("/appraisals", json=body)
+        assert running.status_code == 202
+        # Wait for the only worker to pick the first job up
+        for _ in range(100):
+            status = client.get(running.headers["Location"]).json()["status"]
+            if status == "running":
+                break
+            time.sleep(0.01)
+        queued = client.post("/appraisals", json=body)
+        refused = client.post("/appraisals", json=body)
+
+    assert queued.status_code == 202
+    assert queued.json()["queue_position"] == 0
+    assert refused.status_code == 503
+    # Two jobs ahead of a retry, one at a time, each up to the timeout
+    assert refused.headers["Retry-After"] == "40"
@@ -0,0 +1,33 @@
+import importlib.util
+import sys
+from pathlib import Path
+from types import ModuleType, SimpleNamespace
+
+import pytest
+
+SERVER = Path(__file__).resolve().parent.parent / "server.py"
+SAMPLE_DATA = {
+    "sales_history": [{"date": "2024-05-01 12:00:00", "price_usd": 1200.0}],
+}
+
+
+def test_server_app_imports_from_any_directory(
+    monkeypatch: pytest.MonkeyPatch, tmp_path: Path
+) -> None:
+    # sample.py and the side info API fetch live NFT data when imported
+    sample = SimpleNamespace(sample_data=SAMPLE_DATA)
+    monkeypatch.setitem(sys.modules, "sample", sample)
+    monkeypatch.setitem(
+        sys.modules, "Backend.Ai.Sideinfo_api.sideinfo", SimpleNamespace(main=None)
+    )
+    monkeypatch.chdir(tmp_path)
+
+    spec = importlib.util.spec_from_file_location("server", SERVER)
+    assert spec is not None and spec.loader is not None
+    server: ModuleType = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(server)
+
+    paths = set(server.app.openapi()["paths"])
+    assert set(server.STRATEGIES) <= paths
+    assert set(server.STREAMS) <= paths
+    assert "/api/routes/chat/" in paths
@@ -0,0 +1,64 @@
+import numpy as np
+import pytest
+
+from flare_ai_consensus.consensus.confidence.shapley import (
+    CoalitionValues,
+    consensus_value_function,
+    exact_shapley,
+    sampled_shapley,
+    shapley_values,
+    shapley_weights,
+)
+
+PRICES = [100.0, 105.0, 98.0, 160.0, 102.0, 40.0]
+CONFIDENCE = [0.9, 0.8, 0.7, 0.4, 0.85, 0.3]
+
+
+def game(reference_price: float | None = None) -> CoalitionValues:
+    value_fn = consensus_value_function(PRICES, CONFIDENCE, reference_price)
+    return CoalitionValues(len(PRICES), value_fn)
+
+
+def test_exact_values_of_an_additive_game() -> None:
+    worth = [1.0, 2.0, 3.0]
+    phi = shapley_values(3, lambda members: sum(worth[i] for i in members))
+    np.testing.assert_allclose(phi, worth)
+
+
+def test_exact_values_are_efficient() -> None:
+    values = game()
+    phi = exact_shapley(values)
+    assert phi.sum() == pytest.approx(values((1 << len(PRICES)) - 1))
+    # Every coalition is evaluated exactly once
+    assert values.evaluations == 1 << len(PRICES)
+
+
+@pytest.mark.parametrize("reference_price", [None, 100.0])
+def test_sampled_values_agree_with_exact_values(
+    reference_price: float | None,
+) -> None:
+    exact = exact_shapley(game(reference_price))
+    sampled = sampled_shapley(
+        game(reference_price), tolerance=0.002, max_permutations=20_000, seed=7
+    )
+    scale = np.abs(exact).sum()
+    np.testing.assert_allclose(sampled, exact, atol=0.02 * scale)
+    # Outliers contribute least in both
+    assert np.argmin(sampled) == np.argmin(exact)
+
+
+def test_sampling_is_used_above_the_exact_limit() -> None:
+    value_fn = consensus_value_function(PRICES, CONFIDENCE)
+    exact = shapley_values(len(PRICES), value_fn)
+    sampled = shapley_values(
+        len(PRICES), value_fn, exact_max_models=2, max_permutations=20_000, seed=7
+    )
+    assert not np.array_equal(sampled, exact)
+    np.testing.assert_allclose(sampled, exact, atol=0.02 * np.abs(exact).sum())
+
+
+def test_weights_drop_negative_contributions_and_sum_to_one() -> None:
+    weights = shapley_weights(list("abcdef"), PRICES, CONFIDENCE)
+    assert sum(weights.values()) == pytest.approx(1.0)
+    assert min(weights.values()) >= 0.0
+    assert weights["d"] < weights["a"]
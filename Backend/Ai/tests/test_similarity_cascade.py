@@ -0,0 +1,65 @@
+import numpy as np
+import pytest
+
+from flare_ai_consensus.consensus.confidence.local_embeddings import (
+    HashedTfidfEmbedder,
+)
+from flare_ai_consensus.consensus.confidence.similarity_cascade import (
+    SimilarityCascade,
+)
+
+BASE = (
+    "The collection floor price is around 1.2 ETH and this token has rare "
+    "traits that sold for more in recent months, so the estimate sits above "
+    "the floor."
+)
+NEAR_DUPLICATE = BASE + " Demand is steady."
+PARAPHRASE = (
+    "Recent sales of tokens with these rare traits went above the 1.2 ETH "
+    "floor, so I value it somewhat higher than the floor price."
+)
+UNRELATED = (
+    "Trading volume collapsed and the project team abandoned the roadmap; "
+    "the token is nearly worthless."
+)
+RECASED = "  " + BASE.upper().replace(",", "")
+PAIRS = [
+    (BASE, RECASED),
+    (BASE, NEAR_DUPLICATE),
+    (BASE, PARAPHRASE),
+    (BASE, UNRELATED),
+]
+
+
+def cosine(embedder: HashedTfidfEmbedder, text1: str, text2: str) -> float:
+    vectors = embedder.embed_many([text1, text2], observe=False)
+    return float(vectors[0] @ vectors[1])
+
+
+def test_only_equal_and_near_duplicate_pairs_skip_embeddings() -> None:
+    cascade = SimilarityCascade()
+    assert cascade.screen(*PAIRS[0]) == 1.0
+    assert cascade.screen(*PAIRS[1]) is not None
+    assert cascade.screen(BASE, PARAPHRASE) is None
+    assert cascade.screen(BASE, UNRELATED) is None
+    assert cascade.screen(BASE, "") is None
+    stats = cascade.stats()
+    assert (stats["exact"], stats["near_duplicate"], stats["embedding"]) == (1, 1, 3)
+
+
+def test_cascade_scores_track_embedding_scores() -> None:
+    embedder = HashedTfidfEmbedder()
+    embedder.embed_many([text for pair in PAIRS for text in pair])
+    cascade = SimilarityCascade()
+    for text1, text2 in PAIRS:
+        embedded = cosine(embedder, text1, text2)
+        screened = cascade.screen(text1, text2)
+        scored = embedded if screened is None else screened
+        assert scored == pytest.approx(embedded, abs=0.05)
+
+
+def test_near_duplicate_score_is_a_shingle_cosine() -> None:
+    cascade = SimilarityCascade(high=0.0)
+    # One extra bigram on a text of three: |A & B| = 3, |A| = 3, |B| = 4
+    score = cascade.screen("one two three four", "one two three four five")
+    assert score == pytest.approx(3 / np.sqrt(12), abs=0.05)